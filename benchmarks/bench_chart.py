@@ -0,0 +1,108 @@
+"""
+Chart payload and build-time benchmark for visualization.display_stock_chart
+
+Compares the full-resolution SVG figure (max_points=0: every point sent, the
+history twice) with the WebGL + LTTB mode on the bundled history, a long
+synthetic history and multi-decade forecasts, and times the sentiment hover
+strings built row by row against the vectorised builder.
+
+    python benchmarks/bench_chart.py
+    python benchmarks/bench_chart.py --max-points 4000 --horizons 365 36500
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+warnings.filterwarnings('ignore')
+
+import synthetic
+from data_processor import load_and_process_data, get_ticker_data
+from forecasting import forecast_stock_prices
+from visualization import display_stock_chart, get_sentiment_emoji, point_budget, sentiment_hover_text
+
+DATA_PATH = os.path.join(HERE, '..', 'data', 'refined_textual_data.csv')
+
+def legacy_hover_text(labels):
+    """
+    The pre-vectorisation hover strings: one emoji lookup and f-string per row
+    """
+    emojis = [get_sentiment_emoji(sentiment) for sentiment in labels]
+    sentiments = labels.tolist()
+    return [f"{emoji} {sentiment}" for emoji, sentiment in zip(emojis, sentiments)]
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def profile(build, repeat):
+    """
+    Best-of-repeat build and JSON serialisation time, payload size and point count
+    """
+    build_s = serialise_s = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build()
+        build_s = min(build_s, time.perf_counter() - start)
+        start = time.perf_counter()
+        payload = fig.to_json()
+        serialise_s = min(serialise_s, time.perf_counter() - start)
+    points = sum(len(trace.x) for trace in fig.data if trace.x is not None)
+    return build_s, serialise_s, len(payload.encode('utf-8')), points
+
+def synthetic_history(n_days):
+    """
+    One synthetic ticker shaped like the processed data, with emotion labels
+    """
+    prices = synthetic.make_price_frame(1, n_days)
+    labels = np.array(synthetic.EMOTIONS_UP + synthetic.EMOTIONS_DOWN + synthetic.EMOTIONS_FLAT)
+    prices['emo_label'] = labels[np.random.default_rng(0).integers(0, len(labels), n_days)]
+    return prices
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ticker', default='AAPL')
+    parser.add_argument('--max-points', type=int, default=point_budget())
+    parser.add_argument('--synthetic-days', type=int, default=50_000)
+    parser.add_argument('--horizons', nargs='+', type=int, default=[365, 3650, 36500])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    history = get_ticker_data(load_and_process_data(DATA_PATH), args.ticker)
+    cases = [
+        (f'{args.ticker} history', history, False),
+        (f'synthetic {args.synthetic_days}d history', synthetic_history(args.synthetic_days), False)
+    ]
+    for days in args.horizons:
+        cases.append((f'{args.ticker} forecast {days}d',
+                      forecast_stock_prices(history, days=days, seed=0, n_paths=200), True))
+
+    print(f"{'case':<32} {'mode':<7} {'points':>8} {'build ms':>9} {'json ms':>9} {'payload KiB':>12}")
+    for name, data, is_forecast in cases:
+        rows = [
+            ('full', lambda: display_stock_chart(data, ticker=args.ticker, is_forecast=is_forecast, max_points=0)),
+            ('webgl', lambda: display_stock_chart(data, ticker=args.ticker, is_forecast=is_forecast,
+                                                  max_points=args.max_points))
+        ]
+        for mode, build in rows:
+            build_s, serialise_s, size, points = profile(build, args.repeat)
+            print(f"{name:<32} {mode:<7} {points:>8} {build_s * 1e3:9.1f} {serialise_s * 1e3:9.1f} {size / 1024:12.1f}")
+
+    print(f"\n{'hover strings':<32} {'rows':>8} {'row loop ms':>12} {'vectorised ms':>14}")
+    for name, data, is_forecast in cases:
+        if is_forecast:
+            continue
+        labels = data['emo_label']
+        print(f"{name:<32} {len(labels):>8} {timed(lambda: legacy_hover_text(labels), args.repeat) * 1e3:12.2f} "
+              f"{timed(lambda: sentiment_hover_text(labels), args.repeat) * 1e3:14.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Ensemble members run one after another versus concurrently, and with a member failing
+
+Forecasts every bundled ticker with the Holt and GBM members plus a
+stand-in for a slow member that waits on I/O (a remote model, a feature
+store) before returning a naive last-price path. Extending the members
+one after another takes the sum of their latencies; the default runner
+takes about the slowest one, and both give identical frames. The Holt and GBM
+members themselves are CPU bound, so on a single core they gain little
+from overlapping; the I/O-bound member is where concurrency pays off.
+
+Then a member that hangs past its timeout and one that raises are
+registered: forecasts still return within the timeout, blended from the
+remaining members, and match the forecasts made without them.
+
+    python benchmarks/bench_ensemble.py
+    python benchmarks/bench_ensemble.py --delay 0.5 --timeout 0.2
+"""
+import os
+import sys
+import time
+import atexit
+import shutil
+import argparse
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+warnings.filterwarnings('ignore')
+
+# Keep trained models out of the real registry while benchmarking
+_MODEL_DIR = tempfile.mkdtemp(prefix='stockoracle-bench-models-')
+os.environ['STOCKORACLE_MODEL_DIR'] = _MODEL_DIR
+atexit.register(shutil.rmtree, _MODEL_DIR, ignore_errors=True)
+
+from data_processor import load_structured_data, TickerPartitions
+from forecasting import forecast_stock_prices
+from ensemble import EnsembleRunner, register_member, unregister_member
+
+DATA_DIR = os.path.join(HERE, '..', 'data')
+DATA_PATH = os.path.join(DATA_DIR, 'refined_textual_data.csv')
+PRICE_PATH = os.path.join(DATA_DIR, 'stock_data_5_years.csv')
+
+class ConstantPath:
+    def __init__(self, value):
+        self.value = value
+
+    def step(self, days):
+        return np.full((1, days), self.value)
+
+def slow_member(delay):
+    """
+    A member that waits `delay` seconds before forecasting the last close
+    """
+    def start(context):
+        time.sleep(delay)
+        return ConstantPath(context['close'][-1])
+    return start
+
+def failing_member(context):
+    raise RuntimeError("feature store unavailable")
+
+class SequentialRunner:
+    """
+    The members one after another on the calling thread, as before they had a runner
+    """
+    def run(self, tracks, days):
+        paths = {}
+        for name, track in tracks.items():
+            values = track.extend(days)
+            if values is not None:
+                paths[name] = values
+        return paths, {}
+
+def timed(forecast, datasets):
+    frames, latencies = [], []
+    for data in datasets:
+        start = time.perf_counter()
+        frames.append(forecast(data))
+        latencies.append(time.perf_counter() - start)
+    return frames, np.asarray(latencies) * 1e3
+
+def row(label, latencies):
+    print(f"{label:<28} {np.percentile(latencies, 50):9.1f} {np.percentile(latencies, 95):9.1f} {latencies.max():9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--paths', type=int, default=2000)
+    parser.add_argument('--delay', type=float, default=0.25, help='seconds the slow member waits')
+    parser.add_argument('--timeout', type=float, default=0.1, help='timeout of the hanging member')
+    args = parser.parse_args()
+
+    partitions = TickerPartitions(load_structured_data(PRICE_PATH, DATA_PATH, compact=True))
+    datasets = [partitions.get(ticker) for ticker in partitions.tickers]
+    forecast = lambda runner: lambda data: forecast_stock_prices(data, args.days, seed=42, n_paths=args.paths,
+                                                                  cache=False, runner=runner)
+
+    sequential, concurrent = SequentialRunner(), EnsembleRunner()
+    # Train (or load) each model once so both runners start equal
+    timed(forecast(concurrent), datasets)
+    baseline, baseline_ms = timed(forecast(concurrent), datasets)
+
+    print(f"{len(datasets)} tickers, {args.days} days, {args.paths} paths\n")
+    print(f"{'members':<28} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    row('holt + gbm, sequential', timed(forecast(sequential), datasets)[1])
+    row('holt + gbm, concurrent', timed(forecast(concurrent), datasets)[1])
+
+    register_member('slow', slow_member(args.delay))
+    try:
+        seq_frames, seq_ms = timed(forecast(sequential), datasets)
+        frames, ms = timed(forecast(concurrent), datasets)
+        row('+ slow, sequential', seq_ms)
+        row('+ slow, concurrent', ms)
+        for got, expected in zip(frames, seq_frames):
+            pd.testing.assert_frame_equal(got, expected, check_exact=True)
+        # The slow member overlaps the others instead of adding to them
+        assert np.median(ms) < np.median(seq_ms), (np.median(ms), np.median(seq_ms))
+    finally:
+        unregister_member('slow')
+
+    register_member('hanging', slow_member(4 * args.delay + args.timeout), timeout=args.timeout)
+    register_member('failing', failing_member)
+    try:
+        frames, ms = timed(forecast(concurrent), datasets)
+        row('+ hanging, failing', ms)
+        # Bounded by the hanging member's timeout, not by how long it hangs
+        assert np.median(ms) < np.median(baseline_ms) + args.timeout * 1e3 + 50, (np.median(ms), np.median(baseline_ms))
+    finally:
+        unregister_member('hanging')
+        unregister_member('failing')
+    for got, expected in zip(frames, baseline):
+        assert got.attrs['missing_members'] == ['hanging', 'failing'], got.attrs
+        pd.testing.assert_frame_equal(got, expected, check_exact=True, check_flags=False)
+    print("\nconcurrent forecasts match sequential ones; "
+          "without the hanging and failing members they match holt + gbm alone")
+
+    print(f"\n{'member':<10} {'ok':>5} {'timeout':>8} {'error':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, stats in concurrent.metrics().items():
+        latency = stats['latency'] or {'p50_ms': float('nan'), 'p95_ms': float('nan')}
+        print(f"{name:<10} {stats['ok']:5d} {stats['timeout']:8d} {stats['error']:6d} "
+              f"{latency['p50_ms']:9.1f} {latency['p95_ms']:9.1f}")
+    metrics = concurrent.metrics()
+    assert metrics['hanging']['timeout'] == len(datasets), metrics['hanging']
+    assert metrics['failing']['error'] == len(datasets), metrics['failing']
+
+if __name__ == '__main__':
+    main()
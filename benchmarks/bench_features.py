@@ -0,0 +1,97 @@
+"""
+Feature-building benchmark: DataFrame shift loop vs strided design matrix
+
+Times and measures peak traced memory of the legacy prepare_features (one
+shift column per lag, then dropna over the frame) against
+features.build_design_matrix, for single tickers and for the batch mode over
+many tickers and lookbacks.
+
+    python benchmarks/bench_features.py
+    python benchmarks/bench_features.py --tickers 1000 --days 1250 --lookbacks 10 30 60
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import synthetic
+from data_processor import load_and_process_data, TickerPartitions
+from features import frame_design_matrix, build_design_matrices
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'refined_textual_data.csv')
+
+def legacy_prepare_features(data, lookback):
+    """
+    The pre-rewrite feature builder
+    """
+    df = data.copy().sort_values('date')
+    for lag in range(1, lookback + 1):
+        df[f'lag_{lag}'] = df['close'].shift(lag)
+    df['rolling_std'] = df['close'].rolling(window=lookback).std().fillna(0)
+    df['momentum'] = df['close'] - df['close'].shift(lookback)
+    features = [f'lag_{lag}' for lag in range(1, lookback + 1)] + ['volume', 'sentiment_value', 'rolling_std', 'momentum']
+    df.dropna(inplace=True)
+    return df[features].values, df['close'].values
+
+def measure(fn, *args):
+    """
+    Wall time of one call and the traced peak memory of a second one
+    """
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def synthetic_frames(n_tickers, n_days):
+    prices = synthetic.make_price_frame(n_tickers, n_days)
+    prices['date'] = pd.to_datetime(prices['date'])
+    prices['volume'] = prices['volume'].astype(float)
+    prices['sentiment_value'] = np.sign(prices['return']).astype(float)
+    prices = prices.drop(columns='return')
+    return {ticker: frame for ticker, frame in prices.groupby('ticker', sort=False)}
+
+def report(label, legacy, new):
+    (legacy_s, legacy_peak, _), (new_s, new_peak, _) = legacy, new
+    print(f"{label:<34} {legacy_s * 1e3:10.1f} {new_s * 1e3:9.1f} {legacy_s / new_s:7.1f}x "
+          f"{legacy_peak / 2**20:10.1f} {new_peak / 2**20:9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--long-days', type=int, default=50_000)
+    parser.add_argument('--lookbacks', nargs='+', type=int, default=[10, 30, 60])
+    args = parser.parse_args()
+
+    print(f"{'case':<34} {'legacy ms':>10} {'new ms':>9} {'speedup':>8} {'legacy MiB':>10} {'new MiB':>9}")
+
+    bundled = TickerPartitions(load_and_process_data(DATA_PATH))
+    frame = bundled.get(bundled.tickers[0])
+    legacy = measure(legacy_prepare_features, frame, 30)
+    new = measure(frame_design_matrix, frame, 30)
+    assert np.allclose(legacy[2][0], new[2][0], rtol=1e-9, atol=1e-9)
+    report(f"{bundled.tickers[0]} ({len(frame)} rows), lookback 30", legacy, new)
+
+    long_frame = next(iter(synthetic_frames(1, args.long_days).values()))
+    legacy = measure(legacy_prepare_features, long_frame, 30)
+    new = measure(frame_design_matrix, long_frame, 30)
+    assert np.allclose(legacy[2][0], new[2][0], rtol=1e-9, atol=1e-6)
+    report(f"synthetic ({args.long_days} rows), lookback 30", legacy, new)
+
+    datasets = synthetic_frames(args.tickers, args.days)
+    legacy_batch = lambda: [legacy_prepare_features(data, lb) for data in datasets.values() for lb in args.lookbacks]
+    legacy = measure(legacy_batch)
+    new = measure(build_design_matrices, datasets, args.lookbacks)
+    report(f"batch {args.tickers} tickers x {len(args.lookbacks)} lookbacks", legacy, new)
+
+if __name__ == '__main__':
+    main()
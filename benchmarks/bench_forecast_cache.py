@@ -0,0 +1,109 @@
+"""
+Horizon scrubbing with and without the forecast trajectory cache
+
+Replays a user stepping the dashboard's forecast control through days,
+months and years and back, for each bundled ticker. Every cached
+forecast is checked to be identical to an uncached forecast_stock_prices
+call. Then it times each step three ways: with no cache (as before),
+with the cache on first visits (paths sliced or stepped on), and on
+revisits (kept frames). Finally it checks that a small memory budget is
+respected.
+
+    python benchmarks/bench_forecast_cache.py
+    python benchmarks/bench_forecast_cache.py --paths 500 --years 20
+"""
+import os
+import sys
+import time
+import atexit
+import shutil
+import argparse
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+warnings.filterwarnings('ignore')
+
+# Keep trained models out of the real registry while benchmarking
+_MODEL_DIR = tempfile.mkdtemp(prefix='stockoracle-bench-models-')
+os.environ['STOCKORACLE_MODEL_DIR'] = _MODEL_DIR
+atexit.register(shutil.rmtree, _MODEL_DIR, ignore_errors=True)
+
+from data_processor import load_structured_data, TickerPartitions
+from forecasting import forecast_stock_prices
+from forecast_cache import ForecastCache
+
+DATA_DIR = os.path.join(HERE, '..', 'data')
+DATA_PATH = os.path.join(DATA_DIR, 'refined_textual_data.csv')
+PRICE_PATH = os.path.join(DATA_DIR, 'stock_data_5_years.csv')
+
+def scrub_session(years):
+    """
+    Horizons in the order a user stepping the Days / Months / Years control visits them
+    """
+    forward = list(range(1, 31)) + [30 * m for m in range(1, 13)] + [365 * y for y in range(1, years + 1)]
+    return forward + forward[::-1]
+
+def percentiles(latencies):
+    ms = np.asarray(latencies) * 1e3
+    return np.percentile(ms, 50), np.percentile(ms, 95), ms.max(), ms.sum()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--paths', type=int, default=2000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--tickers', type=int, default=3, help='bundled tickers to replay')
+    parser.add_argument('--budget-mb', type=float, default=2.0, help='memory budget for the eviction check')
+    args = parser.parse_args()
+
+    partitions = TickerPartitions(load_structured_data(PRICE_PATH, DATA_PATH, compact=True))
+    tickers = partitions.tickers[:args.tickers]
+    session = scrub_session(args.years)
+    forward = session[:len(session) // 2]
+    forecast = lambda data, days, cache: forecast_stock_prices(data, days, seed=42, n_paths=args.paths, cache=cache)
+
+    # Train (or load) each model once so every mode below starts equal
+    for ticker in tickers:
+        forecast(partitions.get(ticker), 1, False)
+
+    timings = {'no cache': [], 'cache, first visit': [], 'cache, revisit': []}
+    cache = ForecastCache()
+    for ticker in tickers:
+        data = partitions.get(ticker)
+        for days in forward:
+            start = time.perf_counter()
+            expected = forecast(data, days, False)
+            timings['no cache'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            got = forecast(data, days, cache)
+            timings['cache, first visit'].append(time.perf_counter() - start)
+            pd.testing.assert_frame_equal(got, expected, check_exact=True)
+        for days in session[len(forward):]:
+            start = time.perf_counter()
+            got = forecast(data, days, cache)
+            timings['cache, revisit'].append(time.perf_counter() - start)
+            pd.testing.assert_frame_equal(got, forecast(data, days, False), check_exact=True)
+    print(f"{len(tickers)} tickers x {len(session)} horizon steps: cached forecasts match uncached ones")
+    print(f"cache: {cache.stats}, {cache.nbytes() / 2**20:.1f} MiB")
+
+    print(f"\n{'mode':<20} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total s':>9}")
+    for mode, latencies in timings.items():
+        p50, p95, worst, total = percentiles(latencies)
+        print(f"{mode:<20} {p50:9.2f} {p95:9.2f} {worst:9.2f} {total / 1e3:9.2f}")
+
+    # Every ticker through a small budget: least recently used trajectories go
+    budget = ForecastCache(int(args.budget_mb * 2**20))
+    for ticker in partitions.tickers:
+        data = partitions.get(ticker)
+        for days in (30, 365, 90):
+            forecast(data, days, budget)
+            assert budget.nbytes() <= budget.max_bytes, (ticker, days, budget.nbytes())
+    print(f"\n{args.budget_mb} MiB budget over {len(partitions.tickers)} tickers: "
+          f"{budget.nbytes() / 2**20:.2f} MiB held, {len(budget)} trajectories, {budget.stats['evictions']} evicted")
+
+if __name__ == '__main__':
+    main()
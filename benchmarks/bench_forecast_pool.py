@@ -0,0 +1,102 @@
+"""
+Interactive forecast latency with and without the background ForecastPool
+
+Replays a user flicking through tickers and horizons. The synchronous path
+calls forecast_stock_prices for every view, as app.py used to; the pooled
+path starts a ForecastPool, warms it and serves the same views from it
+(stale-while-revalidate), either straight away or after warming finishes.
+
+    python benchmarks/bench_forecast_pool.py
+    python benchmarks/bench_forecast_pool.py --views 200 --workers 4 --max-age 0.5
+"""
+import os
+import sys
+import time
+import atexit
+import shutil
+import argparse
+import tempfile
+import warnings
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+warnings.filterwarnings('ignore')
+
+# Keep trained models out of the real registry while benchmarking
+_MODEL_DIR = tempfile.mkdtemp(prefix='stockoracle-bench-models-')
+os.environ['STOCKORACLE_MODEL_DIR'] = _MODEL_DIR
+atexit.register(shutil.rmtree, _MODEL_DIR, ignore_errors=True)
+
+from data_processor import load_and_process_data, get_ticker_data, TickerPartitions
+from forecasting import forecast_stock_prices
+from forecast_pool import ForecastPool, COMMON_HORIZONS
+
+DATA_PATH = os.path.join(HERE, '..', 'data', 'refined_textual_data.csv')
+
+def browse_session(tickers, horizons, n_views, seed=0):
+    """
+    Random (ticker, days) views, mostly at the common horizons
+    """
+    rng = np.random.default_rng(seed)
+    return [(tickers[rng.integers(len(tickers))], horizons[rng.integers(len(horizons))])
+            for _ in range(n_views)]
+
+def percentiles(latencies):
+    ms = np.asarray(latencies) * 1e3
+    return np.percentile(ms, 50), np.percentile(ms, 95), ms.max()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--views', type=int, default=100)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--paths', type=int, default=2000)
+    parser.add_argument('--max-age', type=float, help='seconds before a served forecast is refreshed')
+    parser.add_argument('--think-time', type=float, default=0.05, help='seconds between views')
+    args = parser.parse_args()
+
+    partitions = TickerPartitions(load_and_process_data(DATA_PATH))
+    views = browse_session(partitions.tickers, COMMON_HORIZONS, args.views)
+
+    def forecast(data, days):
+        return forecast_stock_prices(data, days=days, seed=42, n_paths=args.paths, cache=False)
+
+    def data_fn(ticker):
+        return get_ticker_data(partitions, ticker)
+
+    results = {}
+
+    latencies = []
+    for ticker, days in views:
+        start = time.perf_counter()
+        forecast(data_fn(ticker), days)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(args.think_time)
+    results['synchronous'] = latencies
+
+    for label, wait_for_warm in [('pool, cold start', False), ('pool, warmed', True)]:
+        pool = ForecastPool(forecast, data_fn, workers=args.workers, max_age=args.max_age)
+        pool.warm(partitions.tickers)
+        if wait_for_warm:
+            while pool.metrics()['queue_depth'] or pool.metrics()['busy_workers']:
+                time.sleep(0.05)
+        latencies = []
+        for ticker, days in views:
+            start = time.perf_counter()
+            pool.get(ticker, days)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(args.think_time)
+        results[label] = latencies
+        metrics = pool.metrics()
+        pool.shutdown()
+        print(f"{label}: {metrics['fresh_hits']} fresh, {metrics['stale_hits']} stale, "
+              f"{metrics['misses']} misses, utilisation {metrics['utilization']:.0%}")
+
+    print(f"\n{args.views} views over {len(partitions.tickers)} tickers x {len(COMMON_HORIZONS)} horizons")
+    print(f"{'mode':<20} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for label, latencies in results.items():
+        p50, p95, worst = percentiles(latencies)
+        print(f"{label:<20} {p50:9.2f} {p95:9.2f} {worst:9.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Global cross-ticker GBM vs one GBM per ticker: accuracy and fit/predict time
+
+At each of --origins forecast origins per ticker (the last ones, --horizon
+days apart), both approaches train on the history before the origin and
+forecast the next --horizon closes:
+
+- per ticker: one HistGradientBoostingRegressor per ticker, as in
+  forecasting.ml_forecast, each stepped with recursive_forecast
+- global: one global_model.GlobalForecaster fitted on every ticker and
+  stepped for all of them with one predict per day
+
+Reports total fit and predict time, and the mean MAPE, RMSE and directional
+accuracy over tickers and origins. Runs on the bundled data and a synthetic
+universe.
+
+    python benchmarks/bench_global_model.py
+    python benchmarks/bench_global_model.py --tickers 500 --days 1250 --origins 1
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_features import synthetic_frames
+from backtest import forecast_errors
+from data_processor import load_structured_data, TickerPartitions
+from features import frame_design_matrix
+from forecasting import _fit_gbm, recursive_forecast
+from global_model import GlobalForecaster
+from model_registry import ModelRegistry
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DATA_PATH = os.path.join(DATA_DIR, 'refined_textual_data.csv')
+PRICE_PATH = os.path.join(DATA_DIR, 'stock_data_5_years.csv')
+
+def per_ticker(train, horizon, lookback, max_iter):
+    """
+    (paths, fit seconds, predict seconds) with one model per ticker
+    """
+    fit_s = predict_s = 0.0
+    paths = {}
+    for ticker, data in train.items():
+        start = time.perf_counter()
+        X, y, _ = frame_design_matrix(data, lookback)
+        model = _fit_gbm(X, y, max_iter)
+        fit_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        last = data.sort_values('date').tail(lookback)
+        exog = [last['volume'].iloc[-1], last['sentiment_value'].iloc[-1]]
+        paths[ticker] = recursive_forecast(model, last['close'].to_numpy(dtype=float), exog, horizon)[0]
+        predict_s += time.perf_counter() - start
+    return paths, fit_s, predict_s
+
+def global_model(train, horizon, lookback, max_iter, model_dir):
+    """
+    (paths, fit seconds, predict seconds) with one model for every ticker
+    """
+    start = time.perf_counter()
+    forecaster = GlobalForecaster(lookback, max_iter, registry=ModelRegistry(model_dir)).fit(train)
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    paths = forecaster.forecast_all(train, horizon)
+    return paths, fit_s, time.perf_counter() - start
+
+def evaluate(label, datasets, args):
+    totals = {name: {'fit': 0.0, 'predict': 0.0, 'errors': []} for name in ('per ticker', 'global')}
+    with tempfile.TemporaryDirectory() as model_dir:
+        for k in range(args.origins, 0, -1):
+            cut = k * args.horizon
+            train = {t: d.iloc[:-cut] for t, d in datasets.items() if len(d) > cut + args.lookback + 1}
+            actual = {t: datasets[t]['close'].to_numpy(dtype=float)[len(train[t]):len(train[t]) + args.horizon]
+                      for t in train}
+            runs = {
+                'per ticker': per_ticker(train, args.horizon, args.lookback, args.ticker_iter),
+                'global': global_model(train, args.horizon, args.lookback, args.global_iter, model_dir)
+            }
+            for name, (paths, fit_s, predict_s) in runs.items():
+                totals[name]['fit'] += fit_s
+                totals[name]['predict'] += predict_s
+                for ticker, path in paths.items():
+                    last_price = float(train[ticker]['close'].iloc[-1])
+                    totals[name]['errors'].append(forecast_errors(path, actual[ticker], last_price))
+
+    print(f"\n{label}: {len(datasets)} tickers, {args.origins} origins, {args.horizon}-day horizon")
+    print(f"{'model':<12} {'fit s':>8} {'predict s':>10} {'total s':>8} {'MAPE %':>8} {'RMSE':>9} {'direction':>10}")
+    for name, result in totals.items():
+        mape, rmse, direction = np.nanmean(np.array(result['errors']), axis=0)
+        print(f"{name:<12} {result['fit']:8.2f} {result['predict']:10.2f} {result['fit'] + result['predict']:8.2f} "
+              f"{mape:8.2f} {rmse:9.2f} {direction:10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=100, help='synthetic universe size')
+    parser.add_argument('--days', type=int, default=1250)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--origins', type=int, default=3)
+    parser.add_argument('--lookback', type=int, default=30)
+    parser.add_argument('--ticker-iter', type=int, default=50, help='max_iter of each per-ticker model (ml_forecast uses 50)')
+    parser.add_argument('--global-iter', type=int, default=100)
+    args = parser.parse_args()
+
+    partitions = TickerPartitions(load_structured_data(PRICE_PATH, DATA_PATH))
+    evaluate('bundled', {t: partitions.get(t) for t in partitions.tickers}, args)
+    evaluate('synthetic', synthetic_frames(args.tickers, args.days), args)
+
+if __name__ == '__main__':
+    main()
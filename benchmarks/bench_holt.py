@@ -0,0 +1,71 @@
+"""
+Timing of holt.HoltLinear against statsmodels
+
+For every bundled ticker, fits statsmodels' ExponentialSmoothing(trend='add')
+and HoltLinear on the same closes and reports the SSE ratio and the largest
+relative gap in the 365-day forecast, then times a warm-started refit and an
+incremental update after new bars arrive. Parity with statsmodels is tested
+in tests/test_holt.py.
+
+    python benchmarks/bench_holt.py
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+warnings.filterwarnings('ignore')
+
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from data_processor import load_and_process_data, TickerPartitions
+from holt import HoltLinear
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'refined_textual_data.csv')
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--horizon', type=int, default=365)
+    parser.add_argument('--new-bars', type=int, default=5,
+                        help='bars held back and then appended for the warm/update timings')
+    args = parser.parse_args()
+
+    data = TickerPartitions(load_and_process_data(DATA_PATH))
+    print(f"{'ticker':>6} {'sm fit ms':>10} {'cold ms':>8} {'warm ms':>8} {'update ms':>10} "
+          f"{'sse ratio':>10} {'max rel diff':>13}")
+    totals = np.zeros(4)
+    for ticker in data.tickers:
+        y = data.get(ticker)['close'].to_numpy(dtype=float)
+        head = y[:-args.new_bars]
+
+        sm_s, sm = timed(lambda: ExponentialSmoothing(
+            y, trend='add', seasonal=None, initialization_method='estimated').fit(optimized=True))
+        cold_s, model = timed(HoltLinear().fit, y)
+
+        # New bars arriving: re-estimate from the previous parameters, or just
+        # push them through the state without touching alpha/beta
+        warm = HoltLinear().fit(head)
+        warm_s, _ = timed(warm.fit, y)
+        incremental = HoltLinear().fit(head)
+        update_s, _ = timed(incremental.update, y[-args.new_bars:])
+
+        ratio = model.sse / sm.sse
+        expected = np.asarray(sm.forecast(args.horizon))
+        rel = np.max(np.abs(model.forecast(args.horizon) - expected) / np.abs(expected))
+
+        totals += [sm_s, cold_s, warm_s, update_s]
+        print(f"{ticker:>6} {sm_s * 1e3:10.2f} {cold_s * 1e3:8.2f} {warm_s * 1e3:8.2f} "
+              f"{update_s * 1e3:10.3f} {ratio:10.6f} {rel:13.2e}")
+
+    print(f"{'total':>6} {totals[0] * 1e3:10.2f} {totals[1] * 1e3:8.2f} {totals[2] * 1e3:8.2f} "
+          f"{totals[3] * 1e3:10.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Incremental feature engine vs batch recomputation
+
+Times one new bar both ways: an O(1) append to features.IncrementalFeatures
+against rebuilding the whole design matrix, for the bundled data and a long
+synthetic series. That the appended rows equal forecasting.prepare_features
+(and the running SMA / RSI the structured file's columns) is tested in
+tests/test_features.py.
+
+    python benchmarks/bench_incremental_features.py
+    python benchmarks/bench_incremental_features.py --long-days 200000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from bench_features import synthetic_frames
+from data_processor import load_structured_data, TickerPartitions
+from features import IncrementalFeatures, frame_columns, frame_design_matrix
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DATA_PATH = os.path.join(DATA_DIR, 'refined_textual_data.csv')
+PRICE_PATH = os.path.join(DATA_DIR, 'stock_data_5_years.csv')
+
+def time_new_bar(data, lookback, repeat):
+    """
+    Seconds per new bar: a full batch rebuild vs one incremental append
+    """
+    _, close, volume, sentiment, valid = frame_columns(data)
+    state = IncrementalFeatures(lookback)
+    state.extend(close[:-1], volume[:-1], sentiment[:-1], valid[:-1])
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        frame_design_matrix(data, lookback)
+    batch = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        state.append(close[-1], volume[-1], sentiment[-1])
+    incremental = (time.perf_counter() - start) / repeat
+    return batch, incremental
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--long-days', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    partitions = TickerPartitions(load_structured_data(PRICE_PATH, DATA_PATH))
+    long_frame = next(iter(synthetic_frames(1, args.long_days).values()))
+
+    print(f"{'case':<36} {'batch ms/bar':>13} {'append us/bar':>14} {'speedup':>9} {'state KiB':>10}")
+    ticker = partitions.tickers[0]
+    cases = [(f"{ticker} ({len(partitions.get(ticker))} rows)", partitions.get(ticker)),
+             (f"synthetic ({args.long_days} rows)", long_frame)]
+    for label, data in cases:
+        batch, incremental = time_new_bar(data, 30, args.repeat)
+        print(f"{label:<36} {batch * 1e3:13.3f} {incremental * 1e6:14.1f} {batch / incremental:8.0f}x "
+              f"{IncrementalFeatures(30).nbytes() / 1024:10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Ingestion scaling benchmark for data_processor.load_and_process_data
+
+Compares the legacy multi-regex / per-ticker-mask loader against the single
+pass parser, in whole-file and chunked mode, on synthetic universes.
+
+    python benchmarks/bench_ingest.py
+    python benchmarks/bench_ingest.py --sizes 10x1257 1000x1000 2000x1500
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import synthetic
+from data_processor import load_and_process_data
+
+def legacy_load(file_path):
+    """
+    The pre-rewrite loader: three regex passes and an O(tickers x rows) fill loop
+    """
+    data = pd.read_csv(file_path)
+    data['date'] = pd.to_datetime(data['date'])
+    data = data.sort_values(['ticker', 'date'])
+    data['price'] = data['original'].str.extract(r'higher at (\d+\.\d+)', expand=False).astype(float)
+    price_mask = data['price'].isna()
+    if price_mask.any():
+        alt_prices = data.loc[price_mask, 'original'].str.extract(r'dropping to (\d+\.\d+)', expand=False).astype(float)
+        data.loc[price_mask, 'price'] = alt_prices
+    data['volume'] = data['original'].str.extract(r'volume (?:of|surging at) (\d+)', expand=False).astype(float)
+    data['close'] = data['price']
+    for ticker in data['ticker'].unique():
+        ticker_mask = data['ticker'] == ticker
+        data.loc[ticker_mask, 'close'] = data.loc[ticker_mask, 'close'].ffill().bfill()
+    data['daily_return'] = data.groupby('ticker')['close'].pct_change() * 100
+    data['daily_return'] = data['daily_return'].fillna(0)
+    data['sentiment_value'] = data['senti_label'].map({'bullish': 1, 'bearish': -1, 'neutral': 0})
+    data = data.fillna({'volume': data['volume'].median(), 'sentiment_value': 0})
+    return data
+
+def time_call(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def parse_size(text):
+    tickers, days = text.lower().split('x')
+    return int(tickers), int(days)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['10x1257', '100x1250', '1000x1000', '2000x1500'],
+                        help='universe sizes as TICKERSxDAYS')
+    parser.add_argument('--chunk-size', type=int, default=250_000)
+    parser.add_argument('--legacy-max-rows', type=int, default=1_500_000,
+                        help='skip the legacy loader above this many rows')
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'rows':>10} {'legacy s':>10} {'single s':>10} {'chunked s':>10} {'speedup':>8} {'Mrows/s':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            n_tickers, n_days = parse_size(size)
+            path = os.path.join(tmp, f'textual_{n_tickers}x{n_days}.csv')
+            rows = synthetic.write_textual_csv(path, n_tickers, n_days)
+
+            single_s, single = time_call(load_and_process_data, path)
+            chunked_s, chunked = time_call(load_and_process_data, path, chunk_size=args.chunk_size)
+            pd.testing.assert_frame_equal(single, chunked)
+
+            if rows <= args.legacy_max_rows:
+                legacy_s, legacy = time_call(legacy_load, path)
+                pd.testing.assert_frame_equal(legacy, single)
+                legacy_txt, speedup = f"{legacy_s:10.3f}", f"{legacy_s / single_s:7.1f}x"
+            else:
+                legacy_txt, speedup = f"{'skipped':>10}", f"{'-':>8}"
+
+            print(f"{n_tickers:>8} {rows:>10} {legacy_txt} {single_s:10.3f} {chunked_s:10.3f} {speedup} "
+                  f"{rows / single_s / 1e6:8.2f}")
+
+if __name__ == '__main__':
+    main()
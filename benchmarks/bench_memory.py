@@ -0,0 +1,73 @@
+"""
+Memory footprint of the processed frame, full vs compact representation
+
+Loads the bundled data and synthetic universes both ways and prints bytes
+per row for each column and in total, warm (cached) load times, and the size
+of the lazily loaded text side store.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --sizes 500x1250 --columns
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import synthetic
+from data_processor import load_and_process_data, load_text_store, memory_report
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'refined_textual_data.csv')
+
+def parse_size(text):
+    tickers, days = text.lower().split('x')
+    return int(tickers), int(days)
+
+def warm_load_seconds(path, cache_dir, compact):
+    # The first call fills the cache; time the second
+    load_and_process_data(path, cache_dir=cache_dir, compact=compact)
+    start = time.perf_counter()
+    load_and_process_data(path, cache_dir=cache_dir, compact=compact)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='*', default=['100x1250', '1000x1250'],
+                        help='synthetic universe sizes as TICKERSxDAYS')
+    parser.add_argument('--columns', action='store_true', help='print the per-column breakdown')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sources = [('bundled', DATA_PATH)]
+        for size in args.sizes:
+            tickers, days = parse_size(size)
+            path = os.path.join(workdir, f'synthetic_{size}.csv')
+            synthetic.write_textual_csv(path, tickers, days)
+            sources.append((f'synthetic {size}', path))
+
+        print(f"{'data':<22} {'rows':>9} {'full B/row':>11} {'compact B/row':>14} {'ratio':>6} "
+              f"{'full MiB':>9} {'compact MiB':>12} {'warm full s':>12} {'warm compact s':>15} {'text store MiB':>15}")
+        for label, path in sources:
+            full = memory_report(load_and_process_data(path))
+            compact = memory_report(load_and_process_data(path, compact=True))
+            cache_dir = os.path.join(workdir, 'cache', label.replace(' ', '_'))
+            full_s = warm_load_seconds(path, cache_dir, False)
+            compact_s = warm_load_seconds(path, cache_dir, True)
+
+            store = load_text_store(path, cache_dir)
+            store.get([0])
+            rows = full['bytes'].loc['total'] / full['bytes_per_row'].loc['total']
+            print(f"{label:<22} {int(rows):>9} {full['bytes_per_row'].loc['total']:11.1f} "
+                  f"{compact['bytes_per_row'].loc['total']:14.1f} "
+                  f"{full['bytes'].loc['total'] / compact['bytes'].loc['total']:5.1f}x "
+                  f"{full['bytes'].loc['total'] / 2**20:9.1f} {compact['bytes'].loc['total'] / 2**20:12.1f} "
+                  f"{full_s:12.3f} {compact_s:15.3f} {store.nbytes() / 2**20:15.1f}")
+            if args.columns:
+                print(pd.concat({'full': full, 'compact': compact}, axis=1).to_string())
+                print()
+
+if __name__ == '__main__':
+    main()
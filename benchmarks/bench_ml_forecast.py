@@ -0,0 +1,94 @@
+"""
+Recursive GBM forecast benchmark for forecasting.ml_forecast
+
+Times the legacy one-row-per-step loop against the ring-buffer engine on a
+bundled ticker and checks that both produce the same path.
+
+    python benchmarks/bench_ml_forecast.py
+    python benchmarks/bench_ml_forecast.py --ticker MSFT --horizons 1 30 365
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import warnings
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+warnings.filterwarnings('ignore')
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+from data_processor import load_and_process_data, get_ticker_data
+from forecasting import prepare_features, train_ml_model, recursive_forecast
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'refined_textual_data.csv')
+
+def legacy_loop(model, last_window, days, lookback):
+    """
+    The pre-rewrite forecast loop: a Python list row and one predict per day
+    """
+    last_values = last_window['close'].tolist()
+    last_vol = last_window['volume'].iloc[-1]
+    last_sent = last_window['sentiment_value'].iloc[-1]
+    forecast = []
+    for i in range(days):
+        row = last_values[-lookback:] + [last_vol, last_sent,
+                                          np.std(last_values),
+                                          last_values[-1] - last_values[0]]
+        pred = model.predict(np.array(row).reshape(1, -1))[0]
+        forecast.append(pred)
+        last_values.append(pred)
+    return np.array(forecast)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ticker', default='AAPL')
+    parser.add_argument('--horizons', nargs='+', type=int, default=[1, 30, 365, 36500])
+    parser.add_argument('--lookback', type=int, default=30)
+    parser.add_argument('--max-iter', type=int, default=50)
+    parser.add_argument('--scenarios', type=int, default=64,
+                        help='number of volume/sentiment scenarios stepped together')
+    parser.add_argument('--legacy-max-days', type=int, default=36500)
+    args = parser.parse_args()
+
+    data = get_ticker_data(load_and_process_data(DATA_PATH), args.ticker)
+    df_feat, features = prepare_features(data, args.lookback)
+    model = train_ml_model(df_feat[features].values, df_feat['close'].values, args.max_iter)
+
+    last_window = data.sort_values('date').tail(args.lookback)
+    window = last_window['close'].to_numpy(dtype=float)
+    exog = [last_window['volume'].iloc[-1], last_window['sentiment_value'].iloc[-1]]
+    rng = np.random.default_rng(0)
+    scenario_exog = np.column_stack([
+        rng.uniform(0.5, 1.5, args.scenarios) * exog[0],
+        rng.integers(-1, 2, args.scenarios)
+    ])
+    scenario_windows = np.repeat(window[None, :], args.scenarios, axis=0)
+
+    print(f"{'days':>7} {'legacy s':>10} {'engine s':>10} {'speedup':>8} {'max |diff|':>11} "
+          f"{f'{args.scenarios} scen. s':>13} {'s/scenario':>11}")
+    for days in args.horizons:
+        start = time.perf_counter()
+        fast = recursive_forecast(model, window, exog, days)[0]
+        fast_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        recursive_forecast(model, scenario_windows, scenario_exog, days)
+        batch_s = time.perf_counter() - start
+
+        if days <= args.legacy_max_days:
+            start = time.perf_counter()
+            slow = legacy_loop(model, last_window, days, args.lookback)
+            legacy_s = time.perf_counter() - start
+            legacy_txt = f"{legacy_s:10.3f}"
+            speedup = f"{legacy_s / fast_s:7.1f}x"
+            diff = f"{np.max(np.abs(slow - fast)):11.2e}"
+        else:
+            legacy_txt, speedup, diff = f"{'skipped':>10}", f"{'-':>8}", f"{'-':>11}"
+
+        print(f"{days:>7} {legacy_txt} {fast_s:10.3f} {speedup} {diff} "
+              f"{batch_s:13.3f} {batch_s / args.scenarios:11.4f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Per-ticker partition store vs the in-memory loaders: equality and peak memory
+
+Builds partition_store stores from the bundled data (textual and structured
+sources) and from synthetic universes. Every ticker is checked against
+TickerPartitions over the in-memory load. Then peak traced memory and time
+are compared for loading everything, building the store chunk by chunk,
+and opening the store and reading one ticker cold and hot.
+
+    python benchmarks/bench_partition_store.py
+    python benchmarks/bench_partition_store.py --sizes 100x1250 2000x1250 --chunk-size 50000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import synthetic
+from data_processor import load_and_process_data, load_structured_data, TickerPartitions
+from partition_store import PartitionStore, build_partition_store
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DATA_PATH = os.path.join(DATA_DIR, 'refined_textual_data.csv')
+PRICE_PATH = os.path.join(DATA_DIR, 'stock_data_5_years.csv')
+
+def parse_size(text):
+    tickers, days = text.lower().split('x')
+    return int(tickers), int(days)
+
+def traced(fn):
+    """
+    (result, seconds, peak MiB of Python/numpy allocations) for fn()
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+def same_values(a, b):
+    if isinstance(a.dtype, pd.CategoricalDtype) or isinstance(b.dtype, pd.CategoricalDtype) or a.dtype == object:
+        return np.array_equal(a.astype(object).fillna('').to_numpy(), b.astype(object).fillna('').to_numpy())
+    if pd.api.types.is_datetime64_any_dtype(a):
+        return np.array_equal(a.to_numpy(), b.to_numpy())
+    return np.array_equal(a.to_numpy(dtype=np.float64), b.to_numpy(dtype=np.float64), equal_nan=True)
+
+def check_store(store, partitions):
+    """
+    Assert the store serves exactly what TickerPartitions does
+    """
+    assert store.tickers == partitions.tickers
+    assert len(store) == len(partitions)
+    assert store.next_label() == partitions.next_label()
+    assert store.median_volume() == partitions.median_volume()
+    for ticker in partitions.tickers:
+        got, expected = store.get(ticker), partitions.get(ticker)
+        assert list(got.columns) == list(expected.columns), ticker
+        assert got.index.equals(expected.index), ticker
+        for name in expected.columns:
+            assert same_values(got[name], expected[name]), (ticker, name)
+        assert store.last_close(ticker) == partitions.last_close(ticker), ticker
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='*', default=['100x1250', '500x1250'],
+                        help='synthetic universe sizes as TICKERSxDAYS')
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--max-partitions', type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sources = [('bundled text', DATA_PATH, None), ('bundled structured', DATA_PATH, PRICE_PATH)]
+        for size in args.sizes:
+            tickers, days = parse_size(size)
+            path = os.path.join(workdir, f'synthetic_{size}.csv')
+            synthetic.write_textual_csv(path, tickers, days)
+            sources.append((f'synthetic {size}', path, None))
+
+        rows = []
+        for label, text_path, price_path in sources:
+            directory = os.path.join(workdir, 'stores', label.replace(' ', '_'))
+            if price_path is not None:
+                data, load_s, load_mib = traced(lambda: load_structured_data(price_path, text_path, compact=True))
+            else:
+                data, load_s, load_mib = traced(lambda: load_and_process_data(text_path, compact=True))
+            partitions = TickerPartitions(data)
+            frame_mib = data.memory_usage(deep=True).sum() / 2**20
+            del data
+
+            _, build_s, build_mib = traced(lambda: build_partition_store(directory, text_path, price_path, args.chunk_size))
+            store, open_s, open_mib = traced(lambda: PartitionStore(directory, args.max_partitions))
+            ticker = store.tickers[len(store.tickers) // 2]
+            _, cold_s, cold_mib = traced(lambda: store.get(ticker))
+            _, hot_s, _ = traced(lambda: store.get(ticker))
+
+            check_store(PartitionStore(directory, args.max_partitions), partitions)
+            # Reading every ticker keeps at most max_partitions of them loaded
+            for t in store.tickers:
+                store.get(t)
+            assert len(store.cached()) == min(args.max_partitions, len(store.tickers))
+            rows.append({
+                'data': label,
+                'rows': len(partitions),
+                'tickers': len(store.tickers),
+                'frame MiB': frame_mib,
+                'load s': load_s,
+                'load peak MiB': load_mib,
+                'build s': build_s,
+                'build peak MiB': build_mib,
+                'open ms': open_s * 1e3,
+                'cold get ms': cold_s * 1e3,
+                'get peak MiB': max(open_mib, cold_mib),
+                'hot get ms': hot_s * 1e3,
+                'LRU MiB': store.nbytes() / 2**20
+            })
+            print(f"{label}: {len(store.tickers)} tickers match the in-memory load")
+
+    pd.set_option('display.width', 200)
+    print()
+    print(pd.DataFrame(rows).set_index('data').round(2).to_string())
+
+if __name__ == '__main__':
+    main()
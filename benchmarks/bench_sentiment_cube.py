@@ -0,0 +1,169 @@
+"""
+Sentiment aggregate cube vs rescanning rows, with an equivalence check
+
+Builds sentiment_cube.SentimentCube over the bundled data and a synthetic
+universe. Window counts and rolling bullish shares are checked against
+pandas on the raw rows. A cube grown by daily, out-of-order and
+new-ticker appends is checked against one built in a single pass. Then
+date-window, cross-ticker and rolling-ratio queries are timed against
+rescanning the rows each time, as the dashboard used to.
+
+    python benchmarks/bench_sentiment_cube.py
+    python benchmarks/bench_sentiment_cube.py --tickers 1000 --days 1260
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from synthetic import make_textual_frame
+from data_processor import load_structured_data
+from sentiment_cube import SentimentCube
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DATA_PATH = os.path.join(DATA_DIR, 'refined_textual_data.csv')
+PRICE_PATH = os.path.join(DATA_DIR, 'stock_data_5_years.csv')
+
+def random_windows(data, n, seed=0):
+    rng = np.random.default_rng(seed)
+    days = np.sort(data['date'].unique())
+    for _ in range(n):
+        i, j = np.sort(rng.integers(0, len(days), size=2))
+        yield pd.Timestamp(days[i]), pd.Timestamp(days[j])
+
+def rescan_counts(data, field, start, end):
+    window = data[(data['date'] >= start) & (data['date'] <= end)]
+    return window.groupby(['ticker', field], observed=True).size().unstack(fill_value=0)
+
+def check_counts(cube, data, windows=50):
+    """
+    Assert window counts equal a groupby over the rows in the window
+    """
+    for field in cube.fields:
+        for start, end in random_windows(data, windows):
+            counts = cube.counts(field, start=start, end=end)
+            expected = rescan_counts(data, field, start, end)
+            expected = expected.reindex(index=counts.index, columns=counts.columns, fill_value=0)
+            assert np.array_equal(counts.to_numpy(), expected.to_numpy()), (field, start, end)
+
+def check_ratio(cube, data, tickers, window):
+    """
+    Assert rolling_ratio equals rolling sums of daily bullish / bearish counts
+    """
+    ratios = cube.rolling_ratio(tickers, window)
+    daily = data[data['ticker'].isin(tickers)].groupby(['date', 'ticker', 'senti_label'], observed=True).size()
+    for ticker in tickers:
+        counts = daily.xs(ticker, level='ticker').unstack(fill_value=0).reindex(ratios.index, fill_value=0)
+        pos = counts.get('bullish', 0).rolling(window, min_periods=1).sum()
+        neg = counts.get('bearish', 0).rolling(window, min_periods=1).sum()
+        expected = (pos / (pos + neg)).where(pos + neg > 0)
+        assert np.allclose(ratios[ticker], expected, equal_nan=True), ticker
+
+def check_appends(data, full):
+    """
+    Assert a cube grown by appends matches one built from all rows at once
+    """
+    data = data.sort_values('date', kind='stable')
+    days = np.sort(data['date'].unique())
+    cut = days[int(len(days) * 0.8)]
+    last_ticker = data['ticker'].astype(str).max()
+    base = data[(data['date'] < cut) & (data['ticker'].astype(str) != last_ticker)]
+    # Every 9th row of the base period arrives late, out of date order
+    late = base.iloc[::9]
+    cube = SentimentCube.from_frame(base.drop(late.index))
+    rest = data.drop(base.index)
+    for _, rows in rest.groupby('date', sort=True):
+        cube.append(rows)
+    cube.append(late)
+    for field in full.fields:
+        got = cube.counts(field)
+        expected = full.counts(field)
+        assert np.array_equal(got.loc[expected.index, expected.columns].to_numpy(), expected.to_numpy()), field
+        for start, end in random_windows(data, 20, seed=1):
+            got = cube.counts(field, start=start, end=end)
+            expected = full.counts(field, start=start, end=end)
+            assert np.array_equal(got.loc[expected.index, expected.columns].to_numpy(), expected.to_numpy())
+    return len(rest) + len(late)
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def time_queries(label, cube, data, ticker, repeat):
+    start, end = list(random_windows(data, 1, seed=2))[0]
+    tickers = cube.tickers
+
+    def rescan_distribution():
+        rows = data[(data['ticker'] == ticker) & (data['date'] >= start) & (data['date'] <= end)]
+        counts = rows['emo_label'].value_counts()
+        return counts[counts > 0]
+
+    def rescan_ratio():
+        rows = data[data['ticker'] == ticker]
+        daily = rows.groupby(['date', 'senti_label'], observed=True).size().unstack(fill_value=0)
+        pos = daily.get('bullish', 0).rolling(20, min_periods=1).sum()
+        neg = daily.get('bearish', 0).rolling(20, min_periods=1).sum()
+        return pos / (pos + neg)
+
+    cases = [
+        ('window distribution', rescan_distribution, lambda: cube.distribution(ticker, 'emo_label', start, end)),
+        ('all-ticker comparison', lambda: rescan_counts(data, 'senti_label', start, end),
+         lambda: cube.counts('senti_label', tickers, start, end)),
+        ('rolling bullish share', rescan_ratio, lambda: cube.rolling_ratio([ticker], 20)),
+        ('monthly buckets', lambda: data[data['ticker'] == ticker].groupby(
+            [pd.Grouper(key='date', freq='MS'), 'senti_label'], observed=True).size().unstack(fill_value=0),
+         lambda: cube.bucket_counts('senti_label', ticker, 'M'))
+    ]
+    for name, rescan, query in cases:
+        slow, fast = best_of(rescan, repeat), best_of(query, repeat)
+        print(f"{label:<22} {name:<24} {slow * 1e3:10.2f} {fast * 1e3:10.3f} {slow / fast:8.0f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--days', type=int, default=1260)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    bundled = load_structured_data(PRICE_PATH, DATA_PATH, compact=True)
+    synthetic = make_textual_frame(args.tickers, args.days)
+    synthetic['date'] = pd.to_datetime(synthetic['date'])
+
+    cubes = []
+    for label, data in [('bundled', bundled), (f'synthetic x{args.tickers}', synthetic)]:
+        start = time.perf_counter()
+        cube = SentimentCube.from_frame(data)
+        build = time.perf_counter() - start
+        check_counts(cube, data)
+        check_ratio(cube, data, cube.tickers[:5], 20)
+        appended = check_appends(data, cube)
+        print(f"{label}: {len(data)} rows, built in {build * 1e3:.0f} ms ({cube.nbytes / 2**20:.1f} MiB); "
+              f"window counts, rolling shares and {appended} appended rows match")
+        cubes.append((label, cube, data))
+
+    # Streamed days: every ticker gets a row after the last date. The first
+    # append past the built calendar also grows its spare capacity
+    label, cube, data = cubes[-1]
+    last = data[data['date'] == data['date'].max()]
+    timings = []
+    for day in range(1, 21):
+        start = time.perf_counter()
+        cube.append(last.assign(date=last['date'] + pd.Timedelta(days=day)))
+        timings.append(time.perf_counter() - start)
+    print(f"{label}: appending a day for {len(last)} tickers took {np.median(timings) * 1e3:.2f} ms "
+          f"(median of {len(timings)}, first {timings[0] * 1e3:.2f} ms)")
+
+    print(f"\n{'data':<22} {'query':<24} {'rescan ms':>10} {'cube ms':>10} {'speedup':>9}")
+    for label, cube, data in cubes:
+        time_queries(label, cube, data, cube.tickers[0], args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Import time and cold start of the headless modules, in fresh interpreters
+
+Every measurement runs in a new Python process, so nothing is already
+imported or cached. Reports best-of-N import time per module and which
+heavy dependencies (Streamlit, scikit-learn, SciPy, Plotly) each import
+pulls in, and asserts the headless modules pull in none of them. Then
+times the first forecast from core with the in-process and the disk
+cache backends. run_benchmarks.py tracks the same measurements as
+startup/* stages against its baseline.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Imported lazily by the modules below; the dashboard alone needs them all
+HEAVY = ('streamlit', 'sklearn', 'scipy', 'plotly', 'statsmodels')
+
+# Modules batch jobs import; none of them may import a HEAVY module
+HEADLESS = ('instrumentation', 'features', 'holt', 'data_processor', 'forecasting', 'global_model',
+            'partition_store', 'sentiment_cube', 'streaming', 'forecast_service', 'cache_backend', 'core',
+            'ensemble', 'forecast_cache')
+
+# Timed in the child: `setup` is not counted, `body` is
+CHILD = """
+import sys, time, json
+sys.path.insert(0, {src!r})
+{setup}
+start = time.perf_counter()
+{body}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def run_child(body, setup='', env=None):
+    """
+    {'seconds', 'heavy'} for body timed in a new interpreter
+    """
+    code = CHILD.format(src=os.path.abspath(SRC_DIR), setup=setup, body=body, heavy=HEAVY)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            env={**os.environ, **(env or {})}).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def best_child(body, repeat, setup='', env=None):
+    runs = [run_child(body, setup, env) for _ in range(repeat)]
+    return min(runs, key=lambda run: run['seconds'])
+
+def import_seconds(module, repeat=1):
+    """
+    Best-of-repeat time to import module in a fresh interpreter
+    """
+    return best_child(f'import {module}', repeat)['seconds']
+
+def first_forecast_seconds(backend='memory', cache_dir=None, repeat=1):
+    """
+    Best-of-repeat time from a fresh interpreter to core.forecast('AAPL', 30), imports included
+    """
+    setup = 'import cache_backend'
+    if backend == 'disk':
+        setup += f'\ncache_backend.set_backend(cache_backend.DiskCache({cache_dir!r}))'
+    else:
+        setup += f'\ncache_backend.set_backend({backend!r})'
+    return best_child("import core\ncore.forecast('AAPL', 30)", repeat, setup)['seconds']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':<20} {'import ms':>10}  heavy dependencies loaded")
+    for module in HEADLESS + ('visualization', 'streamlit', 'sklearn.ensemble', 'scipy.optimize'):
+        run = best_child(f'import {module}', args.repeat)
+        print(f"{module:<20} {run['seconds'] * 1e3:10.1f}  {', '.join(run['heavy']) or '-'}")
+        if module in HEADLESS:
+            assert not run['heavy'], (module, run['heavy'])
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold_disk = first_forecast_seconds('disk', cache_dir)
+        print(f"\n{'first forecast':<32} {'ms':>8}")
+        print(f"{'memory backend':<32} {first_forecast_seconds('memory', repeat=args.repeat) * 1e3:8.0f}")
+        print(f"{'disk backend, empty cache':<32} {cold_disk * 1e3:8.0f}")
+        print(f"{'disk backend, warm cache':<32} {first_forecast_seconds('disk', cache_dir, args.repeat) * 1e3:8.0f}")
+
+if __name__ == '__main__':
+    main()
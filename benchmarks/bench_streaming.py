@@ -0,0 +1,119 @@
+"""
+Tail-and-ingest streaming: correctness and ingest-to-refresh latency
+
+Splits the bundled textual data into a base file (all but the last --tail
+days of every ticker) and a feed of the held-back rows. The base is loaded
+and partitioned, a forecast pool is warmed on it, and the feed is appended
+to the CSV in small batches while a StreamIngestor tails it. Afterwards
+every ticker's rows must equal a batch load of the whole file. Reports
+ingest and ingest-to-refresh latency, next to the cost of the batch path:
+reloading the whole CSV.
+
+    python benchmarks/bench_streaming.py
+    python benchmarks/bench_streaming.py --tail 40 --batch-rows 5 --interval 0.05 --compact
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from data_processor import load_and_process_data, extract_price_volume, TickerPartitions
+from forecast_pool import ForecastPool
+from forecasting import forecast_stock_prices
+from streaming import CsvTail, StreamIngestor
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'refined_textual_data.csv')
+
+def split_feed(raw, tail):
+    """
+    (base rows, feed rows in date order) holding back each ticker's last `tail` days
+    """
+    dates = pd.to_datetime(raw['date'])
+    rank = dates.groupby(raw['ticker']).rank(method='first', ascending=False)
+    held = rank <= tail
+    feed = raw[held].assign(_date=dates[held]).sort_values(['_date', 'ticker'], kind='stable')
+    return raw[~held], feed.drop(columns='_date')
+
+def compare(partitions, full, tickers, feed):
+    """
+    Assert streamed partitions match a batch load, ignoring row labels
+
+    Missing volumes are filled with the median of whatever was loaded, which
+    differs between the base file and the whole file, so volume is compared
+    only where the sentence gave one.
+    """
+    expected = TickerPartitions(full)
+    _, parsed_volume = extract_price_volume(feed['original'])
+    stated = set(zip(feed['ticker'][~np.isnan(parsed_volume)], pd.to_datetime(feed['date'])[~np.isnan(parsed_volume)]))
+    for ticker in tickers:
+        got = partitions.get(ticker).reset_index(drop=True)
+        want = expected.get(ticker).reset_index(drop=True)[got.columns]
+        for name in ('ticker', 'emo_label', 'senti_label'):
+            got[name] = got[name].astype(object)
+            want[name] = want[name].astype(object)
+        streamed = np.array([(ticker, d) in stated for d in got['date']])
+        assert np.allclose(got['volume'][streamed], want['volume'][streamed])
+        pd.testing.assert_frame_equal(got.drop(columns='volume'), want.drop(columns='volume'),
+                                      check_dtype=False, rtol=1e-6)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tail', type=int, default=20, help='days per ticker fed through the stream')
+    parser.add_argument('--batch-rows', type=int, default=10, help='rows appended to the CSV at a time')
+    parser.add_argument('--interval', type=float, default=0.05, help='ingestor poll interval (s)')
+    parser.add_argument('--horizons', nargs='+', type=int, default=[1, 30])
+    parser.add_argument('--paths', type=int, default=200, help='Monte Carlo paths per forecast')
+    parser.add_argument('--compact', action='store_true', help='stream into the compact representation')
+    args = parser.parse_args()
+
+    raw = pd.read_csv(DATA_PATH)
+    base, feed = split_feed(raw, args.tail)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'feed.csv')
+        base.to_csv(path, index=False)
+        partitions = TickerPartitions(load_and_process_data(path, compact=args.compact))
+        pool = ForecastPool(
+            lambda data, days: forecast_stock_prices(data, days, seed=42, n_paths=args.paths),
+            partitions.get
+        )
+        for ticker in partitions.tickers:
+            for days in args.horizons:
+                pool.get(ticker, days)
+
+        ingestor = StreamIngestor(partitions, CsvTail(path), pool=pool).start(args.interval)
+        start = time.perf_counter()
+        for i in range(0, len(feed), args.batch_rows):
+            feed.iloc[i:i + args.batch_rows].to_csv(path, mode='a', header=False, index=False)
+            time.sleep(args.interval)
+        while ingestor.metrics()['rows'] < len(feed) or ingestor.metrics()['pending_refreshes']:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        ingestor.stop()
+        pool.shutdown()
+
+        reload_start = time.perf_counter()
+        full = load_and_process_data(path, compact=args.compact)
+        TickerPartitions(full)
+        reload_s = time.perf_counter() - reload_start
+        compare(partitions, full, partitions.tickers, feed)
+
+    metrics = ingestor.metrics()
+    print(f"{len(feed)} rows streamed in {metrics['batches']} batches over {elapsed:.1f}s "
+          f"({len(partitions.tickers)} tickers, horizons {args.horizons}); partitions match a batch load")
+    if metrics['errors']:
+        print(f"errors: {metrics['errors']} (last: {metrics['last_error']})")
+    print(f"{'latency':<28} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'samples':>8}")
+    for label, name in (('ingest (read -> appended)', 'ingest_latency'),
+                        ('refresh (read -> forecast)', 'refresh_latency')):
+        stats = metrics[name]
+        print(f"{label:<28} {stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} {stats['max_ms']:9.1f} {stats['samples']:8d}")
+    print(f"{'batch reload of the CSV':<28} {reload_s * 1e3:9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Cold load time of the structured price source vs the textual loader
+
+The textual loader regex-parses every sentence for close and volume; the
+structured loader reads typed OHLCV columns and joins the labels through a
+sorted (ticker, date) index. Both run uncached, on the bundled data and on
+synthetic universes, and the best of --repeat runs is reported.
+
+    python benchmarks/bench_structured.py
+    python benchmarks/bench_structured.py --sizes 500x1250 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import synthetic
+from data_processor import load_and_process_data, load_structured_data
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DATA_PATH = os.path.join(DATA_DIR, 'refined_textual_data.csv')
+PRICE_PATH = os.path.join(DATA_DIR, 'stock_data_5_years.csv')
+
+def parse_size(text):
+    tickers, days = text.lower().split('x')
+    return int(tickers), int(days)
+
+def best_seconds(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='*', default=['100x1250'],
+                        help='synthetic universe sizes as TICKERSxDAYS')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sources = [('bundled', DATA_PATH, PRICE_PATH)]
+        for size in args.sizes:
+            tickers, days = parse_size(size)
+            text_path = os.path.join(workdir, f'text_{size}.csv')
+            price_path = os.path.join(workdir, f'prices_{size}.csv')
+            synthetic.write_textual_csv(text_path, tickers, days)
+            synthetic.write_price_csv(price_path, tickers, days)
+            sources.append((f'synthetic {size}', text_path, price_path))
+
+        print(f"{'data':<22} {'rows':>9} {'textual s':>10} {'structured s':>13} {'speedup':>8}")
+        for label, text_path, price_path in sources:
+            rows = len(load_structured_data(price_path, text_path))
+            textual = best_seconds(lambda: load_and_process_data(text_path), args.repeat)
+            structured = best_seconds(lambda: load_structured_data(price_path, text_path), args.repeat)
+            print(f"{label:<22} {rows:>9} {textual:10.3f} {structured:13.3f} {textual / structured:7.2f}x")
+
+if __name__ == '__main__':
+    main()
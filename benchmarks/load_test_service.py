@@ -0,0 +1,129 @@
+"""
+Load test for the headless forecasting service (src/forecast_service.py)
+
+Fires concurrent JSON requests at a running service (--url) or at one started
+in-process on a free port, and reports throughput and latency percentiles.
+With --compare the in-process run is repeated without micro-batching
+(--window-ms 0, --max-batch 1) for a side-by-side.
+
+    python benchmarks/load_test_service.py
+    python benchmarks/load_test_service.py --requests 500 --concurrency 32 --compare
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8765
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import argparse
+import tempfile
+import threading
+import warnings
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+warnings.filterwarnings('ignore')
+
+def post_json(url, body, timeout=300):
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'{}')
+
+def get_json(url, timeout=30):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def run_load(base_url, requests, concurrency):
+    """
+    Send every request with `concurrency` clients; returns (latencies, statuses, wall seconds)
+    """
+    latencies = [None] * len(requests)
+    statuses = [None] * len(requests)
+
+    def send(i):
+        start = time.perf_counter()
+        statuses[i], _ = post_json(base_url + '/forecast', requests[i])
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(send, range(len(requests))))
+    return np.array(latencies), statuses, time.perf_counter() - start
+
+def report(label, latencies, statuses, wall, health=None):
+    ms = latencies * 1e3
+    ok = sum(1 for status in statuses if status == 200)
+    print(f"\n{label}")
+    print(f"  {len(statuses)} requests, {ok} ok, {len(statuses) - ok} failed in {wall:.2f}s "
+          f"-> {len(statuses) / wall:.1f} req/s")
+    print(f"  latency ms  p50 {np.percentile(ms, 50):8.1f}  p95 {np.percentile(ms, 95):8.1f}  "
+          f"p99 {np.percentile(ms, 99):8.1f}  max {ms.max():8.1f}")
+    if health:
+        print(f"  server: {health['batches']} batches, {health['groups']} groups, {health['rejected']} rejected")
+
+def start_local(window_ms, max_batch, workers):
+    from forecast_service import load_service, make_server
+    service = load_service(window=window_ms / 1e3, max_batch=max_batch, workers=workers)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running service; default starts one in-process')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--horizons', nargs='+', type=int, default=[1, 7, 30, 90, 365])
+    parser.add_argument('--paths', type=int, default=2000)
+    parser.add_argument('--window-ms', type=float, default=10)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--compare', action='store_true', help='also run in-process without batching')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.url:
+        # Keep trained models out of the real registry while load testing
+        model_dir = tempfile.mkdtemp(prefix='stockoracle-load-models-')
+        os.environ['STOCKORACLE_MODEL_DIR'] = model_dir
+        atexit.register(shutil.rmtree, model_dir, ignore_errors=True)
+
+    configs = [('micro-batched', args.window_ms, args.max_batch)]
+    if args.compare and not args.url:
+        configs.append(('unbatched', 0, 1))
+
+    for label, window_ms, max_batch in configs:
+        server = None
+        base_url = args.url
+        if base_url is None:
+            server, base_url = start_local(window_ms, max_batch, args.workers)
+            label = f"{label} (window {window_ms:g} ms, max batch {max_batch})"
+
+        tickers = get_json(base_url + '/tickers')['tickers']
+        rng = np.random.default_rng(args.seed)
+        requests = [{
+            'ticker': tickers[rng.integers(len(tickers))],
+            'days': int(args.horizons[rng.integers(len(args.horizons))]),
+            'paths': args.paths
+        } for _ in range(args.requests)]
+
+        # One request per ticker first so model training is not what is measured
+        run_load(base_url, [{'ticker': t, 'days': 1, 'paths': args.paths} for t in tickers], args.concurrency)
+        latencies, statuses, wall = run_load(base_url, requests, args.concurrency)
+        report(label, latencies, statuses, wall, get_json(base_url + '/health'))
+
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+if __name__ == '__main__':
+    main()
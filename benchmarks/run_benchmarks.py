@@ -0,0 +1,175 @@
+"""
+Headless benchmark suite for the load -> features -> train -> forecast -> chart pipeline
+
+Runs every stage without Streamlit on the bundled data/*.csv plus a synthetic
+universe (startup/* stages time imports and the first forecast in fresh
+interpreters), records best-of-N wall time and traced peak memory per stage and
+horizon, and compares against a stored baseline.
+
+    python benchmarks/run_benchmarks.py                      # run and compare
+    python benchmarks/run_benchmarks.py --save-baseline      # refresh baseline.json
+    python benchmarks/run_benchmarks.py --tickers 500 --days 1250 --horizons 1 30 365 36500
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import warnings
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+warnings.filterwarnings('ignore')
+
+# Keep trained models out of the real registry while benchmarking
+_MODEL_DIR = tempfile.mkdtemp(prefix='stockoracle-bench-models-')
+os.environ['STOCKORACLE_MODEL_DIR'] = _MODEL_DIR
+atexit.register(shutil.rmtree, _MODEL_DIR, ignore_errors=True)
+
+import synthetic
+from bench_startup import import_seconds, first_forecast_seconds
+from data_processor import load_and_process_data, TickerPartitions
+from features import frame_design_matrix
+from forecasting import prepare_features, train_ml_model, ml_forecast, holt_winters_forecast, forecast_stock_prices
+from model_registry import ModelRegistry
+from visualization import display_stock_chart
+
+DATA_PATH = os.path.join(HERE, '..', 'data', 'refined_textual_data.csv')
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+
+def measure(fn, repeat):
+    """
+    Best-of-repeat wall time, plus the traced peak memory of one more run
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_mib': peak / 2**20}
+
+def build_stages(args, workdir):
+    """
+    Ordered (name, callable) pairs; setup work happens here, not in the timings
+    """
+    stages = []
+    # Fresh interpreters: import cost and time to the first forecast
+    stages.append(('startup/import_core', lambda: import_seconds('core')))
+    stages.append(('startup/import_forecasting', lambda: import_seconds('forecasting')))
+    stages.append(('startup/first_forecast', lambda: first_forecast_seconds('memory')))
+    stages.append(('load/bundled', lambda: load_and_process_data(DATA_PATH)))
+
+    synthetic_path = os.path.join(workdir, 'synthetic.csv')
+    synthetic.write_textual_csv(synthetic_path, args.tickers, args.days)
+    label = f"{args.tickers}x{args.days}"
+    stages.append((f'load/synthetic_{label}', lambda: load_and_process_data(synthetic_path)))
+    stages.append((f'load/synthetic_{label}_chunked',
+                   lambda: load_and_process_data(synthetic_path, chunk_size=args.chunk_size)))
+
+    data = TickerPartitions(load_and_process_data(DATA_PATH))
+    ticker = args.ticker
+    ticker_data = data.get(ticker)
+    stages.append((f'partition/{ticker}', lambda: data.get(ticker)))
+    stages.append((f'features/{ticker}/frame', lambda: prepare_features(ticker_data, args.lookback)))
+    stages.append((f'features/{ticker}/matrix', lambda: frame_design_matrix(ticker_data, args.lookback)))
+
+    X, y, _ = frame_design_matrix(ticker_data, args.lookback)
+    registry = ModelRegistry(os.path.join(workdir, 'models'))
+
+    def train():
+        # Always a cold fit: the registry is emptied before every call
+        registry.clear()
+        train_ml_model(X, y, args.max_iter, ticker=ticker, lookback=args.lookback, registry=registry)
+    stages.append((f'train/{ticker}', train))
+
+    for days in args.horizons:
+        stages.append((f'holt/{ticker}/{days}d', lambda days=days: holt_winters_forecast(ticker_data['close'].values, days)))
+        stages.append((f'ml_forecast/{ticker}/{days}d', lambda days=days: ml_forecast(ticker_data, days)))
+
+    stages.append((f'chart/{ticker}/history', lambda: display_stock_chart(ticker_data, ticker=ticker)))
+    for days in args.horizons:
+        forecast = forecast_stock_prices(ticker_data, days=days, seed=0)
+        stages.append((f'chart/{ticker}/forecast_{days}d',
+                       lambda forecast=forecast: display_stock_chart(forecast, ticker=ticker, is_forecast=True)))
+    return stages
+
+def compare(results, baseline, threshold):
+    """
+    Stages whose time grew by more than threshold (relative) over the baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('stages', {}).get(name)
+        if base is None or base['seconds'] <= 0:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        if ratio > 1 + threshold:
+            regressions.append((name, base['seconds'], result['seconds'], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ticker', default='AAPL')
+    parser.add_argument('--tickers', type=int, default=100, help='synthetic universe size')
+    parser.add_argument('--days', type=int, default=1250, help='synthetic days per ticker')
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--horizons', nargs='+', type=int, default=[1, 30, 365])
+    parser.add_argument('--lookback', type=int, default=30)
+    parser.add_argument('--max-iter', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', help='run only stages whose name contains this text')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative slowdown before a stage counts as a regression')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--json', help='also write this run to a JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, fn in build_stages(args, workdir):
+            if args.only and args.only not in name:
+                continue
+            results[name] = measure(fn, args.repeat)
+            print(f"{name:<40} {results[name]['seconds'] * 1e3:11.2f} ms {results[name]['peak_mib']:9.2f} MiB",
+                  flush=True)
+
+    run = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'settings': {k: v for k, v in vars(args).items() if k not in ('baseline', 'save_baseline', 'json', 'only')},
+        'stages': results
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline found; run with --save-baseline to create one.")
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions over {args.threshold:.0%}:")
+        for name, before, after, ratio in regressions:
+            print(f"  {name:<40} {before * 1e3:9.2f} ms -> {after * 1e3:9.2f} ms ({ratio:.2f}x)")
+        sys.exit(1)
+    print(f"\nNo stage slower than baseline by more than {args.threshold:.0%}.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import string
+import numpy as np
+import pandas as pd
+
+EMOTIONS_UP = ['excited', 'optimistic', 'confident']
+EMOTIONS_DOWN = ['disappointed', 'anxious', 'worried']
+EMOTIONS_FLAT = ['uncertain', 'calm', 'indifferent']
+
+def make_tickers(n_tickers):
+    """
+    Generate n distinct upper-case ticker symbols
+    """
+    letters = np.array(list(string.ascii_uppercase))
+    tickers = []
+    i = 0
+    while len(tickers) < n_tickers:
+        # Base-26 spelling of the counter, at least 3 letters long
+        n, symbol = i, ''
+        while True:
+            symbol = letters[n % 26] + symbol
+            n //= 26
+            if n == 0:
+                break
+        tickers.append(symbol.rjust(3, 'A'))
+        i += 1
+    return tickers
+
+def make_price_frame(n_tickers, n_days, seed=0):
+    """
+    Random-walk close/volume series for n_tickers over n_days business days
+    """
+    rng = np.random.default_rng(seed)
+    tickers = make_tickers(n_tickers)
+    dates = pd.bdate_range('2020-01-17', periods=n_days)
+    
+    start = rng.uniform(20, 500, size=(n_tickers, 1))
+    returns = rng.normal(0.0, 0.02, size=(n_tickers, n_days))
+    close = np.round(start * np.exp(np.cumsum(returns, axis=1)), 2)
+    volume = rng.integers(1_000_000, 150_000_000, size=(n_tickers, n_days))
+    
+    return pd.DataFrame({
+        'date': np.tile(dates.values, n_tickers),
+        'ticker': np.repeat(tickers, n_days),
+        'close': close.ravel(),
+        'volume': volume.ravel(),
+        'return': returns.ravel()
+    })
+
+def make_textual_frame(n_tickers, n_days, seed=0):
+    """
+    Rows shaped like refined_textual_data.csv for a synthetic universe
+    """
+    rng = np.random.default_rng(seed)
+    prices = make_price_frame(n_tickers, n_days, seed)
+    n = len(prices)
+    
+    ret = prices['return'].values
+    up = ret > 0.005
+    down = ret < -0.005
+    pick = rng.integers(0, 3, size=n)
+    emo = np.where(up, np.array(EMOTIONS_UP)[pick],
+                   np.where(down, np.array(EMOTIONS_DOWN)[pick], np.array(EMOTIONS_FLAT)[pick]))
+    senti = np.where(up, 'bullish', np.where(down, 'bearish', 'neutral'))
+    
+    ticker = prices['ticker'].values.astype(str)
+    close = np.char.mod('%.2f', prices['close'].values)
+    volume = prices['volume'].values.astype(str)
+    text_up = np.char.add(np.char.add(np.char.add(np.char.add(np.char.add(
+        np.char.add('Strong day for ', ticker), '! Closed higher at '), close),
+        ', volume surging at '), volume), np.char.add('. Feeling ', np.char.add(emo, '!')))
+    text_down = np.char.add(np.char.add(np.char.add(np.char.add(np.char.add(
+        ticker, ' struggled today, dropping to '), close),
+        '. Investors are '), emo), np.char.add(' amid heavy trading volume of ', np.char.add(volume, '.')))
+    text_flat = np.char.add(np.char.add(np.char.add(np.char.add(
+        ticker, ' had a steady day, closing at '), close),
+        '. Market seems '), np.char.add(emo, ' with moderate activity.'))
+    original = np.where(up, text_up, np.where(down, text_down, text_flat))
+    
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'date': pd.DatetimeIndex(prices['date']).strftime('%Y-%m-%d'),
+        'ticker': ticker,
+        'emo_label': emo,
+        'senti_label': senti,
+        'original': original,
+        'processed': np.char.lower(original.astype(str))
+    })
+
+def write_textual_csv(path, n_tickers, n_days, seed=0):
+    """
+    Write a synthetic refined_textual_data.csv and return its row count
+    """
+    frame = make_textual_frame(n_tickers, n_days, seed)
+    frame.to_csv(path, index=False)
+    return len(frame)
+
+def write_price_csv(path, n_tickers, n_days, seed=0):
+    """
+    Write a synthetic stock_data_5_years.csv matching write_textual_csv's universe
+    """
+    rng = np.random.default_rng(seed + 1)
+    prices = make_price_frame(n_tickers, n_days, seed)
+    close = prices['close'].values
+    open_ = close * (1 + rng.normal(0, 0.005, size=len(close)))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, size=len(close)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, size=len(close)))
+    dates = pd.DatetimeIndex(prices['date']).tz_localize('America/New_York')
+    frame = pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d %H:%M:%S%z').str.replace(r'(\d\d)(\d\d)$', r'\1:\2', regex=True),
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': prices['volume'].values,
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+        'Ticker': prices['ticker'].values
+    })
+    grouped = frame.groupby('Ticker', sort=False)['Close']
+    frame['SMA_50'] = grouped.transform(lambda s: s.rolling(50).mean())
+    frame['SMA_200'] = grouped.transform(lambda s: s.rolling(200).mean())
+    frame['RSI'] = np.nan
+    frame.to_csv(path, index=False)
+    return len(frame)
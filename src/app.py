@@ -1,9 +1,18 @@
+import os
 import streamlit as st
 import pandas as pd
-import numpy as np
-from data_processor import load_and_process_data, get_unique_tickers
-from visualization import display_stock_chart, get_chart_types
-from forecasting import forecast_stock_prices, get_recommendation
+import instrumentation
+import cache_backend
+from instrumentation import span
+from data_processor import get_unique_tickers, get_ticker_data
+from visualization import display_stock_chart, get_chart_types, point_budget, emotion_distribution_chart, sentiment_ratio_chart, sentiment_timeline_chart
+from forecasting import get_recommendation
+from ensemble import get_default_runner
+from core import load_partitions, get_text_store, get_forecast_pool, get_ingestor, get_sentiment_cube
+
+# The loaders in core are cached by Streamlit here unless STOCKORACLE_CACHE
+# picks another backend (memory or disk)
+cache_backend.set_backend(os.environ.get('STOCKORACLE_CACHE', 'streamlit'))
 
 # Set page configuration
 st.set_page_config(
@@ -18,18 +27,60 @@ st.markdown("""
 This dashboard allows you to visualize stock data, analyze sentiment, and get forecasting insights.
 """)
 
-# Load data
-@st.cache_data
-def load_data():
-    return load_and_process_data("C:\\Users\\KIIT\\Documents\\StockOracle-AI-Powered-Stock-Prediction-and-Forecasting-System\\data\\refined_textual_data.csv")
+# The wide layout draws charts at most about this many pixels across; longer
+# series are downsampled to a couple of points per pixel and drawn with WebGL
+CHART_WIDTH_PX = 1600
+CHART_MAX_POINTS = point_budget(CHART_WIDTH_PX)
+
+# Collect this rerun's stage timings for the Performance panel
+instrumentation.start_run()
+
+def render_performance_panel(pool=None, ingestor=None):
+    """
+    Sidebar panel with this rerun's stage timings, process-wide counters,
+    the forecast pool's queue depth / utilisation and stream latencies
+    """
+    if not instrumentation.ENABLED:
+        return
+    with st.sidebar.expander("Performance", expanded=False):
+        spans = instrumentation.run_spans()
+        if spans:
+            st.dataframe(
+                pd.DataFrame([{
+                    'stage': ('  ' * s['depth']) + s['name'],
+                    'ms': s['ms'],
+                    'peak MiB': s.get('peak_mib')
+                } for s in spans]),
+                hide_index=True
+            )
+        if pool is not None:
+            st.caption("Forecast pool")
+            st.json(pool.metrics())
+        if ingestor is not None:
+            st.caption("Stream ingestion")
+            st.json(ingestor.metrics())
+        ensemble = get_default_runner().metrics()
+        if ensemble:
+            st.caption("Ensemble members")
+            st.json(ensemble)
+        snapshot = instrumentation.snapshot()
+        if snapshot['counters']:
+            st.json(snapshot['counters'])
+        for s in spans:
+            if 'profile' in s:
+                st.caption(f"cProfile: {s['name']}")
+                st.code(s['profile'])
+
+forecast_pool = None
+ingestor = None
 
 try:
     # Display loading message
-    with st.spinner("Loading and processing stock data..."):
-        data = load_data()
+    with st.spinner("Loading and processing stock data..."), span('app.load_data'):
+        data = load_partitions()
     
     # Check if data was loaded correctly
-    if data is None or data.empty:
+    if data is None:
         st.error("Failed to load or process data. Please check the CSV file format.")
         st.stop()
     
@@ -39,6 +90,9 @@ try:
         st.error("No ticker symbols found in the data.")
         st.stop()
     
+    forecast_pool = get_forecast_pool()
+    ingestor = get_ingestor()
+    
     # Create sidebar for controls
     st.sidebar.header("Dashboard Controls")
     
@@ -48,6 +102,14 @@ try:
         tickers
     )
     
+    # Candlestick and OHLC need the open/high/low columns of the structured source
+    chart_types = get_chart_types(has_ohlc='open' in data.columns)
+    chart_label = st.sidebar.selectbox(
+        "Chart Type",
+        list(chart_types)
+    )
+    chart_type = chart_types[chart_label]
+    
     # Forecast period selection - with time unit dropdown
     st.sidebar.subheader("Forecast Settings")
     
@@ -87,8 +149,17 @@ try:
         
     st.sidebar.info(f"Forecasting for {period_text} ({forecast_days} days total)")
     
+    if ingestor is not None:
+        stream = ingestor.metrics()
+        refresh = stream['refresh_latency']
+        st.sidebar.caption(
+            f"Streaming: {stream['rows']} new rows"
+            + (f", refreshed in {refresh['p50_ms'] / 1e3:.1f}s (median)" if refresh else "")
+        )
+    
     # Filter data for selected ticker
-    ticker_data = data[data['ticker'] == selected_ticker].copy()
+    with span('app.ticker_filter', ticker=selected_ticker):
+        ticker_data = get_ticker_data(data, selected_ticker)
     
     if not ticker_data.empty:
         # Create columns for main content
@@ -98,20 +169,27 @@ try:
             st.subheader(f"{selected_ticker} Stock Price Chart")
             
             # Display chart with sentiment information
-            fig = display_stock_chart(
-                ticker_data,
-                chart_type='line',
-                ticker=selected_ticker
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            with span('app.history_chart'):
+                fig = display_stock_chart(
+                    ticker_data,
+                    chart_type=chart_type,
+                    ticker=selected_ticker,
+                    max_points=CHART_MAX_POINTS,
+                    text_store=get_text_store()
+                )
+                st.plotly_chart(fig, use_container_width=True)
             
         
         with col2:
             st.subheader("Forecasting")
             
             # Get forecast data
-            with st.spinner(f"Generating forecast for {period_text}..."):
-                forecast_data = forecast_stock_prices(ticker_data, days=forecast_days)
+            # Served from the background pool; only a never-seen ticker/horizon
+            # is computed while the user waits
+            with st.spinner(f"Generating forecast for {period_text}..."), span('app.forecast', days=forecast_days):
+                forecast_data, forecast_status = forecast_pool.get(selected_ticker, forecast_days)
+            if forecast_status == 'stale':
+                st.caption("Showing the last computed forecast; a refresh is running in the background.")
             
             # Validate forecast data
             if forecast_data is not None and not forecast_data.empty:
@@ -138,8 +216,20 @@ try:
                         delta=f"{price_change:.2f}%"
                     )
                     
+                    # Share of simulated paths ending above today's price
+                    prob_gain = None
+                    if 'prob_gain' in forecast_data.columns:
+                        prob_gain = forecast_data['prob_gain'].iloc[-1]
+                        st.metric(
+                            label="Probability of Gain",
+                            value=f"{prob_gain * 100:.1f}%"
+                        )
+                        st.caption(
+                            f"90% band: ${forecast_data['p5'].iloc[-1]:.2f} – ${forecast_data['p95'].iloc[-1]:.2f}"
+                        )
+                    
                     # Get and display recommendation
-                    recommendation, confidence = get_recommendation(price_change)
+                    recommendation, confidence = get_recommendation(price_change, prob_gain)
                     
                     rec_color = {
                         "BUY": "green",
@@ -165,33 +255,57 @@ try:
         # Display forecast chart in a dedicated section with full width
         if forecast_data is not None and not forecast_data.empty and 'predicted_price' in forecast_data.columns:
             st.subheader(f"Price Forecast Chart ({period_text})")
-            forecast_fig = display_stock_chart(
-                forecast_data,
-                chart_type='line',
-                ticker=selected_ticker,
-                is_forecast=True
-            )
-            st.plotly_chart(forecast_fig, use_container_width=True)
+            with span('app.forecast_chart'):
+                forecast_fig = display_stock_chart(
+                    forecast_data,
+                    chart_type='line',
+                    ticker=selected_ticker,
+                    is_forecast=True,
+                    max_points=CHART_MAX_POINTS
+                )
+                st.plotly_chart(forecast_fig, use_container_width=True)
         
         # Sentiment analysis section
         st.subheader("Sentiment Analysis")
         
         # Check for sentiment data
+        cube = get_sentiment_cube()
         if 'emo_label' in ticker_data.columns and not ticker_data['emo_label'].isna().all():
-            # Display sentiment distribution
-            sentiment_counts = ticker_data['emo_label'].value_counts()
+            first_date = ticker_data['date'].min().date()
+            last_date = ticker_data['date'].max().date()
+            date_range = (first_date, last_date)
+            if first_date < last_date:
+                date_range = st.slider(
+                    "Sentiment window",
+                    min_value=first_date,
+                    max_value=last_date,
+                    value=date_range,
+                    format="YYYY-MM-DD"
+                )
+            
+            with span('app.sentiment', ticker=selected_ticker):
+                sentiment_counts = cube.distribution(selected_ticker, 'emo_label', *date_range)
             
-            # Use full width for the pie chart
-            st.subheader("Emotion Distribution")
-            fig = {
-                'data': [{'type': 'pie', 
-                          'labels': sentiment_counts.index, 
-                          'values': sentiment_counts.values,
-                          'hole': 0.4,
-                          'marker': {'colors': ['#FF9999', '#66B2FF', '#99FF99', '#FFCC99', '#FF99CC', '#99CCFF', '#CCFF99', '#CC99FF']}}],
-                'layout': {'height': 400}
-            }
-            st.plotly_chart(fig, use_container_width=True)
+            emotion_col, timeline_col = st.columns([1, 1])
+            with emotion_col:
+                st.subheader("Emotion Distribution")
+                st.plotly_chart(emotion_distribution_chart(sentiment_counts), use_container_width=True)
+            with timeline_col:
+                st.subheader("Sentiment per Month")
+                buckets = cube.bucket_counts('senti_label', selected_ticker, 'M', *date_range)
+                st.plotly_chart(sentiment_timeline_chart(buckets), use_container_width=True)
+            
+            st.subheader("Rolling Bullish Share")
+            ratio_col1, ratio_col2 = st.columns([1, 3])
+            with ratio_col1:
+                ratio_window = st.number_input("Window (trading days)", min_value=1, max_value=250, value=20, step=1)
+            with ratio_col2:
+                compare_tickers = st.multiselect(
+                    "Compare with",
+                    [t for t in tickers if t != selected_ticker]
+                )
+            ratios = cube.rolling_ratio([selected_ticker] + compare_tickers, int(ratio_window), start=date_range[0], end=date_range[1])
+            st.plotly_chart(sentiment_ratio_chart(ratios, int(ratio_window)), use_container_width=True)
         else:
             st.info("No sentiment data available for this ticker.")
     else:
@@ -206,3 +320,5 @@ except Exception as e:
         st.code(str(e))
         import traceback
         st.code(traceback.format_exc())
+
+render_performance_panel(forecast_pool, ingestor)
@@ -0,0 +1,176 @@
+import time
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from core import DATA_PATH, PRICE_PATH, load_data
+from data_processor import TickerPartitions
+from features import frame_columns, build_design_matrix
+from forecasting import recursive_forecast
+from holt import HoltLinear
+
+warnings.filterwarnings("ignore")
+
+COMPONENTS = ['holt', 'gbm', 'ensemble']
+
+def forecast_errors(forecast, actual, last_price):
+    """
+    MAPE (%), RMSE and directional accuracy of one forecast path
+    """
+    forecast = np.asarray(forecast, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    error = forecast - actual
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mape = np.nanmean(np.abs(error) / np.abs(actual)) * 100
+    rmse = np.sqrt(np.mean(error ** 2))
+    # Did the forecast call the move away from the origin price correctly?
+    direction = np.mean(np.sign(forecast - last_price) == np.sign(actual - last_price))
+    return mape, rmse, direction
+
+def origin_indices(n_rows, horizon, n_origins, step, min_train):
+    """
+    Row positions of the forecast origins, oldest first
+
+    Each origin o trains on rows [0, o) and is scored on rows [o, o + horizon).
+    """
+    last = n_rows - horizon
+    step = step or horizon
+    origins = [last - i * step for i in range(n_origins)]
+    return sorted(o for o in origins if o >= min_train)
+
+def walk_forward(data, horizon=30, n_origins=10, step=None, min_train=250,
+                 lookback=30, max_iter=50, refit_iter=10, weights=(0.7, 0.3)):
+    """
+    Rolling-origin evaluation of the Holt / GBM ensemble for one ticker
+
+    Models are fitted at the first origin and then refitted incrementally:
+    Holt re-optimises from its previous alpha/beta, and the GBM keeps its
+    trees and boosts refit_iter more on the extended sample (warm_start)
+    instead of training from scratch.
+    """
+    data, close, volume, sentiment, valid = frame_columns(data)
+    ticker = data['ticker'].iloc[0] if 'ticker' in data.columns else None
+    dates = data['date'].to_numpy()
+    X, y, rows = build_design_matrix(close, volume, sentiment, lookback, valid)
+    blend = np.linspace(weights[0], weights[1], horizon)
+
+    holt = HoltLinear()
+    gbm = HistGradientBoostingRegressor(max_iter=max_iter, warm_start=True)
+    records = []
+    for origin in origin_indices(len(close), horizon, n_origins, step, min_train):
+        start = time.perf_counter()
+
+        # Holt re-optimises starting from the previous origin's alpha/beta
+        holt.fit(close[:origin], warm_start=True)
+        holt_seconds = time.perf_counter() - start
+
+        fit_start = time.perf_counter()
+        train = rows < origin
+        if records:
+            gbm.max_iter += refit_iter
+        gbm.fit(X[train], y[train])
+        gbm_seconds = time.perf_counter() - fit_start
+
+        window = close[origin - lookback:origin]
+        exog = [volume[origin - 1], sentiment[origin - 1]]
+        paths = {
+            'holt': holt.forecast(horizon),
+            'gbm': recursive_forecast(gbm, window, exog, horizon)[0]
+        }
+        paths['ensemble'] = paths['holt'] * blend + paths['gbm'] * (1 - blend)
+        origin_seconds = time.perf_counter() - start
+
+        actual = close[origin:origin + horizon]
+        for component in COMPONENTS:
+            mape, rmse, direction = forecast_errors(paths[component], actual, close[origin - 1])
+            records.append({
+                'ticker': ticker,
+                'origin': pd.Timestamp(dates[origin]),
+                'train_rows': origin,
+                'component': component,
+                'mape': mape,
+                'rmse': rmse,
+                'directional_accuracy': direction,
+                'holt_fit_seconds': holt_seconds,
+                'gbm_fit_seconds': gbm_seconds,
+                'origin_seconds': origin_seconds
+            })
+    return records
+
+def _walk_forward_task(args):
+    data, kwargs = args
+    return walk_forward(data, **kwargs)
+
+def run_backtest(datasets, workers=None, **kwargs):
+    """
+    Walk-forward backtest over many tickers, fanned out across processes
+
+    datasets maps ticker -> DataFrame; kwargs go to walk_forward. Returns one
+    row per (ticker, origin, component).
+    """
+    tasks = [(data, kwargs) for data in datasets.values()]
+    if workers == 1:
+        results = map(_walk_forward_task, tasks)
+        records = [record for result in results for record in result]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            records = [record for result in pool.map(_walk_forward_task, tasks) for record in result]
+    return pd.DataFrame(records)
+
+def summarize(results):
+    """
+    Mean error metrics and per-origin cost for each ticker and component
+    """
+    metrics = ['mape', 'rmse', 'directional_accuracy', 'origin_seconds']
+    per_ticker = results.groupby(['ticker', 'component'])[metrics].mean()
+    overall = results.groupby('component')[metrics].mean()
+    overall.index = pd.MultiIndex.from_product([['ALL'], overall.index], names=per_ticker.index.names)
+    return pd.concat([per_ticker, overall])
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the Holt / GBM forecasting ensemble")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--prices', default=PRICE_PATH, help="structured price CSV ('' to parse prices from --data)")
+    parser.add_argument('--tickers', nargs='*', help='defaults to every ticker in the file')
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--origins', type=int, default=10)
+    parser.add_argument('--step', type=int, help='rows between origins (defaults to the horizon)')
+    parser.add_argument('--lookback', type=int, default=30)
+    parser.add_argument('--max-iter', type=int, default=50)
+    parser.add_argument('--refit-iter', type=int, default=10)
+    parser.add_argument('--weights', nargs=2, type=float, default=[0.7, 0.3],
+                        help='Holt weight at the first and last horizon step')
+    parser.add_argument('--workers', type=int, help='process pool size (1 runs in-process)')
+    parser.add_argument('--out', help='write per-origin results to this CSV')
+    args = parser.parse_args()
+
+    # The same prices the dashboard and service forecast from
+    partitions = TickerPartitions(load_data(args.data, args.prices or None))
+    tickers = args.tickers or partitions.tickers
+    datasets = {ticker: partitions.get(ticker) for ticker in tickers}
+
+    start = time.perf_counter()
+    results = run_backtest(
+        datasets,
+        workers=args.workers,
+        horizon=args.horizon,
+        n_origins=args.origins,
+        step=args.step,
+        lookback=args.lookback,
+        max_iter=args.max_iter,
+        refit_iter=args.refit_iter,
+        weights=tuple(args.weights)
+    )
+    elapsed = time.perf_counter() - start
+
+    if args.out:
+        results.to_csv(args.out, index=False)
+    pd.set_option('display.width', 120)
+    print(summarize(results).round(4).to_string())
+    print(f"\n{len(tickers)} tickers, {results['origin'].nunique()} origin dates, {elapsed:.1f}s wall clock")
+
+if __name__ == '__main__':
+    main()
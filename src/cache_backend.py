@@ -0,0 +1,248 @@
+import os
+import pickle
+import inspect
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from instrumentation import count
+
+# Default on-disk location of DiskCache, next to the processed-data cache
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", ".cache", "functions")
+
+# Cached results kept in memory per process by default
+DEFAULT_MAX_ENTRIES = 128
+
+def _function_key(fn):
+    """
+    Hash of a function's name and source, so editing it invalidates its results
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{fn.__module__}.{fn.__qualname__}".encode('utf-8'))
+    try:
+        digest.update(inspect.getsource(fn).encode('utf-8'))
+    except (OSError, TypeError):
+        pass
+    return digest.hexdigest()
+
+def _call_key(function_key, args, kwargs):
+    digest = hashlib.blake2b(function_key.encode('utf-8'), digest_size=16)
+    digest.update(pickle.dumps((args, sorted(kwargs.items())), protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+class MemoryCache:
+    """
+    In-process LRU of function results, keyed by function and arguments
+
+    Values are shared, not copied, so cached frames must be treated as
+    read-only (as with TickerPartitions). Each key is computed once even
+    when several threads ask for it at the same time.
+    """
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _lookup(self, key):
+        # Caller holds the lock
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return True, self._entries[key]
+        return False, None
+
+    def get_or_compute(self, key, compute):
+        """
+        Value stored under key, computing and storing it with compute() on a miss
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                count('cache_backend.hit')
+                return value
+            key_lock = self._pending.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    return value
+                self.stats['misses'] += 1
+            count('cache_backend.miss')
+            try:
+                value = compute()
+                with self._lock:
+                    self._entries[key] = value
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.stats['evictions'] += 1
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return value
+
+    def resource(self, fn):
+        function_key = _function_key(fn)
+
+        @wraps(fn)
+        def call(*args, **kwargs):
+            return self.get_or_compute(_call_key(function_key, args, kwargs), lambda: fn(*args, **kwargs))
+        return call
+
+    def data(self, fn):
+        return self.resource(fn)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class DiskCache(MemoryCache):
+    """
+    MemoryCache whose data results are also pickled to disk
+
+    Data functions survive restarts and are shared by every process using
+    the same directory; recently used results stay in memory so reruns do
+    not unpickle them again. Resources (pools, threads, open stores) cannot
+    be pickled and are cached in memory only.
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES):
+        super().__init__(max_entries)
+        self.directory = directory
+        self.stats['disk_hits'] = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _load_or_compute(self, key, compute):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            with self._lock:
+                self.stats['disk_hits'] += 1
+            count('cache_backend.disk_hit')
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            pass
+        value = compute()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except (OSError, pickle.PicklingError):
+            # The in-process copy still serves this process
+            pass
+        return value
+
+    def data(self, fn):
+        function_key = _function_key(fn)
+
+        @wraps(fn)
+        def call(*args, **kwargs):
+            key = _call_key(function_key, args, kwargs)
+            return self.get_or_compute(key, lambda: self._load_or_compute(key, lambda: fn(*args, **kwargs)))
+        return call
+
+    def clear(self):
+        """
+        Drop the in-memory entries and the pickled results
+        """
+        super().clear()
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.pkl'):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+class StreamlitCache:
+    """
+    st.cache_data / st.cache_resource, for the dashboard
+
+    Streamlit is imported here rather than at module import, so headless
+    users of the cached functions never load it.
+    """
+    def __init__(self):
+        import streamlit as st
+        self._st = st
+
+    def data(self, fn):
+        return self._st.cache_data(fn)
+
+    def resource(self, fn):
+        return self._st.cache_resource(fn)
+
+    def clear(self):
+        self._st.cache_data.clear()
+        self._st.cache_resource.clear()
+
+BACKENDS = {
+    'memory': MemoryCache,
+    'disk': DiskCache,
+    'streamlit': StreamlitCache
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def _make_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown cache backend {name!r}; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+def set_backend(backend):
+    """
+    Use backend (an instance or a name in BACKENDS) for every cached function from now on
+
+    A name keeps the current backend when it is already of that kind, so a
+    script that sets it on every run (as Streamlit reruns app.py) keeps its
+    cached results.
+    """
+    global _backend
+    with _backend_lock:
+        if isinstance(backend, str):
+            if type(_backend) is BACKENDS.get(backend):
+                return _backend
+            backend = _make_backend(backend)
+        _backend = backend
+        return backend
+
+def get_backend():
+    """
+    The current backend; STOCKORACLE_CACHE names the default (memory)
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _make_backend(os.environ.get('STOCKORACLE_CACHE', 'memory'))
+        return _backend
+
+def _deferred(fn, kind):
+    # The backend's decorator is applied on first call, and again whenever
+    # the backend is swapped, so modules can be imported before one is chosen
+    state = {}
+
+    @wraps(fn)
+    def call(*args, **kwargs):
+        backend = get_backend()
+        if state.get('backend') is not backend:
+            state['wrapped'] = getattr(backend, kind)(fn)
+            state['backend'] = backend
+        return state['wrapped'](*args, **kwargs)
+    return call
+
+def cache_data(fn):
+    """
+    Cache a function returning plain data (frames, arrays) with the current backend
+    """
+    return _deferred(fn, 'data')
+
+def cache_resource(fn):
+    """
+    Cache a function returning a shared long-lived object (a pool, a store, a model)
+    """
+    return _deferred(fn, 'resource')
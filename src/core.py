@@ -0,0 +1,184 @@
+import os
+import data_cache
+from cache_backend import cache_data, cache_resource
+from data_processor import (
+    PROCESSING_VERSION, load_and_process_data, load_structured_data, load_text_store,
+    get_unique_tickers, get_ticker_data, TickerPartitions
+)
+from forecasting import forecast_stock_prices, get_recommendation
+from forecast_pool import ForecastPool
+from global_model import GlobalForecaster
+from partition_store import open_partition_store
+from sentiment_cube import SentimentCube
+from streaming import StreamIngestor, open_source
+
+# The dashboard's loaders and long-lived services, without Streamlit. app.py
+# renders them; batch jobs and notebooks import this module directly. Each
+# loader is cached through cache_backend (Streamlit in the dashboard, an
+# in-process LRU or pickles on disk elsewhere), and sklearn / scipy are only
+# imported when a model is first fitted
+
+# Data lives next to the source tree; the processed-data cache survives restarts
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+DATA_CACHE_DIR = os.path.join(DATA_DIR, ".cache")
+DATA_PATH = os.path.join(DATA_DIR, "refined_textual_data.csv")
+PRICE_PATH = os.path.join(DATA_DIR, "stock_data_5_years.csv")
+
+# Monte Carlo settings: a fixed seed keeps the forecast and recommendation
+# stable across reruns
+FORECAST_SEED = 42
+FORECAST_PATHS = 2000
+
+# Background forecasts are served for up to this long before a refresh is
+# queued; the stale result keeps being shown until the refresh lands
+FORECAST_MAX_AGE = 15 * 60
+
+# STOCKORACLE_FORECAST_POOL_MB caps the memory of the results the pool keeps
+# (each carries the ticker's history); least recently used ones are dropped
+FORECAST_POOL_MB = float(os.environ.get('STOCKORACLE_FORECAST_POOL_MB', 64))
+
+# STOCKORACLE_WARM_TICKERS: how many tickers (in the dashboard's order) are
+# forecast in the background at startup; 0 warms none
+WARM_TICKERS = int(os.environ.get('STOCKORACLE_WARM_TICKERS', 10))
+
+# STOCKORACLE_MODEL=global forecasts every ticker's GBM path with one model
+# fitted across all tickers instead of a model per ticker
+FORECAST_MODEL = os.environ.get('STOCKORACLE_MODEL', 'ticker')
+
+# STOCKORACLE_STREAM names a feed of new textual rows to ingest while the
+# app runs: an append-only CSV to tail, a named pipe, or tcp://host:port
+STREAM_SOURCE = os.environ.get('STOCKORACLE_STREAM')
+STREAM_INTERVAL = 1.0
+
+# STOCKORACLE_STORE names a directory for the per-ticker partition store:
+# the data is split into one file per ticker (rebuilt when the CSVs change)
+# and only the tickers being viewed are loaded, for universes larger than RAM
+STORE_DIR = os.environ.get('STOCKORACLE_STORE')
+
+def _price_path(price_path):
+    # Exact OHLC prices are used only when the structured file is present
+    return price_path if price_path is not None and os.path.exists(price_path) else None
+
+def source_version(data_path=DATA_PATH, price_path=PRICE_PATH):
+    """
+    Key of the source files (path, size, mtime) and the processing version
+    """
+    paths = [p for p in (_price_path(price_path), data_path) if p is not None]
+    return '-'.join(data_cache.get_cache_key(p, PROCESSING_VERSION) for p in paths)
+
+@cache_data
+def _load_frame(data_path, price_path, version):
+    # version only keys the cache, so edited CSVs are loaded again
+    if price_path is not None:
+        return load_structured_data(price_path, data_path, cache_dir=DATA_CACHE_DIR, compact=True)
+    return load_and_process_data(data_path, cache_dir=DATA_CACHE_DIR, compact=True)
+
+def load_data(data_path=DATA_PATH, price_path=PRICE_PATH):
+    """
+    Processed rows in the compact representation
+
+    Categorical labels, float32 prices and no free text, which keeps each
+    worker's footprint small. Exact OHLC prices come from price_path when it
+    exists, with sentiment joined from data_path; otherwise prices are parsed
+    out of the sentences.
+    """
+    price_path = _price_path(price_path)
+    return _load_frame(data_path, price_path, source_version(data_path, price_path))
+
+@cache_resource
+def get_text_store(data_path=DATA_PATH):
+    """
+    The sentences behind each row, read from disk only when a chart asks
+    """
+    return load_text_store(data_path, cache_dir=DATA_CACHE_DIR)
+
+@cache_resource
+def load_partitions(data_path=DATA_PATH, price_path=PRICE_PATH, store_dir=STORE_DIR):
+    """
+    Per-ticker view of the data, built once per process
+
+    The same object is handed back on every call, so ticker switches only
+    touch one slice. With store_dir the data is served from a partition
+    store there instead of being held in memory.
+    """
+    if store_dir:
+        return open_partition_store(store_dir, data_path, _price_path(price_path))
+    data = load_data(data_path, price_path)
+    if data is None or data.empty:
+        return None
+    return TickerPartitions(data)
+
+def compute_forecast(ticker_data, days, ml_model=None):
+    return forecast_stock_prices(
+        ticker_data,
+        days=days,
+        seed=FORECAST_SEED,
+        n_paths=FORECAST_PATHS,
+        ml_model=ml_model
+    )
+
+def forecast(ticker, days, ml_model=None):
+    """
+    (forecast frame, recommendation, confidence) for one ticker, as the dashboard shows them
+    """
+    ticker_data = get_ticker_data(load_partitions(), ticker)
+    result = compute_forecast(ticker_data, days, ml_model)
+    last_price = float(ticker_data['close'].iloc[-1])
+    price_change = (float(result['predicted_price'].iloc[-1]) - last_price) / last_price * 100 if last_price > 0 else 0
+    prob_gain = result['prob_gain'].iloc[-1] if 'prob_gain' in result.columns else None
+    recommendation, confidence = get_recommendation(price_change, prob_gain)
+    return result, recommendation, confidence
+
+@cache_resource
+def get_global_model():
+    """
+    One GBM fitted once per process on every ticker's history
+    """
+    # Fitted from the partitions directly, one ticker's rows at a time
+    return GlobalForecaster().fit(load_partitions())
+
+@cache_resource
+def get_sentiment_cube():
+    """
+    Label counts per ticker and day, built once per process
+
+    Date-window, rolling-ratio and cross-ticker sentiment views are
+    answered from it instead of rescanning rows.
+    """
+    return SentimentCube.from_partitions(load_partitions())
+
+@cache_resource
+def get_forecast_pool():
+    """
+    One background forecast pool per process
+
+    It warms the first WARM_TICKERS tickers at the common horizons, keeps
+    serving the last result while refreshing and holds at most
+    FORECAST_POOL_MB of results.
+    """
+    partitions = load_partitions()
+    ml_model = get_global_model() if FORECAST_MODEL == 'global' else None
+    pool = ForecastPool(
+        lambda ticker_data, days: compute_forecast(ticker_data, days, ml_model),
+        lambda ticker: get_ticker_data(partitions, ticker),
+        max_age=FORECAST_MAX_AGE,
+        partial_fn=lambda result: bool(result.attrs.get('missing_members')),
+        max_bytes=int(FORECAST_POOL_MB * 1024 * 1024)
+    )
+    if WARM_TICKERS > 0:
+        pool.warm(list(get_unique_tickers(partitions))[:WARM_TICKERS])
+    return pool
+
+@cache_resource
+def get_ingestor():
+    """
+    Stream ingestor for STOCKORACLE_STREAM, or None when no stream is set
+
+    New rows are appended to the cached partitions in place and only the
+    forecasts of the tickers they touch are refreshed.
+    """
+    if not STREAM_SOURCE:
+        return None
+    ingestor = StreamIngestor(load_partitions(), open_source(STREAM_SOURCE), pool=get_forecast_pool(),
+                              cube=get_sentiment_cube())
+    return ingestor.start(STREAM_INTERVAL)
@@ -0,0 +1,117 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout below changes
+CACHE_FORMAT = 2
+
+def _source_dir(cache_dir, file_path):
+    """
+    Directory holding the cached columns for one source CSV
+    """
+    path_hash = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, path_hash)
+
+def get_cache_key(file_path, processing_version):
+    """
+    Build a cache key from the source file path, size, mtime and processing version
+    """
+    stat = os.stat(file_path)
+    raw = '|'.join([
+        os.path.abspath(file_path),
+        str(stat.st_size),
+        str(stat.st_mtime_ns),
+        str(processing_version),
+        str(CACHE_FORMAT)
+    ])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def save_frame(data, cache_dir, file_path, key):
+    """
+    Persist a processed DataFrame as one .npy file per column
+
+    Datetime columns are stored as int64 nanoseconds and string columns as
+    int32 category codes, so a warm load never touches the CSV parser.
+    Categorical columns keep their codes and come back as categoricals.
+    """
+    target = _source_dir(cache_dir, file_path)
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = []
+    frame = data.reset_index()
+    for i, name in enumerate(frame.columns):
+        col = frame[name]
+        fname = f"{i}.npy"
+        if pd.api.types.is_datetime64_any_dtype(col):
+            np.save(os.path.join(tmp, fname), col.values.astype('datetime64[ns]').view('int64'))
+            columns.append({'name': str(name), 'file': fname, 'kind': 'datetime'})
+        elif isinstance(col.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp, fname), col.cat.codes.to_numpy())
+            columns.append({
+                'name': str(name),
+                'file': fname,
+                'kind': 'category',
+                'categories': [str(c) for c in col.cat.categories]
+            })
+        elif pd.api.types.is_numeric_dtype(col) or pd.api.types.is_bool_dtype(col):
+            np.save(os.path.join(tmp, fname), col.to_numpy())
+            columns.append({'name': str(name), 'file': fname, 'kind': 'numeric'})
+        else:
+            codes, categories = pd.factorize(col, use_na_sentinel=True)
+            np.save(os.path.join(tmp, fname), codes.astype('int32'))
+            columns.append({
+                'name': str(name),
+                'file': fname,
+                'kind': 'string',
+                'categories': [str(c) for c in categories]
+            })
+
+    meta = {'key': key, 'source': os.path.abspath(file_path), 'columns': columns}
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    # Swap the new entry in so readers never see a half-written cache
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+def load_frame(cache_dir, file_path, key):
+    """
+    Load a cached DataFrame, or return None if it is missing or stale
+    """
+    target = _source_dir(cache_dir, file_path)
+    meta_path = os.path.join(target, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('key') != key:
+            return None
+
+        columns = {}
+        for col in meta['columns']:
+            values = np.load(os.path.join(target, col['file']))
+            if col['kind'] == 'datetime':
+                values = values.view('datetime64[ns]')
+            elif col['kind'] == 'string':
+                categories = np.array(col['categories'] + [np.nan], dtype=object)
+                # Code -1 marks a missing value and picks the trailing NaN
+                values = categories[values]
+            elif col['kind'] == 'category':
+                values = pd.Categorical.from_codes(values, col['categories'])
+            columns[col['name']] = values
+    except (OSError, ValueError, KeyError):
+        return None
+
+    frame = pd.DataFrame(columns)
+    index_name = meta['columns'][0]['name']
+    frame = frame.set_index(index_name)
+    if index_name == 'index':
+        frame.index.name = None
+    return frame
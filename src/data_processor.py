@@ -1,75 +1,544 @@
 import pandas as pd
 import numpy as np
+import re
+import os
+import threading
 from datetime import datetime, timedelta
+import data_cache
+from text_store import TextStore
+from instrumentation import span, count
 
-def load_and_process_data(file_path):
+# Bump whenever the processing below changes so stale caches get rebuilt
+PROCESSING_VERSION = "2"
+
+# Decimal places prices are quoted with; float32 holds these exactly enough
+# that rounding the widened value restores the original float64
+PRICE_DECIMALS = 2
+
+# stock_data_5_years.csv column -> processed column
+STRUCTURED_COLUMNS = {
+    'Date': 'date',
+    'Ticker': 'ticker',
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Volume': 'volume',
+    'Dividends': 'dividends',
+    'Stock Splits': 'stock_splits',
+    'SMA_50': 'sma_50',
+    'SMA_200': 'sma_200',
+    'RSI': 'rsi'
+}
+
+# Exchange the structured file's timestamps are local to; dates are taken
+# as that calendar day whatever the UTC offset (EST/EDT)
+MARKET_TIMEZONE = 'America/New_York'
+
+# Label columns joined from the textual file; the sentences are not needed
+LABEL_SOURCE_COLUMNS = ['id', 'date', 'ticker', 'emo_label', 'senti_label']
+
+# Free-text columns that compact mode moves out of the frame
+TEXT_COLUMNS = ['original', 'processed']
+LABEL_COLUMNS = ['ticker', 'emo_label', 'senti_label']
+
+def load_and_process_data(file_path, cache_dir=None, chunk_size=None, compact=False):
     """
     Load stock data from CSV and process it for analysis
+
+    When cache_dir is given, the processed frame is persisted there and reused
+    until the CSV (path, size, mtime) or PROCESSING_VERSION changes. chunk_size
+    parses the CSV in blocks of that many rows. compact=True returns the
+    smaller representation from compact_frame (cached separately).
+    """
+    with span('load_and_process_data', cached=cache_dir is not None, compact=compact):
+        process = _process_csv
+        if compact:
+            process = lambda path, size: compact_frame(_process_csv(path, size))
+            if cache_dir is not None:
+                cache_dir = os.path.join(cache_dir, 'compact')
+        
+        if cache_dir is None:
+            return process(file_path, chunk_size)
+        
+        key = data_cache.get_cache_key(file_path, PROCESSING_VERSION)
+        data = data_cache.load_frame(cache_dir, file_path, key)
+        if data is not None:
+            count('data_cache.hit')
+            return data
+        
+        count('data_cache.miss')
+        data = process(file_path, chunk_size)
+        try:
+            data_cache.save_frame(data, cache_dir, file_path, key)
+        except OSError:
+            # A read-only or full disk should never stop the dashboard from loading
+            pass
+        return data
+
+def load_structured_data(price_path, text_path=None, cache_dir=None, compact=False):
+    """
+    Load exact OHLCV prices and indicators, with sentiment joined from text_path
+
+    The structured CSV is read as typed numeric columns and its
+    timezone-aware Date normalised to the market calendar day. Emotion and
+    sentiment labels come from the textual CSV through a sorted
+    (ticker, date) index join, so no sentence is parsed. Rows keep the
+    textual file's row numbers as their index (unmatched price rows get
+    labels past its end), which keeps load_text_store lookups working.
+    Caching and compact work as in load_and_process_data.
+    """
+    with span('load_structured_data', cached=cache_dir is not None, compact=compact):
+        def process():
+            data = _process_structured(price_path, text_path)
+            return compact_frame(data) if compact else data
+        
+        if cache_dir is None:
+            return process()
+        
+        cache_dir = os.path.join(cache_dir, 'structured-compact' if compact else 'structured')
+        key = data_cache.get_cache_key(price_path, PROCESSING_VERSION)
+        if text_path is not None:
+            key += '-' + data_cache.get_cache_key(text_path, PROCESSING_VERSION)
+        data = data_cache.load_frame(cache_dir, price_path, key)
+        if data is not None:
+            count('data_cache.hit')
+            return data
+        
+        count('data_cache.miss')
+        data = process()
+        try:
+            data_cache.save_frame(data, cache_dir, price_path, key)
+        except OSError:
+            pass
+        return data
+
+def _market_dates(stamps):
+    """
+    Naive trading dates from timezone-aware timestamp strings
+    """
+    text = np.asarray(stamps, dtype=str)
+    # Bars stamped at exchange-local midnight (offsets differ across the DST
+    # switch) carry their trading date as the leading YYYY-MM-DD, so checking
+    # the fixed-width time field and converting the prefix avoids the much
+    # slower offset-aware parse
+    width = text.dtype.itemsize // 4
+    if width == 10:
+        return pd.Series(text.astype('datetime64[ns]'), index=stamps.index)
+    if len(text) and width >= 19:
+        clock = text.view('U1').reshape(len(text), -1)[:, 11:19]
+        if (clock == np.array(list('00:00:00'))).all():
+            return pd.Series(text.astype('U10').astype('datetime64[ns]'), index=stamps.index)
+    return (
+        pd.to_datetime(stamps, utc=True, format='ISO8601')
+        .dt.tz_convert(MARKET_TIMEZONE)
+        .dt.tz_localize(None)
+        .dt.normalize()
+    )
+
+def _process_structured(price_path, text_path=None):
+    # The C parser already types every numeric column (float64, int64 volume)
+    prices = pd.read_csv(price_path, usecols=list(STRUCTURED_COLUMNS)).rename(columns=STRUCTURED_COLUMNS)
+    prices['date'] = _market_dates(prices['date'])
+    
+    labels = None
+    if text_path is not None:
+        labels = pd.read_csv(text_path, usecols=LABEL_SOURCE_COLUMNS)
+        labels['date'] = pd.to_datetime(labels['date'], format='%Y-%m-%d')
+        labels['row'] = labels.index
+    return join_structured(prices, labels)
+
+def join_structured(prices, labels=None, unmatched_start=None):
+    """
+    Processed frame from typed price rows and label rows (with their 'row' number)
+
+    Price rows without labels are numbered from unmatched_start, by default
+    just past the largest matched row.
+    """
+    prices = prices.sort_values(['ticker', 'date'], kind='stable').set_index(['ticker', 'date'])
+    
+    if labels is not None:
+        labels = labels.sort_values(['ticker', 'date'], kind='stable').set_index(['ticker', 'date'])
+        # Both sides are sorted on (ticker, date), so the join is a merge of two sorted indexes
+        data = prices.join(labels, how='left')
+    else:
+        data = prices.assign(id=np.nan, emo_label=np.nan, senti_label=np.nan, row=np.nan)
+    
+    data = data.reset_index()
+    unmatched = data['row'].isna().to_numpy()
+    data['row'] = data['row'].fillna(-1).astype(np.int64)
+    if unmatched.any():
+        start = data['row'].max() + 1 if unmatched_start is None else unmatched_start
+        data.loc[unmatched, 'row'] = np.arange(start, start + unmatched.sum())
+    data = data.set_index('row')
+    data.index.name = None
+    
+    data['volume'] = data['volume'].astype(np.float64)
+    data['daily_return'] = data.groupby('ticker', sort=False)['close'].pct_change().fillna(0) * 100
+    data['sentiment_value'] = data['senti_label'].map(SENTIMENT_MAP).fillna(0).astype(np.int64)
+    
+    columns = ['id', 'date', 'ticker', 'emo_label', 'senti_label', 'open', 'high', 'low', 'close', 'volume',
+               'dividends', 'stock_splits', 'sma_50', 'sma_200', 'rsi', 'daily_return', 'sentiment_value']
+    return data[columns]
+
+# One pass over the text pulls both the price ("higher at" / "dropping to")
+# and the volume ("volume of" / "volume surging at") that follows it. The
+# pattern is matched line by line over all rows joined into one buffer.
+TEXT_PATTERN = re.compile(
+    r'^(?:.*?(?:higher at|dropping to) (\d+\.\d+))?'
+    r'(?:.*?volume (?:of|surging at) (\d+))?.*$',
+    re.MULTILINE
+)
+
+# Convert sentiment labels to binary (bullish=1, bearish=-1, neutral=0)
+SENTIMENT_MAP = {
+    'bullish': 1,
+    'bearish': -1,
+    'neutral': 0
+}
+
+def _process_csv(file_path, chunk_size=None):
+    """
+    Parse the textual CSV and derive price, volume and sentiment columns
+
+    With chunk_size set, the CSV is read and parsed in fixed-size blocks so the
+    raw text is never held twice; the per-ticker fill runs once at the end.
     """
-    # Load data
-    data = pd.read_csv(file_path)
+    if chunk_size is None:
+        data = parse_text_rows(pd.read_csv(file_path))
+    else:
+        chunks = [parse_text_rows(chunk) for chunk in pd.read_csv(file_path, chunksize=chunk_size)]
+        data = pd.concat(chunks)
     
+    return finalize_ticker_data(data)
+
+def parse_text_rows(data):
+    """
+    Derive typed date, price, volume and sentiment columns from raw textual rows
+    """
     # Convert date column to datetime
     data['date'] = pd.to_datetime(data['date'])
     
-    # Sort by date
-    data = data.sort_values(['ticker', 'date'])
-    
-    # Extract numeric price from text
-    data['price'] = data['original'].str.extract(r'higher at (\d+\.\d+)').astype(float)
+    # Extract price and volume from text in a single regex pass
+    data['price'], data['volume'] = extract_price_volume(data['original'])
     
-    # Extract price from alternative format if the above fails
-    price_mask = data['price'].isna()
-    if price_mask.any():
-        # Try alternative extraction patterns
-        alt_prices = data.loc[price_mask, 'original'].str.extract(r'dropping to (\d+\.\d+)').astype(float)
-        data.loc[price_mask, 'price'] = alt_prices
+    data['sentiment_value'] = data['senti_label'].map(SENTIMENT_MAP)
+    return data
+
+def extract_price_volume(texts):
+    """
+    Return (price, volume) float arrays parsed from a Series of sentences
+    """
+    texts = texts.fillna('').astype(str)
+    if texts.str.contains('\n', regex=False).any():
+        # Embedded newlines would break the one-match-per-line scan
+        texts = texts.str.replace('\n', ' ', regex=False)
     
-    # Extract volume from text
-    data['volume'] = data['original'].str.extract(r'volume (?:of|surging at) (\d+)').astype(float)
+    matches = TEXT_PATTERN.findall('\n'.join(texts.tolist()))
+    values = np.array(matches, dtype=str).reshape(-1, 2)
+    values[values == ''] = 'nan'
+    values = values.astype(float)
+    return values[:, 0], values[:, 1]
+
+def finalize_ticker_data(data, fill_volume=None):
+    """
+    Sort parsed rows per ticker and fill the gaps that need cross-row context
+
+    Missing volumes take fill_volume, by default the median of data's own.
+    """
+    # Sort by date
+    data = data.sort_values(['ticker', 'date'])
     
     # Create additional columns for analysis
     data['close'] = data['price']  # Rename price to close for clarity
     
     # Handle missing price values by forward-filling and then backward-filling
-    # This ensures there are no NaN values which would cause forecasting errors
-    for ticker in data['ticker'].unique():
-        ticker_mask = data['ticker'] == ticker
-        data.loc[ticker_mask, 'close'] = data.loc[ticker_mask, 'close'].fillna(method='ffill').fillna(method='bfill')
+    # within each ticker. This ensures there are no NaN values which would cause
+    # forecasting errors
+    data['close'] = data.groupby('ticker', sort=False)['close'].ffill()
+    data['close'] = data.groupby('ticker', sort=False)['close'].bfill()
     
     # Calculate daily returns
-    data['daily_return'] = data.groupby('ticker')['close'].pct_change() * 100
+    data['daily_return'] = data.groupby('ticker', sort=False)['close'].pct_change() * 100
     
     # Replace any NaN in daily_return with 0 (happens on first day of data)
     data['daily_return'] = data['daily_return'].fillna(0)
     
-    # Convert sentiment labels to binary (bullish=1, bearish=-1, neutral=0)
-    sentiment_map = {
-        'bullish': 1,
-        'bearish': -1,
-        'neutral': 0
-    }
-    data['sentiment_value'] = data['senti_label'].map(sentiment_map)
-    
     # Final check to remove any remaining NaN values
     data = data.fillna({
-        'volume': data['volume'].median(),
+        'volume': data['volume'].median() if fill_volume is None else fill_volume,
         'sentiment_value': 0
     })
     
+    # Keep the column order of the original single-pass loader
+    columns = [c for c in data.columns if c not in ('close', 'daily_return', 'sentiment_value')]
+    return data[columns + ['close', 'daily_return', 'sentiment_value']]
+
+def continue_ticker_data(rows, last_close, fill_volume):
+    """
+    Finish newly parsed rows that follow already processed data
+
+    Mirrors finalize_ticker_data for rows appended after the fact: closes are
+    forward-filled from each ticker's last known close (last_close maps
+    ticker -> close; tickers without one are back-filled from their own new
+    rows), returns continue from that close, and missing volumes take
+    fill_volume (the loaded data's median).
+    """
+    rows = rows.sort_values(['ticker', 'date'], kind='stable')
+    ticker = rows['ticker']
+    first = ~ticker.duplicated()
+    previous = ticker.map(last_close).astype(np.float64)
+    
+    # Seed each ticker's fill with the close it left off at
+    close = rows['price'].mask(first & rows['price'].isna(), previous)
+    close = close.groupby(ticker, sort=False).ffill().groupby(ticker, sort=False).bfill()
+    prior = close.groupby(ticker, sort=False).shift(1).mask(first, previous)
+    rows['close'] = close
+    rows['daily_return'] = ((close / prior - 1) * 100).fillna(0)
+    
+    rows = rows.fillna({'volume': fill_volume, 'sentiment_value': 0})
+    columns = [c for c in rows.columns if c not in ('close', 'daily_return', 'sentiment_value')]
+    return rows[columns + ['close', 'daily_return', 'sentiment_value']]
+
+def _fits_float32(values, decimals):
+    """
+    Whether float32 storage plus rounding to `decimals` gives back values exactly
+    """
+    narrowed = values.astype(np.float32).astype(np.float64)
+    return np.array_equal(np.round(narrowed, decimals), values, equal_nan=True)
+
+def compact_frame(data):
+    """
+    Smaller copy of a processed frame for large ticker universes
+
+    - the free-text columns are dropped (load_text_store serves them on demand)
+    - `price` is dropped: `close` is the same series with gaps filled, and a
+      boolean `row_complete` keeps which rows had every raw field, so model
+      inputs are built from exactly the rows the full frame would give
+    - tickers and labels become categoricals
+    - `close` is stored as float32 when every price survives the round trip
+      at PRICE_DECIMALS (restore_prices widens it again per ticker)
+    - volume, ids and sentiment use the narrowest exact integer type
+    """
+    complete = data[[c for c in TEXT_COLUMNS + ['price'] if c in data.columns]].notna().all(axis=1)
+    data = data.drop(columns=[c for c in TEXT_COLUMNS + ['price'] if c in data.columns])
+    
+    for name in LABEL_COLUMNS:
+        if name in data.columns:
+            data[name] = data[name].astype('category')
+    
+    close = data['close'].to_numpy(dtype=np.float64)
+    if _fits_float32(close, PRICE_DECIMALS):
+        data['close'] = close.astype(np.float32)
+    data['daily_return'] = data['daily_return'].astype(np.float32)
+    
+    for name in ('volume', 'id'):
+        if name not in data.columns:
+            continue
+        values = data[name].to_numpy()
+        if np.isfinite(values).all() and (values == np.round(values)).all() and len(values):
+            if values.min() >= 0 and values.max() <= np.iinfo(np.uint32).max:
+                data[name] = values.astype(np.uint32)
+    data['sentiment_value'] = data['sentiment_value'].astype(np.int8)
+    data['row_complete'] = complete.to_numpy()
     return data
 
+def restore_prices(data):
+    """
+    Frame with float64 closes, undoing compact_frame's float32 storage
+    """
+    if data['close'].dtype != np.float32:
+        return data
+    return data.assign(close=np.round(data['close'].to_numpy(dtype=np.float64), PRICE_DECIMALS))
+
+def memory_report(data):
+    """
+    Bytes and bytes per row for each column and in total (deep, index included)
+    """
+    usage = data.memory_usage(deep=True)
+    rows = max(len(data), 1)
+    report = pd.DataFrame({
+        'dtype': [str(data.index.dtype)] + [str(data[c].dtype) for c in usage.index[1:]],
+        'bytes': usage.values
+    }, index=usage.index)
+    report.loc['total'] = ['', int(usage.sum())]
+    report['bytes_per_row'] = report['bytes'] / rows
+    return report
+
+def load_text_store(file_path, cache_dir=None):
+    """
+    Lazily loaded sentences ('original') for the rows of a processed frame
+
+    Nothing is read until the first lookup; then the text column alone is
+    parsed from the CSV (or memory-mapped from cache_dir when cached).
+    """
+    directory = key = None
+    if cache_dir is not None:
+        directory = data_cache._source_dir(os.path.join(cache_dir, 'text'), file_path)
+        key = data_cache.get_cache_key(file_path, PROCESSING_VERSION)
+    return TextStore(directory, key, loader=lambda: pd.read_csv(file_path, usecols=['original'])['original'])
+
+class TickerPartitions:
+    """
+    Processed data sorted once by (ticker, date) with per-ticker row offsets
+
+    get() hands out contiguous row slices of the sorted frame instead of
+    boolean-mask copies, so switching tickers costs O(rows for that ticker).
+    The slices share memory with the partitioned frame and must be treated as
+    read-only; copy them before modifying anything in place. For compact
+    frames (float32 closes) get() returns a copy with float64 closes.
+    
+    append() adds rows for some tickers without touching the others: a
+    ticker that grows gets its own frame, and only that frame is rebuilt.
+    """
+    def __init__(self, data):
+        if not data['ticker'].is_monotonic_increasing:
+            data = data.sort_values(['ticker', 'date'], kind='stable')
+        self.data = data
+        
+        # Row offsets where the ticker value changes
+        values = data['ticker'].to_numpy()
+        bounds = np.flatnonzero(values[1:] != values[:-1]) + 1
+        starts = np.concatenate(([0], bounds)) if len(values) else np.array([], dtype=int)
+        stops = np.concatenate((bounds, [len(values)])) if len(values) else np.array([], dtype=int)
+        self.offsets = {
+            values[start]: (int(start), int(stop))
+            for start, stop in zip(starts, stops)
+        }
+        self.tickers = list(self.offsets)
+        # Tickers that received appended rows, each as its own frame
+        self._grown = {}
+        self._appended = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.data) + self._appended
+    
+    def __contains__(self, ticker):
+        return ticker in self.offsets or ticker in self._grown
+    
+    @property
+    def columns(self):
+        return self.data.columns
+    
+    def next_label(self):
+        """
+        Row label following the largest one loaded (0 when empty)
+        """
+        return int(self.data.index.max()) + 1 if len(self.data) else 0
+    
+    def median_volume(self):
+        """
+        Median volume of the loaded rows (0.0 when empty)
+        """
+        return float(self.data['volume'].median()) if len(self.data) else 0.0
+    
+    def _frame(self, ticker):
+        frame = self._grown.get(ticker)
+        if frame is None:
+            start, stop = self.offsets.get(ticker, (0, 0))
+            frame = self.data.iloc[start:stop]
+        return frame
+    
+    def get(self, ticker):
+        """
+        Rows for one ticker as a zero-copy slice (empty frame if unknown)
+        """
+        # Compact frames hand out a widened copy of the closes instead
+        return restore_prices(self._frame(ticker))
+    
+    def last_close(self, ticker):
+        """
+        Latest close for ticker (None if it has no rows)
+        """
+        frame = self._frame(ticker)
+        return float(restore_prices(frame.iloc[-1:])['close'].iloc[0]) if len(frame) else None
+    
+    def append(self, rows):
+        """
+        Add processed rows after each ticker's existing ones; returns the tickers changed
+
+        Rows are matched to the partitioned frame's columns and dtypes (compact
+        frames get compact rows). Readers keep seeing the previous frame until
+        the grown one is swapped in.
+        """
+        if len(rows) == 0:
+            return []
+        if 'row_complete' in self.data.columns and 'row_complete' not in rows.columns:
+            rows = compact_frame(rows)
+        rows = _conform_rows(rows, self.data)
+        changed = []
+        with self._lock:
+            for ticker, new in rows.groupby(rows['ticker'].astype(object), sort=False):
+                self._grown[ticker] = _concat_rows(self._frame(ticker), new)
+                self._appended += len(new)
+                changed.append(ticker)
+            if any(t not in self.offsets for t in changed):
+                self.tickers = sorted(set(self.tickers) | set(changed))
+        return changed
+
+def _conform_rows(rows, like):
+    """
+    rows with like's columns and, where the values allow, its dtypes
+
+    Categoricals gain any new labels; narrow numeric columns stay narrow
+    when the new values fit exactly and are left wider otherwise.
+    """
+    rows = rows.reindex(columns=like.columns)
+    for name in like.columns:
+        dtype = like[name].dtype
+        values = rows[name]
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories.union(pd.Index(values.dropna().astype(object).unique()), sort=False)
+            rows[name] = pd.Categorical(values.astype(object), categories=categories)
+        elif name == 'close' and dtype == np.float32:
+            if _fits_float32(values.to_numpy(dtype=np.float64), PRICE_DECIMALS):
+                rows[name] = values.astype(np.float32)
+        elif name == 'close' and values.dtype == np.float32:
+            # Compacted rows going into float64 closes get their exact prices back
+            rows[name] = np.round(values.to_numpy(dtype=np.float64), PRICE_DECIMALS)
+        elif pd.api.types.is_bool_dtype(dtype):
+            rows[name] = values.fillna(False).astype(bool)
+        elif pd.api.types.is_integer_dtype(dtype):
+            numbers = values.to_numpy(dtype=np.float64)
+            info = np.iinfo(dtype)
+            if np.isfinite(numbers).all() and (numbers == np.round(numbers)).all() \
+                    and (numbers >= info.min).all() and (numbers <= info.max).all():
+                rows[name] = numbers.astype(dtype)
+        elif pd.api.types.is_float_dtype(dtype):
+            rows[name] = values.astype(dtype)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            rows[name] = pd.to_datetime(values)
+    return rows
+
+def _concat_rows(current, rows):
+    """
+    current followed by conformed rows, widening current where rows need it
+    """
+    for name in rows.columns:
+        if isinstance(rows[name].dtype, pd.CategoricalDtype) and \
+                not current[name].cat.categories.equals(rows[name].cat.categories):
+            current = current.assign(**{name: current[name].cat.set_categories(rows[name].cat.categories)})
+    if 'close' in rows.columns and current['close'].dtype == np.float32 and rows['close'].dtype != np.float32:
+        current = restore_prices(current)
+    return pd.concat([current, rows])
+
 def get_unique_tickers(data):
     """
     Get list of unique tickers in the dataset
     """
+    # TickerPartitions and partition_store.PartitionStore keep their own list
+    if not isinstance(data, pd.DataFrame):
+        return data.tickers
     return sorted(data['ticker'].unique())
 
 def get_ticker_data(data, ticker):
     """
     Filter data for a specific ticker
     """
-    return data[data['ticker'] == ticker].copy()
+    if not isinstance(data, pd.DataFrame):
+        return data.get(ticker)
+    return restore_prices(data[data['ticker'] == ticker].copy())
 
 def generate_extended_dates(last_date, days=30):
     """
@@ -0,0 +1,223 @@
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import numpy as np
+
+from instrumentation import count
+
+# Seconds an added member may take before a forecast is blended without it
+DEFAULT_MEMBER_TIMEOUT = 30.0
+
+# Report statuses of members that should have been in a forecast but were not
+MISSING = ('timeout', 'error')
+
+# Latency samples kept per member for EnsembleRunner.metrics()
+LATENCY_SAMPLES = 1000
+
+class EnsembleMember:
+    """
+    A registered forecasting component
+
+    start(context) fits the member on one ticker and returns a path whose
+    step(days) gives the next `days` forecasts as a (1, days) array, or
+    None when the member cannot forecast that data (too little history).
+    context holds the date-sorted rows ('data'), the gap-filled closes
+    ('close'), 'ticker', the tuned 'params' and 'ml_model'. timeout=None
+    waits for the member however long it takes.
+    """
+    def __init__(self, name, start, timeout=DEFAULT_MEMBER_TIMEOUT):
+        self.name = name
+        self.start = start
+        self.timeout = timeout
+
+# Members in blend order; the first is the base the tuned blend weights apply to
+MEMBERS = OrderedDict()
+
+def register_member(name, start, timeout=DEFAULT_MEMBER_TIMEOUT):
+    """
+    Add or replace an ensemble member (see EnsembleMember)
+    """
+    MEMBERS[name] = EnsembleMember(name, start, timeout)
+    return MEMBERS[name]
+
+def unregister_member(name):
+    MEMBERS.pop(name, None)
+
+def missing_members(report):
+    """
+    Names of the members a runner report left out because they failed or timed out
+
+    A member that was 'skipped' cannot forecast the data at all, so it is
+    not missing.
+    """
+    return [name for name, (status, _) in report.items() if status in MISSING]
+
+def blend(paths, days, weights, base=None):
+    """
+    Ensemble forecast from the members' paths (name -> array of `days` values)
+
+    The base member (the first registered by default) gets a weight moving
+    linearly from weights[0] on the first day to weights[1] on the last;
+    the other members share the rest equally. Without the base, the others
+    are averaged; a lone member is used as is.
+    """
+    if not paths:
+        raise RuntimeError("No ensemble member produced a forecast")
+    base = base if base is not None else next(iter(MEMBERS), None)
+    others = [path for name, path in paths.items() if name != base]
+    if base not in paths:
+        return np.mean(others, axis=0)
+    if not others:
+        return paths[base]
+    # Combine with dynamic weight: more weight to the base early, the others later
+    w = np.linspace(weights[0], weights[1], days)
+    return paths[base] * w + np.mean(others, axis=0) * (1 - w)
+
+class MemberTrack:
+    """
+    One member's path over one ticker's data, started on first use and then stepped on
+
+    extend(days) returns the first `days` forecasts, fitting the member the
+    first time and stepping its path only past what was already computed.
+    """
+    def __init__(self, member, context):
+        self.member = member
+        self.context = context
+        self.path = None
+        self.started = False
+        self.values = np.empty(0)
+        self.lock = threading.Lock()
+
+    def ready(self, days):
+        """
+        True if extend(days) needs no work
+        """
+        return self.started and (self.path is None or len(self.values) >= days)
+
+    def extend(self, days):
+        with self.lock:
+            if not self.started:
+                self.path = self.member.start(self.context)
+                self.started = True
+                # Only start() needs the rows
+                self.context = None
+            if self.path is None:
+                return None
+            if days > len(self.values):
+                self.values = np.concatenate((self.values, self.path.step(days - len(self.values))[0]))
+            return self.values[:days]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+class EnsembleRunner:
+    """
+    Extends every member's track concurrently, each bounded by its timeout
+
+    Members run on threads (they share the in-process model registry and
+    trajectory cache, which a process pool could not), so a forecast takes
+    as long as its slowest member rather than the sum of all. Each member
+    has its own pool of `workers` threads, so one that hangs only holds up
+    itself. A member that raises, cannot forecast the data or misses its
+    timeout is left out of that forecast; a timed-out one keeps running and
+    its path is ready for later calls. Tracks that are already long enough
+    are sliced inline without touching the pools.
+    """
+    def __init__(self, workers=None):
+        self.workers = workers
+        self._executors = {}
+        self._lock = threading.Lock()
+        self._latency = {}
+        self.stats = {}
+
+    def _record(self, name, status, seconds):
+        with self._lock:
+            counts = self.stats.setdefault(name, {'ok': 0, 'cached': 0, 'skipped': 0, 'timeout': 0, 'error': 0})
+            counts[status] += 1
+            if status == 'ok':
+                self._latency.setdefault(name, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+        count(f'ensemble.{name}.{status}')
+
+    def _executor(self, name):
+        with self._lock:
+            if name not in self._executors:
+                self._executors[name] = ThreadPoolExecutor(max_workers=self.workers,
+                                                           thread_name_prefix=f'ensemble-{name}')
+            return self._executors[name]
+
+    @staticmethod
+    def _timed(track, days):
+        start = time.perf_counter()
+        values = track.extend(days)
+        return values, time.perf_counter() - start
+
+    def run(self, tracks, days):
+        """
+        ({name: first `days` forecasts} of the members that made it, {name: (status, ms)})
+
+        status is 'ok', 'cached', 'skipped' or one of MISSING; see missing_members.
+        """
+        paths, report, futures = {}, {}, {}
+        for name, track in tracks.items():
+            if track.ready(days):
+                values = track.extend(days)
+                status = 'cached' if values is not None else 'skipped'
+                if values is not None:
+                    paths[name] = values
+                report[name] = (status, 0.0)
+                self._record(name, status, 0.0)
+            else:
+                futures[name] = self._executor(name).submit(self._timed, track, days)
+
+        start = time.perf_counter()
+        for name, future in futures.items():
+            # Every member runs from the same start, so each waits out its own deadline
+            timeout = tracks[name].member.timeout
+            remaining = None if timeout is None else max(0.0, start + timeout - time.perf_counter())
+            try:
+                values, seconds = future.result(remaining)
+                status = 'ok' if values is not None else 'skipped'
+                if values is not None:
+                    paths[name] = values
+            except FutureTimeout:
+                status, seconds = 'timeout', time.perf_counter() - start
+            except Exception:
+                status, seconds = 'error', time.perf_counter() - start
+            report[name] = (status, seconds * 1e3)
+            self._record(name, status, seconds)
+        if missing_members(report):
+            count('ensemble.partial')
+        # Blend in registration order whatever order the members finished in
+        return {name: paths[name] for name in tracks if name in paths}, report
+
+    def metrics(self):
+        """
+        Per member: outcome counts and latency percentiles of the runs that finished
+        """
+        with self._lock:
+            metrics = {}
+            for name, counts in self.stats.items():
+                samples = np.array(self._latency.get(name, ())) * 1e3
+                latency = None if not len(samples) else {
+                    'p50_ms': float(np.percentile(samples, 50)),
+                    'p95_ms': float(np.percentile(samples, 95)),
+                    'max_ms': float(samples.max()),
+                    'samples': len(samples)
+                }
+                metrics[name] = {**counts, 'latency': latency}
+            return metrics
+
+_default_runner = None
+_default_runner_lock = threading.Lock()
+
+def get_default_runner():
+    """
+    Process-wide runner shared by every forecast
+    """
+    global _default_runner
+    with _default_runner_lock:
+        if _default_runner is None:
+            _default_runner = EnsembleRunner()
+        return _default_runner
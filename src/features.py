@@ -0,0 +1,309 @@
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Columns that follow the lag block, in model input order
+EXTRA_FEATURES = ['volume', 'sentiment_value', 'rolling_std', 'momentum']
+
+# Structured-source columns the models do not use; their gaps (e.g. the
+# warm-up rows of the moving averages) must not drop training rows
+AUXILIARY_COLUMNS = ['open', 'high', 'low', 'dividends', 'stock_splits', 'sma_50', 'sma_200', 'rsi']
+
+def feature_names(lookback):
+    """
+    Model input column names for a given lookback
+    """
+    return [f'lag_{lag}' for lag in range(1, lookback + 1)] + EXTRA_FEATURES
+
+def window_sums(close):
+    """
+    Prefix sums of the (centred) closes and their squares, with a leading zero
+
+    Pass them as build_design_matrix(..., sums=...) to share them across
+    several lookbacks of one series.
+    """
+    # Centring keeps the sum-of-squares formula from cancelling catastrophically
+    centred = close - close.mean() if len(close) else close
+    s1 = np.concatenate(([0.0], np.cumsum(centred)))
+    s2 = np.concatenate(([0.0], np.cumsum(centred * centred)))
+    return s1, s2
+
+def _rolling_std(close, s1, s2, rows, lookback):
+    """
+    Sample std (ddof=1) of close[t - lookback + 1 .. t] for each t in rows
+    """
+    if lookback < 2:
+        return np.zeros(len(rows))
+    total = s1[rows + 1] - s1[rows + 1 - lookback]
+    total_sq = s2[rows + 1] - s2[rows + 1 - lookback]
+    spread = total_sq - total * total / lookback
+    std = np.sqrt(np.maximum(spread, 0.0) / (lookback - 1))
+
+    # Where the windowed sums cancel too much (series spanning orders of
+    # magnitude), recompute those windows directly
+    unstable = spread <= total_sq * 1e-8
+    if unstable.any():
+        windows = sliding_window_view(close, lookback)
+        std[unstable] = windows[rows[unstable] + 1 - lookback].std(axis=1, ddof=1)
+    return std
+
+def build_design_matrix(close, volume, sentiment, lookback, valid=None, dtype=np.float64, sums=None):
+    """
+    Build the GBM design matrix straight from column arrays
+
+    Row t holds close[t-1] .. close[t-lookback], volume[t], sentiment[t], the
+    rolling std of the last `lookback` closes and close[t] - close[t-lookback];
+    the target is close[t]. Only rows with a full lag window (and valid[t],
+    if given) are emitted. Returns (X, y, rows) with X one C-contiguous block.
+    sums lets batch callers pass prefix sums shared across lookbacks.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    if n <= lookback:
+        return np.empty((0, lookback + len(EXTRA_FEATURES)), dtype=dtype), np.empty(0, dtype=dtype), np.empty(0, dtype=int)
+
+    rows = np.arange(lookback, n)
+    if valid is not None:
+        rows = rows[np.asarray(valid, dtype=bool)[lookback:]]
+
+    # windows[i] is a strided view of close[i:i + lookback]; reversing it gives
+    # lag_1 .. lag_lookback for t = i + lookback without materialising shifts
+    windows = sliding_window_view(close, lookback)[:, ::-1]
+    s1, s2 = sums if sums is not None else window_sums(close)
+
+    X = np.empty((len(rows), lookback + len(EXTRA_FEATURES)), dtype=dtype)
+    X[:, :lookback] = windows[rows - lookback]
+    X[:, lookback] = np.asarray(volume)[rows]
+    X[:, lookback + 1] = np.asarray(sentiment)[rows]
+    X[:, lookback + 2] = _rolling_std(close, s1, s2, rows, lookback)
+    X[:, lookback + 3] = close[rows] - close[rows - lookback]
+    return X, close[rows].astype(dtype), rows
+
+def frame_columns(data):
+    """
+    Date-sorted close/volume/sentiment arrays and the row validity mask
+    """
+    if not data['date'].is_monotonic_increasing:
+        data = data.sort_values('date')
+    # Rows with any missing field were dropped by the old DataFrame builder;
+    # compact frames record the dropped raw columns' gaps in row_complete
+    checked = data.drop(columns=[c for c in AUXILIARY_COLUMNS if c in data.columns])
+    valid = checked.notna().all(axis=1).to_numpy()
+    if 'row_complete' in data.columns:
+        valid &= data['row_complete'].to_numpy(dtype=bool)
+    return (
+        data,
+        data['close'].to_numpy(dtype=np.float64),
+        data['volume'].to_numpy(dtype=np.float64),
+        data['sentiment_value'].to_numpy(dtype=np.float64),
+        valid
+    )
+
+def frame_design_matrix(data, lookback, dtype=np.float64):
+    """
+    Design matrix (X, y, rows) for one ticker's DataFrame
+    """
+    _, close, volume, sentiment, valid = frame_columns(data)
+    return build_design_matrix(close, volume, sentiment, lookback, valid, dtype)
+
+def build_design_matrices(datasets, lookbacks, dtype=np.float64):
+    """
+    Batch mode: design matrices for many tickers and several lookbacks
+
+    datasets maps ticker -> DataFrame. Each ticker's columns and prefix sums
+    are extracted once and shared by every lookback. Returns a dict keyed by
+    (ticker, lookback) with (X, y) values.
+    """
+    matrices = {}
+    for ticker, data in datasets.items():
+        _, close, volume, sentiment, valid = frame_columns(data)
+        sums = window_sums(close)
+        for lookback in lookbacks:
+            X, y, _ = build_design_matrix(close, volume, sentiment, lookback, valid, dtype, sums=sums)
+            matrices[(ticker, lookback)] = (X, y)
+    return matrices
+
+class IncrementalFeatures:
+    """
+    Constant-memory feature state for one ticker's stream of bars
+
+    append() takes one bar and returns its design-matrix row exactly as
+    build_design_matrix lays it out (lags, volume, sentiment, rolling std,
+    momentum) with the close as target, in O(1): the closes sit in a mirrored
+    ring buffer, the rolling std is a sliding Welford update, and SMA sums and
+    RSI averages are running values. Running sums are re-derived from the
+    ring every `capacity` bars so rounding cannot drift over long streams.
+
+    indicators() gives the latest SMAs and RSI, matching the notebook's
+    pandas-ta sma(length) and rsi(14) (Wilder averages, adjusted EWM).
+    """
+    def __init__(self, lookback=30, sma_windows=(50, 200), rsi_length=14):
+        self.lookback = lookback
+        self.sma_windows = tuple(sma_windows)
+        self.rsi_length = rsi_length
+        # Enough closes for the lags, the momentum base and every value
+        # leaving an SMA window, all still readable after the newest write
+        self.capacity = max([lookback + 1] + [w + 1 for w in self.sma_windows])
+        # Each close is written twice so any recent window is one contiguous slice
+        self._ring = np.zeros(2 * self.capacity)
+        self._slot = -1
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._sums = [0.0] * len(self.sma_windows)
+        self._decay = 1.0 - 1.0 / rsi_length
+        self._gain = 0.0
+        self._loss = 0.0
+        self._weight = 0.0
+        self._last = None
+
+    def _recent(self, k):
+        """
+        The last k closes, oldest first (a view into the ring)
+        """
+        end = self._slot + self.capacity + 1
+        return self._ring[end - k:end]
+
+    def _resync(self):
+        window = self._recent(min(self.count, self.lookback))
+        self._mean = float(window.mean())
+        self._m2 = float(((window - self._mean) ** 2).sum())
+        self._sums = [float(self._recent(min(self.count, w)).sum()) for w in self.sma_windows]
+
+    def append(self, close, volume, sentiment, valid=True):
+        """
+        Add one bar; returns (row, target) or None when it yields no row
+
+        No row comes out until `lookback` earlier closes are known, or when
+        the bar is not valid (a missing field); its close still enters the
+        history, as in the batch builder.
+        """
+        x = float(close)
+        lookback, capacity, ring = self.lookback, self.capacity, self._ring
+        self.count += 1
+        n = self.count
+        self._slot = slot = (self._slot + 1) % capacity
+        ring[slot] = ring[slot + capacity] = x
+        newest = slot + capacity
+
+        # Sliding Welford over the last `lookback` closes (this one included)
+        if n <= lookback:
+            delta = x - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = ring[newest - lookback]
+            mean = self._mean + (x - old) / lookback
+            self._m2 += (x - old) * (x - mean + old - self._mean)
+            self._mean = mean
+
+        for i, w in enumerate(self.sma_windows):
+            self._sums[i] += x
+            if n > w:
+                self._sums[i] -= ring[newest - w]
+
+        if self._last is not None:
+            change = x - self._last
+            self._gain = self._gain * self._decay + max(change, 0.0)
+            self._loss = self._loss * self._decay + max(-change, 0.0)
+            self._weight = self._weight * self._decay + 1.0
+        self._last = x
+
+        if n % capacity == 0:
+            self._resync()
+
+        if n <= lookback or not valid or math.isnan(volume) or math.isnan(sentiment):
+            return None
+        row = np.empty(lookback + len(EXTRA_FEATURES))
+        row[:lookback] = ring[newest - lookback:newest][::-1]
+        row[lookback] = volume
+        row[lookback + 1] = sentiment
+        row[lookback + 2] = math.sqrt(max(self._m2, 0.0) / (lookback - 1)) if lookback >= 2 else 0.0
+        row[lookback + 3] = x - ring[newest - lookback]
+        return row, x
+
+    def extend(self, close, volume, sentiment, valid=None, dtype=np.float64):
+        """
+        Append many bars; returns the emitted (X, y) like build_design_matrix
+        """
+        valid = np.ones(len(close), dtype=bool) if valid is None else np.asarray(valid, dtype=bool)
+        rows = [
+            self.append(c, v, s, ok)
+            for c, v, s, ok in zip(np.asarray(close, dtype=np.float64).tolist(),
+                                   np.asarray(volume, dtype=np.float64).tolist(),
+                                   np.asarray(sentiment, dtype=np.float64).tolist(),
+                                   valid.tolist())
+        ]
+        rows = [r for r in rows if r is not None]
+        width = self.lookback + len(EXTRA_FEATURES)
+        if not rows:
+            return np.empty((0, width), dtype=dtype), np.empty(0, dtype=dtype)
+        return np.array([r[0] for r in rows], dtype=dtype), np.array([r[1] for r in rows], dtype=dtype)
+
+    @classmethod
+    def from_frame(cls, data, lookback=30, **options):
+        """
+        State caught up with one ticker's DataFrame
+        """
+        state = cls(lookback, **options)
+        _, close, volume, sentiment, valid = frame_columns(data)
+        state.extend(close, volume, sentiment, valid)
+        return state
+
+    def indicators(self):
+        """
+        Latest sma_<window> values and rsi (NaN until enough bars are seen)
+        """
+        values = {}
+        for w, total in zip(self.sma_windows, self._sums):
+            values[f'sma_{w}'] = total / w if self.count >= w else np.nan
+        # Price changes seen so far; the first bar has none
+        changes = self.count - 1
+        if changes >= self.rsi_length and self._gain + self._loss > 0:
+            values['rsi'] = 100.0 * self._gain / (self._gain + self._loss)
+        else:
+            values['rsi'] = np.nan
+        return values
+
+    def nbytes(self):
+        """
+        Memory held by the close ring (fixed by the window lengths)
+        """
+        return self._ring.nbytes
+
+class FeatureStream:
+    """
+    IncrementalFeatures per ticker, created on each ticker's first bar
+    """
+    def __init__(self, lookback=30, **options):
+        self.lookback = lookback
+        self.options = options
+        self._states = {}
+
+    def __contains__(self, ticker):
+        return ticker in self._states
+
+    @property
+    def tickers(self):
+        return list(self._states)
+
+    def seed(self, ticker, data):
+        """
+        Replace a ticker's state with one caught up with its DataFrame
+        """
+        self._states[ticker] = IncrementalFeatures.from_frame(data, self.lookback, **self.options)
+        return self._states[ticker]
+
+    def state(self, ticker):
+        if ticker not in self._states:
+            self._states[ticker] = IncrementalFeatures(self.lookback, **self.options)
+        return self._states[ticker]
+
+    def append(self, ticker, close, volume, sentiment, valid=True):
+        """
+        Add one bar for ticker; returns (row, target) or None
+        """
+        return self.state(ticker).append(close, volume, sentiment, valid)
+
+    def indicators(self, ticker):
+        return self.state(ticker).indicators()
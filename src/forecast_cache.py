@@ -0,0 +1,149 @@
+import os
+import threading
+from collections import OrderedDict
+
+from ensemble import MemberTrack
+from instrumentation import count, span
+
+# Default memory budget of the process-wide cache
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Assembled forecasts kept per trajectory (one per seed / path count / horizon / members)
+MAX_FRAMES = 32
+
+class Trajectory:
+    """
+    One ticker's ensemble member paths, grown to the longest horizon asked for
+
+    Every member's path is deterministic and each horizon's path is a
+    prefix of a longer one, so a shorter horizon is a slice. A longer
+    horizon refits nothing: each member steps on from where it stopped
+    (Holt from its fitted level and trend, the GBM recursion from its last
+    window). Forecasts assembled with a fixed seed are also kept, so
+    revisiting a horizon costs a copy.
+    """
+    def __init__(self, context, members):
+        self.tracks = OrderedDict((name, MemberTrack(member, context)) for name, member in members.items())
+        self.frames = OrderedDict()
+        self._frame_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def days(self):
+        return max((len(track.values) for track in self.tracks.values()), default=0)
+
+    def paths(self, days, runner):
+        """
+        ({name: first `days` forecasts}, {name: (status, ms)}) from runner.run, extending the tracks as needed
+        """
+        with span('forecast_cache.paths', start=self.days, days=days):
+            return runner.run(self.tracks, days)
+
+    def frame(self, key):
+        with self._lock:
+            entry = self.frames.get(key)
+            if entry is None:
+                return None
+            self.frames.move_to_end(key)
+            return entry[0]
+
+    def remember(self, key, frame):
+        nbytes = int(frame.memory_usage(index=True).sum())
+        with self._lock:
+            if key in self.frames:
+                return
+            self.frames[key] = (frame, nbytes)
+            self._frame_bytes += nbytes
+            while len(self.frames) > MAX_FRAMES:
+                self._frame_bytes -= self.frames.popitem(last=False)[1][1]
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            frame_bytes = self._frame_bytes
+        return sum(track.nbytes for track in self.tracks.values()) + frame_bytes
+
+class ForecastCache:
+    """
+    Memory-bounded LRU of forecast trajectories
+
+    Keyed by ticker, a hash of the data the paths are computed from and the
+    model configuration, so new bars or a retuned model start a fresh
+    trajectory while the stale one ages out. Least recently used
+    trajectories are dropped once their paths and kept forecasts exceed
+    max_bytes.
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'frame_hits': 0, 'evictions': 0}
+
+    def trajectory(self, key, start):
+        """
+        The trajectory stored under key; start() builds one on a miss
+        """
+        with self._lock:
+            trajectory = self._entries.get(key)
+            if trajectory is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                count('forecast_cache.hit')
+                return trajectory
+        trajectory = start()
+        with self._lock:
+            # Another thread may have started the same one meanwhile; keep the first
+            trajectory = self._entries.setdefault(key, trajectory)
+            self._entries.move_to_end(key)
+            self.stats['misses'] += 1
+        count('forecast_cache.miss')
+        return trajectory
+
+    def frame_hit(self):
+        with self._lock:
+            self.stats['frame_hits'] += 1
+        count('forecast_cache.frame_hit')
+
+    def trim(self):
+        """
+        Drop least recently used trajectories until under max_bytes
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+        sizes = {key: trajectory.nbytes for key, trajectory in entries}
+        total = sum(sizes.values())
+        with self._lock:
+            for key in list(self._entries):
+                if total <= self.max_bytes:
+                    break
+                self._entries.pop(key)
+                total -= sizes.get(key, 0)
+                self.stats['evictions'] += 1
+        return total
+
+    def nbytes(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return sum(trajectory.nbytes for trajectory in entries)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_default_cache = None
+
+def get_default_cache():
+    """
+    Process-wide cache, sized by STOCKORACLE_FORECAST_CACHE_MB (0 disables it)
+    """
+    global _default_cache
+    max_mb = float(os.environ.get('STOCKORACLE_FORECAST_CACHE_MB', DEFAULT_MAX_BYTES / 2**20))
+    if max_mb <= 0:
+        return None
+    if _default_cache is None:
+        _default_cache = ForecastCache(int(max_mb * 1024 * 1024))
+    return _default_cache
@@ -0,0 +1,303 @@
+import os
+import sys
+import time
+import queue
+import itertools
+import threading
+from collections import OrderedDict
+from instrumentation import count, span
+
+# Default memory budget for the results the pool keeps
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Horizons (in days) warmed for every ticker at startup, shortest first so
+# the dashboard's default view is ready soonest
+COMMON_HORIZONS = (1, 30, 365)
+
+# Queue order: lower runs first
+PRIORITY_REFRESH = 0
+PRIORITY_WARM = 1
+
+_STOP = object()
+
+class ForecastPool:
+    """
+    Background workers that precompute forecasts and serve them stale-while-revalidate
+
+    Results are kept per (ticker, days). get() returns the last computed
+    result straight away and, when it is older than max_age or the ticker was
+    invalidated, queues a refresh for a worker. Only a key that has never been
+    computed is forecast in the calling thread (or waited on, if a worker is
+    already on it). forecast_fn(data, days) does the work and data_fn(ticker)
+    supplies the ticker's history. A result partial_fn marks as partial (an
+    ensemble member missing) is served but kept stale, so the next get
+    computes it again. Once the kept results exceed max_bytes (None: no
+    limit), the least recently used idle ones are dropped and computed again
+    when next asked for.
+    """
+    def __init__(self, forecast_fn, data_fn, workers=None, max_age=None, partial_fn=None,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.forecast_fn = forecast_fn
+        self.data_fn = data_fn
+        self.partial_fn = partial_fn
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+        self._listeners = []
+        self.stats = {
+            'fresh_hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'computed': 0,
+            'partial': 0,
+            'errors': 0,
+            'evictions': 0
+        }
+        self._threads = [
+            threading.Thread(target=self._work, name=f'forecast-pool-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _entry(self, key):
+        # Caller holds self._lock; the key becomes the most recently used
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        else:
+            entry = self._entries[key] = {
+                'result': None,
+                'nbytes': 0,
+                'error': None,
+                'computed_at': None,
+                'generation': 0,
+                'computed_generation': -1,
+                'partial': False,
+                'state': 'idle',
+                'priority': None,
+                'requeue': False,
+                'done': threading.Event()
+            }
+        return entry
+
+    @staticmethod
+    def _result_nbytes(result):
+        if hasattr(result, 'memory_usage'):
+            return int(result.memory_usage(index=True).sum())
+        return sys.getsizeof(result)
+
+    def _evict(self, keep):
+        # Caller holds self._lock; queued, running and just-computed keys stay
+        if self.max_bytes is None:
+            return
+        for key in list(self._entries):
+            if self._nbytes <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if key == keep or entry['state'] != 'idle' or entry['computed_at'] is None:
+                continue
+            del self._entries[key]
+            self._nbytes -= entry['nbytes']
+            self.stats['evictions'] += 1
+            count('forecast_pool.eviction')
+
+    def _is_stale(self, entry):
+        if entry['partial'] or entry['computed_generation'] < entry['generation']:
+            return True
+        return self.max_age is not None and time.monotonic() - entry['computed_at'] > self.max_age
+
+    def _schedule(self, key, priority):
+        # Caller holds self._lock
+        entry = self._entry(key)
+        if entry['state'] == 'running':
+            return
+        if entry['state'] == 'queued' and entry['priority'] <= priority:
+            return
+        entry['state'] = 'queued'
+        entry['priority'] = priority
+        entry['done'].clear()
+        # A re-prioritised key is pushed again; the older item is skipped when popped
+        self._queue.put((priority, next(self._order), key))
+
+    def _run(self, key, generation):
+        ticker, days = key
+        try:
+            with span('forecast_pool.compute', ticker=ticker, days=days):
+                result, error = self.forecast_fn(self.data_fn(ticker), days), None
+        except Exception as e:
+            result, error = None, e
+
+        with self._lock:
+            entry = self._entries[key]
+            entry['state'] = 'idle'
+            entry['priority'] = None
+            if error is None:
+                nbytes = self._result_nbytes(result)
+                self._nbytes += nbytes - entry['nbytes']
+                entry['result'] = result
+                entry['nbytes'] = nbytes
+                entry['error'] = None
+                entry['computed_at'] = time.monotonic()
+                entry['computed_generation'] = generation
+                entry['partial'] = self.partial_fn is not None and bool(self.partial_fn(result))
+                self.stats['computed'] += 1
+                if entry['partial']:
+                    self.stats['partial'] += 1
+                    count('forecast_pool.partial')
+            else:
+                entry['error'] = error
+                self.stats['errors'] += 1
+            entry['done'].set()
+            if entry['requeue']:
+                # Invalidated with refresh while this run used older data
+                entry['requeue'] = False
+                self._schedule(key, PRIORITY_REFRESH)
+            self._evict(key)
+            listeners = list(self._listeners) if error is None else []
+        for listener in listeners:
+            listener(ticker, days, generation)
+
+    def _claim(self, key):
+        # Caller holds self._lock; marks the key as being computed
+        entry = self._entries[key]
+        entry['state'] = 'running'
+        entry['done'].clear()
+        return entry['generation']
+
+    def _work(self):
+        while True:
+            priority, _, key = self._queue.get()
+            if key is _STOP:
+                return
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or entry['state'] != 'queued' or entry['priority'] != priority:
+                    continue
+                generation = self._claim(key)
+                self._busy += 1
+            start = time.perf_counter()
+            try:
+                self._run(key, generation)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._busy_seconds += time.perf_counter() - start
+
+    def get(self, ticker, days, timeout=None):
+        """
+        Forecast for (ticker, days) and whether it is 'fresh', 'stale' or 'computed'
+
+        A stale result is returned as-is while a worker refreshes it.
+        """
+        key = (ticker, days)
+        with self._lock:
+            entry = self._entry(key)
+            if entry['computed_at'] is not None:
+                if self._is_stale(entry):
+                    self._schedule(key, PRIORITY_REFRESH)
+                    self.stats['stale_hits'] += 1
+                    count('forecast_pool.stale_hit')
+                    return entry['result'], 'stale'
+                self.stats['fresh_hits'] += 1
+                count('forecast_pool.fresh_hit')
+                return entry['result'], 'fresh'
+
+            self.stats['misses'] += 1
+            count('forecast_pool.miss')
+            # Nothing to serve yet: compute here unless a worker already is
+            generation = None if entry['state'] == 'running' else self._claim(key)
+            done = entry['done']
+
+        if generation is not None:
+            self._run(key, generation)
+        elif not done.wait(timeout):
+            raise TimeoutError(f"Forecast for {ticker} ({days} days) still running after {timeout}s")
+
+        # The entry itself, since the key may have been evicted meanwhile
+        with self._lock:
+            if entry['computed_at'] is None and entry['error'] is not None:
+                raise entry['error']
+            return entry['result'], 'computed'
+
+    def peek(self, ticker, days):
+        """
+        Last computed result for (ticker, days), or None, without scheduling work
+        """
+        with self._lock:
+            entry = self._entries.get((ticker, days))
+            return None if entry is None else entry['result']
+
+    def warm(self, tickers, horizons=COMMON_HORIZONS):
+        """
+        Queue background forecasts for every ticker at each horizon
+        """
+        with self._lock:
+            for days in horizons:
+                for ticker in tickers:
+                    key = (ticker, days)
+                    if key not in self._entries or self._entries[key]['computed_at'] is None:
+                        self._schedule(key, PRIORITY_WARM)
+
+    def invalidate(self, ticker=None, refresh=False):
+        """
+        Mark a ticker's results (all tickers' when None) stale
+
+        They are still served until the background refresh replaces them,
+        which is queued at once with refresh=True (otherwise on the next
+        get). Returns {(ticker, days): generation} for the keys affected; a
+        result computed at that generation or later reflects the change.
+        """
+        generations = {}
+        with self._lock:
+            # Scheduling touches the LRU order, so walk a snapshot
+            for key, entry in list(self._entries.items()):
+                if ticker is None or key[0] == ticker:
+                    entry['generation'] += 1
+                    generations[key] = entry['generation']
+                    if refresh and entry['state'] == 'running':
+                        entry['requeue'] = True
+                    elif refresh and entry['computed_at'] is not None:
+                        self._schedule(key, PRIORITY_REFRESH)
+        return generations
+
+    def add_listener(self, listener):
+        """
+        Call listener(ticker, days, generation) after every successful forecast
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def metrics(self):
+        """
+        Queue depth, busy workers, utilisation since start and hit/miss counts
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            return {
+                'workers': self.workers,
+                'busy_workers': self._busy,
+                'queue_depth': sum(1 for entry in self._entries.values() if entry['state'] == 'queued'),
+                'utilization': self._busy_seconds / (elapsed * self.workers) if elapsed > 0 else 0.0,
+                'cached': sum(1 for entry in self._entries.values() if entry['computed_at'] is not None),
+                'nbytes': self._nbytes,
+                **self.stats
+            }
+
+    def shutdown(self, wait=True):
+        """
+        Stop the workers once they finish their current forecast
+        """
+        for _ in self._threads:
+            self._queue.put((-1, next(self._order), _STOP))
+        if wait:
+            for thread in self._threads:
+                thread.join()
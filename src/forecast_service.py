@@ -0,0 +1,330 @@
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from core import DATA_PATH, PRICE_PATH, FORECAST_SEED, FORECAST_PATHS, load_partitions
+from data_processor import get_unique_tickers, get_ticker_data
+from forecasting import forecast_many, get_recommendation
+from ensemble import get_default_runner
+from global_model import GlobalForecaster
+from instrumentation import count, span
+from streaming import StreamIngestor, open_source
+
+# Same Monte Carlo settings as the dashboard, so both agree on a forecast
+DEFAULT_SEED = FORECAST_SEED
+DEFAULT_PATHS = FORECAST_PATHS
+MAX_DAYS = 36500
+# Monte Carlo paths per request; each forecast day draws this many samples
+MAX_PATHS = 10000
+
+class ServiceBusy(Exception):
+    pass
+
+class UnknownTicker(Exception):
+    pass
+
+class MicroBatcher:
+    """
+    Collects requests for a short window and runs them in groups on a worker pool
+
+    A batch is only formed once one of the `workers` threads is free, so
+    requests that arrive while every worker is busy accumulate and go out
+    together. The batch then takes everything queued plus whatever arrives
+    within window seconds (up to max_batch), is split by key_fn, and each
+    group is handed to run_group(items), which returns one result per item.
+    At most max_pending items may wait; beyond that submit() raises ServiceBusy.
+    """
+    def __init__(self, run_group, key_fn, window=0.01, max_batch=64, workers=None, max_pending=1024):
+        self.run_group = run_group
+        self.key_fn = key_fn
+        self.window = window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._free = threading.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='forecast-batch')
+        self.stats = {'requests': 0, 'batches': 0, 'groups': 0, 'rejected': 0}
+        self._collector = threading.Thread(target=self._collect, name='forecast-batcher', daemon=True)
+        self._collector.start()
+
+    def submit(self, item):
+        """
+        Queue one item; the returned Future resolves to its result
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats['rejected'] += 1
+                raise ServiceBusy(f"{self._pending} requests already pending")
+            self._pending += 1
+            self.stats['requests'] += 1
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        while True:
+            self._free.acquire()
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            groups = {}
+            for item, future in batch:
+                groups.setdefault(self.key_fn(item), []).append((item, future))
+            with self._lock:
+                self.stats['batches'] += 1
+                self.stats['groups'] += len(groups)
+            count('forecast_service.batched_requests', len(batch))
+            self._executor.submit(self._run, list(groups.values()))
+
+    def _run(self, groups):
+        try:
+            for group in groups:
+                try:
+                    results = self.run_group([item for item, _ in group])
+                except Exception as e:
+                    results = [e] * len(group)
+                with self._lock:
+                    self._pending -= len(group)
+                for (_, future), result in zip(group, results):
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+        finally:
+            self._free.release()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+class ForecastService:
+    """
+    Headless forecasts and recommendations for the processed ticker data
+
+    Requests for the same ticker, seed and path count that land in one batch
+    share feature building, training and a single recursive GBM run to the
+    longest requested horizon (forecasting.forecast_many).
+    """
+    def __init__(self, partitions, window=0.01, max_batch=64, workers=None, max_pending=1024, ml_model=None):
+        self.partitions = partitions
+        # A fitted GlobalForecaster replaces the per-ticker GBM when given
+        self.ml_model = ml_model
+        # Set when new rows are streamed into the partitions (see main)
+        self.ingestor = None
+        self.batcher = MicroBatcher(
+            self._run_group,
+            key_fn=lambda request: (request['ticker'], request['seed'], request['paths']),
+            window=window,
+            max_batch=max_batch,
+            workers=workers,
+            max_pending=max_pending
+        )
+
+    @property
+    def tickers(self):
+        return get_unique_tickers(self.partitions)
+
+    def parse_request(self, params):
+        """
+        Validate ticker/days/seed/paths and fill in defaults
+
+        Raises UnknownTicker or ValueError for requests that cannot be served.
+        """
+        ticker = str(params.get('ticker', '')).upper()
+        # Checked against the partitions so streamed-in tickers are served too
+        if ticker not in self.partitions:
+            raise UnknownTicker(ticker)
+        days = int(params.get('days', 30))
+        if not 1 <= days <= MAX_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_DAYS}")
+        seed = params.get('seed', DEFAULT_SEED)
+        paths = int(params.get('paths', DEFAULT_PATHS))
+        if not 0 <= paths <= MAX_PATHS:
+            raise ValueError(f"paths must be between 0 and {MAX_PATHS}")
+        return {
+            'ticker': ticker,
+            'days': days,
+            'seed': None if seed is None else int(seed),
+            'paths': paths
+        }
+
+    def _run_group(self, requests):
+        ticker, seed, paths = requests[0]['ticker'], requests[0]['seed'], requests[0]['paths']
+        horizons = sorted({request['days'] for request in requests})
+        with span('forecast_service.group', ticker=ticker, requests=len(requests), horizons=len(horizons)):
+            data = get_ticker_data(self.partitions, ticker)
+            forecasts = forecast_many(data, horizons, seed=seed, n_paths=paths, ml_model=self.ml_model)
+            frames = dict(zip(horizons, forecasts))
+            latest_price = float(data['close'].iloc[-1])
+            return [self._response(request, frames[request['days']], latest_price) for request in requests]
+
+    @staticmethod
+    def _response(request, forecast_data, latest_price):
+        future = forecast_data[forecast_data['forecast'] == True]
+        forecast_price = float(future['predicted_price'].iloc[-1])
+        price_change = (forecast_price - latest_price) / latest_price * 100 if latest_price > 0 else 0.0
+        prob_gain = float(future['prob_gain'].iloc[-1]) if 'prob_gain' in future.columns else None
+        recommendation, confidence = get_recommendation(price_change, prob_gain)
+
+        columns = [c for c in ('predicted_price', 'p5', 'p95') if c in future.columns]
+        return {
+            **request,
+            'latest_price': latest_price,
+            'forecast_price': forecast_price,
+            'price_change': price_change,
+            'prob_gain': prob_gain,
+            'recommendation': recommendation,
+            'confidence': float(confidence),
+            'missing_members': forecast_data.attrs.get('missing_members', []),
+            'dates': future['date'].dt.strftime('%Y-%m-%d').tolist(),
+            **{c: future[c].round(4).tolist() for c in columns}
+        }
+
+    def forecast(self, params, timeout=None):
+        """
+        Blocking forecast for one request dict (see parse_request)
+        """
+        return self.batcher.submit(self.parse_request(params)).result(timeout)
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'tickers': len(self.tickers),
+            'queue_depth': self.batcher.queue_depth(),
+            **self.batcher.stats,
+            'ensemble': get_default_runner().metrics(),
+            **({'stream': self.ingestor.metrics()} if self.ingestor is not None else {})
+        }
+
+def make_handler(service):
+    class ForecastHandler(BaseHTTPRequestHandler):
+        """
+        GET /health, GET /tickers, GET /forecast?ticker=..&days=.. and POST /forecast
+        """
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _forecast(self, params):
+            try:
+                self._send(200, service.forecast(params))
+            except UnknownTicker as e:
+                self._send(404, {'error': f"unknown ticker {e.args[0]!r}"})
+            except (ValueError, TypeError) as e:
+                self._send(400, {'error': str(e)})
+            except ServiceBusy as e:
+                self._send(503, {'error': str(e)})
+            except Exception as e:
+                self._send(500, {'error': str(e)})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/health':
+                self._send(200, service.health())
+            elif url.path == '/tickers':
+                self._send(200, {'tickers': sorted(service.tickers)})
+            elif url.path == '/forecast':
+                self._forecast({k: v[-1] for k, v in parse_qs(url.query).items()})
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/forecast':
+                self._send(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                params = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._send(400, {'error': 'body must be a JSON object'})
+                return
+            if not isinstance(params, dict):
+                self._send(400, {'error': 'body must be a JSON object'})
+                return
+            self._forecast(params)
+
+        def log_message(self, format, *args):
+            # Keep stderr quiet under load; failures still come back as JSON
+            pass
+
+    return ForecastHandler
+
+def make_server(service, host='127.0.0.1', port=8765):
+    """
+    Threaded HTTP server bound to host:port (port 0 picks a free one)
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+def load_service(data_path=DATA_PATH, price_path=PRICE_PATH, store_dir=None, **kwargs):
+    """
+    Load and partition the data, then build a ForecastService over it
+
+    Prices come from price_path (exact OHLC) when it exists, joined with the
+    labels in data_path; pass price_path=None to parse them from the text.
+    With store_dir the data is served from a per-ticker partition store
+    there instead of being held in memory.
+    """
+    partitions = load_partitions(data_path, price_path, store_dir)
+    if partitions is None:
+        raise RuntimeError(f"No data could be loaded from {data_path}")
+    return ForecastService(partitions, **kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless JSON forecasting service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--prices', default=PRICE_PATH, help="structured price CSV ('' to parse prices from --data)")
+    parser.add_argument('--window-ms', type=float, default=10, help='micro-batch collection window')
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--workers', type=int, help='concurrent forecast groups')
+    parser.add_argument('--max-pending', type=int, default=1024, help='queued requests before answering 503')
+    parser.add_argument('--model', choices=['ticker', 'global'], default='ticker',
+                        help='one GBM per ticker, or one fitted across all tickers')
+    parser.add_argument('--store', help='serve from a per-ticker partition store in this directory (built if missing)')
+    parser.add_argument('--stream', help='ingest new textual rows from a CSV to tail, a named pipe or tcp://host:port')
+    args = parser.parse_args()
+
+    service = load_service(args.data, args.prices or None, args.store, window=args.window_ms / 1e3, max_batch=args.max_batch,
+                           workers=args.workers, max_pending=args.max_pending)
+    if args.model == 'global':
+        # With --store only one partition at a time is loaded to build the training matrix
+        service.ml_model = GlobalForecaster().fit(service.partitions)
+    if args.stream:
+        # Requests read the partitions directly, so appended rows need no invalidation
+        service.ingestor = StreamIngestor(service.partitions, open_source(args.stream)).start()
+    server = make_server(service, args.host, args.port)
+    print(f"Serving forecasts for {len(service.tickers)} tickers on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
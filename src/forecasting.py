@@ -1,106 +1,241 @@
+import os
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import warnings
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-from sklearn.ensemble import HistGradientBoostingRegressor
-import streamlit as st
+from holt import HoltPath, holt_forecast, holt_state
+from ensemble import MEMBERS, blend as blend_members, get_default_runner, missing_members, register_member
+from forecast_cache import Trajectory, get_default_cache
+from features import build_design_matrix, feature_names, frame_design_matrix, frame_columns
+from model_registry import ModelRegistry, data_version, get_default_registry
+from instrumentation import span, traced
+from tuned_params import get_params
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
 
-# Cache feature engineering to avoid recomputation
-@st.cache_data(show_spinner=False)
+@traced('prepare_features')
 def prepare_features(data, lookback):
-    df = data.copy().sort_values('date')
-    # lagged close values
-    for lag in range(1, lookback + 1):
-        df[f'lag_{lag}'] = df['close'].shift(lag)
-    # rolling volatility and momentum
-    df['rolling_std'] = df['close'].rolling(window=lookback).std().fillna(0)
-    df['momentum'] = df['close'] - df['close'].shift(lookback)
-    # keep volume and sentiment
-    features = [f'lag_{lag}' for lag in range(1, lookback + 1)] + ['volume', 'sentiment_value', 'rolling_std', 'momentum']
-    df.dropna(inplace=True)
+    """
+    Lagged close, volatility and momentum features as a DataFrame.
+
+    The matrix itself comes from features.build_design_matrix; ml_forecast
+    uses that directly and skips the DataFrame round trip.
+    """
+    data_sorted, close, volume, sentiment, valid = frame_columns(data)
+    X, _, rows = build_design_matrix(close, volume, sentiment, lookback, valid)
+    features = feature_names(lookback)
+    df = data_sorted.iloc[rows].copy()
+    df[features] = X
     return df, features
 
-# Cache model training to reuse across runs
-@st.cache_resource(show_spinner=False)
-def train_ml_model(X, y, max_iter=100):
+@traced('train_ml_model.fit')
+def _fit_gbm(X, y, max_iter):
+    # Imported on first fit: sklearn takes most of a cold start to import
+    from sklearn.ensemble import HistGradientBoostingRegressor
     # Use fast histogram-based gradient boosting
     model = HistGradientBoostingRegressor(max_iter=max_iter)
     model.fit(X, y)
     return model
 
-@st.cache_data(show_spinner=False)
-def holt_winters_forecast(price_series, days):
+# Trained models live in an on-disk registry so restarts and other worker
+# processes reuse them instead of retraining
+def train_ml_model(X, y, max_iter=100, ticker=None, lookback=None, registry=None):
+    registry = registry or get_default_registry()
+    with span('train_ml_model', ticker=ticker):
+        with span('train_ml_model.hash'):
+            version = data_version(X, y)
+        key = ModelRegistry.make_key(
+            ticker if ticker is not None else 'any',
+            version,
+            lookback if lookback is not None else X.shape[1] - 4,
+            max_iter
+        )
+        return registry.get_or_train(key, lambda: _fit_gbm(X, y, max_iter))
+
+@traced('holt_winters_forecast')
+def holt_winters_forecast(price_series, days, key=None):
     """
     Fast Holt's linear trend exponential smoothing.
+
+    With a key (the ticker), the fitted parameters and final state are kept so
+    horizon changes reuse them and new bars only update the state.
     """
-    model = ExponentialSmoothing(
-        price_series,
-        trend='add',
-        seasonal=None,
-        initialization_method='estimated'
-    ).fit(optimized=True)
-    return np.array(model.forecast(days))
+    return holt_forecast(price_series, days, key=key)
 
 
-def ml_forecast(data, days, lookback=30, max_iter=50):
+class RecursivePath:
     """
-    Forecast via gradient boosting on lagged features.
+    A fitted lag model stepped forward for several series, resumable.
+
+    windows holds the last `lookback` closes per series (oldest first) and
+    exog the matching [volume, sentiment] pairs, so every horizon step is a
+    single predict on an (n_series, n_features) matrix. step(days) returns
+    the next `days` predictions and keeps the state, so stepping 30 and
+    then 335 days gives exactly the 365-day path.
+    """
+    def __init__(self, model, windows, exog):
+        windows = np.atleast_2d(np.asarray(windows, dtype=float))
+        n, lookback = windows.shape
+        self.model = model
+        self.lookback = lookback
+        self.steps = 0
+
+        # Mirrored ring buffer: each value is written twice so the current window
+        # is always the contiguous slice ring[:, head:head + lookback]
+        self.ring = np.concatenate([windows, windows], axis=1)
+        self.head = 0
+
+        # Running mean / squared deviations (Welford) over every value so far,
+        # matching np.std of the ever-growing history without rescanning it
+        self.count = lookback
+        self.mean = windows.mean(axis=1)
+        self.m2 = ((windows - self.mean[:, None]) ** 2).sum(axis=1)
+        self.first = windows[:, 0].copy()
+
+        self.X = np.empty((n, lookback + 4))
+        self.X[:, lookback:lookback + 2] = np.broadcast_to(np.asarray(exog, dtype=float), (n, 2))
+
+    def step(self, days):
+        """
+        The next `days` predictions per series, as an (n_series, days) array
+        """
+        lookback, ring, X, mean, m2 = self.lookback, self.ring, self.X, self.mean, self.m2
+        head, count = self.head, self.count
+        forecast = np.empty((len(ring), days))
+        for i in range(days):
+            X[:, :lookback] = ring[:, head:head + lookback]
+            X[:, lookback + 2] = np.sqrt(m2 / count)
+            X[:, lookback + 3] = ring[:, head + lookback - 1] - self.first
+            pred = self.model.predict(X)
+            forecast[:, i] = pred
+
+            # Overwrite the oldest slot in both mirrors and advance
+            ring[:, head] = pred
+            ring[:, head + lookback] = pred
+            head = (head + 1) % lookback
+
+            count += 1
+            delta = pred - mean
+            mean += delta / count
+            m2 += delta * (pred - mean)
+        self.head, self.count = head, count
+        self.steps += days
+        return forecast
+
+
+@traced('recursive_forecast')
+def recursive_forecast(model, windows, exog, days):
+    """
+    Step a fitted lag model forward for several series at once (see RecursivePath)
+    """
+    return RecursivePath(model, windows, exog).step(days)
+
+
+def ml_path(data, lookback=30, max_iter=50, scenarios=None):
+    """
+    RecursivePath of the gradient boosting model fitted on data's lagged features.
+
+    None if the history is too short. scenarios optionally lists
+    [volume, sentiment] pairs to forecast together from the same history;
+    otherwise the last volume and sentiment are held fixed.
     """
     if len(data) < lookback + 1:
         return None
 
-    df_feat, features = prepare_features(data, lookback)
-    if df_feat.empty:
+    with span('ml_forecast.features'):
+        X, y, _ = frame_design_matrix(data, lookback)
+    if len(X) == 0:
         return None
 
-    X = df_feat[features].values
-    y = df_feat['close'].values
-    model = train_ml_model(X, y, max_iter)
+    ticker = data['ticker'].iloc[0] if 'ticker' in data.columns else None
+    model = train_ml_model(X, y, max_iter, ticker=ticker, lookback=lookback)
 
     # iterative forecasting
     last_window = data.sort_values('date').tail(lookback)
-    last_values = last_window['close'].tolist()
-    last_vol = last_window['volume'].iloc[-1]
-    last_sent = last_window['sentiment_value'].iloc[-1]
+    window = last_window['close'].to_numpy(dtype=float)
+
+    if scenarios is None:
+        exog = [last_window['volume'].iloc[-1], last_window['sentiment_value'].iloc[-1]]
+        return RecursivePath(model, window, exog)
 
-    forecast = []
-    for i in range(days):
-        row = last_values[-lookback:] + [last_vol, last_sent,
-                                          np.std(last_values),
-                                          last_values[-1] - last_values[0]]
-        pred = model.predict(np.array(row).reshape(1, -1))[0]
-        forecast.append(pred)
-        last_values.append(pred)
-    return np.array(forecast)
+    exog = np.asarray(scenarios, dtype=float).reshape(-1, 2)
+    windows = np.repeat(window[None, :], len(exog), axis=0)
+    return RecursivePath(model, windows, exog)
 
 
-def forecast_stock_prices(data, days=30):
+@traced('ml_forecast')
+def ml_forecast(data, days, lookback=30, max_iter=50, scenarios=None):
     """
-    Fast ensemble forecast: Holt–Winters + ML.
+    Forecast via gradient boosting on lagged features.
+
+    scenarios optionally lists [volume, sentiment] pairs to forecast together
+    from the same history; a (len(scenarios), days) array is returned then.
     """
-    df = data.copy().sort_values('date')
-    price_series = np.nan_to_num(df['close'].values, nan=np.nanmean(df['close'].values))
-    last_price = price_series[-1]
+    path = ml_path(data, lookback, max_iter, scenarios)
+    if path is None:
+        return None
+    forecast = path.step(days)
+    return forecast[0] if scenarios is None else forecast
 
-    # Generate HW and ML forecasts in parallel
-    hw = holt_winters_forecast(price_series, days)
-    ml = ml_forecast(df, days)
 
-    # Combine with dynamic weight: more weight to HW early, ML later
-    weights = np.linspace(0.7, 0.3, days)
-    if ml is not None:
-        forecast_values = hw * weights + ml * (1 - weights)
-    else:
-        forecast_values = hw
+@traced('simulate_forecast_paths')
+def simulate_forecast_paths(base, noise_scale, last_price, n_paths=10000, seed=None,
+                            dtype=np.float64, max_chunk_bytes=64 * 1024 * 1024):
+    """
+    Monte Carlo bands around a point forecast.
+
+    Draws n_paths noisy paths (base + N(0, noise_scale), floored at 0.01) and
+    returns per-day p5/p50/p95 and the probability of ending above last_price.
+    Days are simulated in horizon chunks so at most max_chunk_bytes of draws
+    are alive at once; draws are taken day by day, so a given seed yields the
+    same result whatever the chunk size.
+    """
+    rng = np.random.default_rng(seed)
+    days = len(base)
+    itemsize = np.dtype(dtype).itemsize
+    chunk_days = max(1, int(max_chunk_bytes // (n_paths * itemsize)))
+
+    bands = np.empty((3, days))
+    prob_gain = np.empty(days)
+    for start in range(0, days, chunk_days):
+        stop = min(days, start + chunk_days)
+        # One row of n_paths draws per forecast day
+        paths = rng.standard_normal((stop - start, n_paths), dtype=dtype)
+        paths *= np.asarray(noise_scale[start:stop], dtype=dtype)[:, None]
+        paths += np.asarray(base[start:stop], dtype=dtype)[:, None]
+        np.maximum(paths, 0.01, out=paths)
+        bands[:, start:stop] = np.quantile(paths, [0.05, 0.5, 0.95], axis=1)
+        prob_gain[start:stop] = (paths > last_price).mean(axis=1)
+
+    return {
+        'p5': bands[0],
+        'p50': bands[1],
+        'p95': bands[2],
+        'prob_gain': prob_gain
+    }
+
+
+def _assemble_forecast(df, price_series, paths, days, seed, n_paths, dtype, blend=(0.7, 0.3)):
+    """
+    Blend the members' paths, add noise / bands and attach the history
+
+    blend gives the base (Holt) weight on the first and last forecast day.
+    """
+    last_price = price_series[-1]
+
+    forecast_values = blend_members(paths, days, blend)
 
     # Vectorized noise injection
     hist_vol = np.std(np.diff(price_series))
     noise_scale = hist_vol * (1 + np.arange(1, days + 1) / days)
-    forecast_values = np.maximum(0.01, forecast_values + np.random.randn(days) * noise_scale)
+    if n_paths:
+        bands = simulate_forecast_paths(forecast_values, noise_scale, last_price,
+                                        n_paths=n_paths, seed=seed, dtype=dtype)
+        forecast_values = bands['p50']
+    else:
+        rng = np.random.default_rng(seed)
+        forecast_values = np.maximum(0.01, forecast_values + rng.standard_normal(days) * noise_scale)
 
     # Build DataFrame
     last_date = df['date'].max()
@@ -111,18 +246,152 @@ def forecast_stock_prices(data, days=30):
         'predicted_price': forecast_values,
         'forecast': True
     })
+    if n_paths:
+        forecast_df['p5'] = bands['p5']
+        forecast_df['p95'] = bands['p95']
+        forecast_df['prob_gain'] = bands['prob_gain']
     hist_df = df[['date', 'close']].copy()
     hist_df['predicted_price'] = hist_df['close']
     hist_df['forecast'] = False
     return pd.concat([hist_df, forecast_df], ignore_index=True)
 
 
-def get_recommendation(price_change):
+@traced('forecast_stock_prices')
+def forecast_stock_prices(data, days=30, seed=None, n_paths=0, dtype=np.float64, ml_model=None, cache=None,
+                          runner=None):
+    """
+    Fast ensemble forecast: Holt–Winters + ML (or the registered ensemble members).
+
+    With n_paths > 0 the noise is simulated as that many Monte Carlo paths and
+    the median is returned as the forecast, alongside p5/p95 bands and the
+    probability of gain. seed makes either mode reproducible. ml_model, a
+    fitted global_model.GlobalForecaster, replaces the per-ticker GBM.
+    cache and runner are as in forecast_many.
+    """
+    return forecast_many(data, [days], seed=seed, n_paths=n_paths, dtype=dtype, ml_model=ml_model, cache=cache,
+                         runner=runner)[0]
+
+
+def _trajectory_key(df, price_series, ticker, params, ml_model):
+    # Everything the Holt / GBM paths depend on: the rows the features are
+    # built from (and their validity), the last date and the model settings
+    _, close, volume, sentiment, valid = frame_columns(df)
+    version = data_version(price_series, close, volume, sentiment, valid,
+                           df['date'].to_numpy(dtype='datetime64[ns]').view(np.int64))
+    model = ('gbm', params['lookback'], params['max_iter']) if ml_model is None else ('global', ml_model)
+    return (ticker, version) + model + (tuple(MEMBERS),)
+
+
+def _start_holt(context):
+    return HoltPath(*holt_state(context['close'], key=context['ticker']))
+
+
+def _start_gbm(context):
+    if context['ml_model'] is not None:
+        return context['ml_model'].path(context['data'])
+    params = context['params']
+    return ml_path(context['data'], lookback=params['lookback'], max_iter=params['max_iter'])
+
+
+# Seconds a forecast waits for the GBM (STOCKORACLE_GBM_TIMEOUT; 0 waits
+# however long it takes). Past it the forecast falls back to Holt and lists
+# 'gbm' in missing_members; the GBM keeps running, so the cached trajectory
+# (and the forecast pool's refresh) picks its path up once it is done
+GBM_TIMEOUT = float(os.environ.get('STOCKORACLE_GBM_TIMEOUT', 10))
+
+# Holt is the base member the tuned blend weights apply to; it is cheap, so
+# it is always waited for
+register_member('holt', _start_holt, timeout=None)
+register_member('gbm', _start_gbm, timeout=GBM_TIMEOUT if GBM_TIMEOUT > 0 else None)
+
+
+@traced('forecast_many')
+def forecast_many(data, horizons, seed=None, n_paths=0, dtype=np.float64, ml_model=None, cache=None,
+                  runner=None):
+    """
+    forecast_stock_prices for several horizons of one ticker in one pass.
+
+    Holt and the GBM are fitted once and stepped to the longest horizon; both
+    paths are deterministic, so each shorter horizon is a prefix of them and
+    every returned frame matches a separate forecast_stock_prices call. The
+    GBM lookback / max_iter and the blend weights are the ticker's tuned
+    values (tuning.py), or the defaults.
+
+    The paths are kept in a forecast_cache.ForecastCache (the process-wide
+    one unless cache is given; cache=False bypasses it), so a later call on
+    the same data slices them for a shorter horizon and steps them on from
+    the end for a longer one. With a seed, the returned frames are kept too.
+
+    The members (ensemble.MEMBERS) are run concurrently by an
+    ensemble.EnsembleRunner (the process-wide one unless runner is given),
+    so the forecast waits for the slowest member rather than all of them in
+    turn. A member that fails or misses its timeout is left out of the blend
+    and listed in each frame's attrs['missing_members'] (empty otherwise).
+    """
+    df = data.copy().sort_values('date')
+    price_series = np.nan_to_num(df['close'].values, nan=np.nanmean(df['close'].values))
+    longest = max(horizons)
+
+    ticker = df['ticker'].iloc[0] if 'ticker' in df.columns else None
+    params = get_params(ticker)
+    if cache is None:
+        cache = get_default_cache()
+    elif cache is False:
+        cache = None
+    if runner is None:
+        runner = get_default_runner()
+    context = {'data': df, 'close': price_series, 'ticker': ticker, 'params': params, 'ml_model': ml_model}
+    start = lambda: Trajectory(context, MEMBERS)
+    if cache is None:
+        trajectory = start()
+    else:
+        trajectory = cache.trajectory(_trajectory_key(df, price_series, ticker, params, ml_model), start)
+    paths, report = trajectory.paths(longest, runner)
+    missing = missing_members(report)
+    # A forecast missing a member is not the full ensemble's and is kept apart
+    members = tuple(paths)
+
+    results = []
+    for days in horizons:
+        # Random noise (seed=None) must be drawn again on every call
+        key = None if cache is None or seed is None else (days, seed, n_paths, np.dtype(dtype).str,
+                                                          tuple(params['weights']), members)
+        frame = trajectory.frame(key) if key is not None else None
+        if frame is not None:
+            cache.frame_hit()
+        else:
+            frame = _assemble_forecast(df, price_series, {name: path[:days] for name, path in paths.items()},
+                                       days, seed, n_paths, dtype, blend=params['weights'])
+            if key is not None:
+                trajectory.remember(key, frame)
+        # Callers may modify what they get; the kept frame stays intact
+        frame = frame.copy() if key is not None else frame
+        frame.attrs['missing_members'] = list(missing)
+        results.append(frame)
+    if cache is not None:
+        cache.trim()
+    return results
+
+
+def get_recommendation(price_change, prob_gain=None):
     """
     BUY/HOLD/SELL recommendation based on % change.
+
+    When the simulated probability of gain is known, confidence reflects how
+    many paths agree with the call instead of the size of the move.
     """
     if price_change > 5:
-        return "BUY", min(100, 50 + price_change)
-    if price_change < -5:
-        return "SELL", min(100, 50 + abs(price_change))
-    return "HOLD", max(0, 50 - abs(price_change) * 5)
+        recommendation, confidence = "BUY", min(100, 50 + price_change)
+    elif price_change < -5:
+        recommendation, confidence = "SELL", min(100, 50 + abs(price_change))
+    else:
+        recommendation, confidence = "HOLD", max(0, 50 - abs(price_change) * 5)
+
+    if prob_gain is not None:
+        if recommendation == "BUY":
+            confidence = prob_gain * 100
+        elif recommendation == "SELL":
+            confidence = (1 - prob_gain) * 100
+        else:
+            confidence = (1 - abs(2 * prob_gain - 1)) * 100
+    return recommendation, confidence
@@ -0,0 +1,206 @@
+import numpy as np
+from features import frame_columns, build_design_matrix
+from model_registry import ModelRegistry, data_version, get_default_registry
+from instrumentation import span, traced
+
+# Sector of each bundled ticker; any other ticker is grouped under 'Other'
+SECTORS = {
+    'AAPL': 'Technology',
+    'ADBE': 'Technology',
+    'CSCO': 'Technology',
+    'MSFT': 'Technology',
+    'NVDA': 'Technology',
+    'GOOGL': 'Communication Services',
+    'NFLX': 'Communication Services',
+    'AMZN': 'Consumer Discretionary',
+    'TSLA': 'Consumer Discretionary',
+    'JPM': 'Financials'
+}
+
+# HistGradientBoosting takes at most max_bins - 1 categories per feature;
+# larger universes pass the ticker as an ordinal code instead
+MAX_TICKER_CATEGORIES = 254
+
+def relative_features(lags, volume, sentiment, ticker_codes, sector_codes):
+    """
+    Scale-free model inputs, so one model can serve tickers of any price level
+
+    lags holds each row's previous closes, lag_1 first. Older lags become
+    their return relative to lag_1, and the window's std is also divided by
+    lag_1. Volume is log-scaled, and the ticker and sector codes go last.
+    Nothing here depends on the close being predicted.
+    """
+    lags = np.asarray(lags, dtype=np.float64)
+    n, lookback = lags.shape
+    last = lags[:, :1]
+    X = np.empty((n, lookback + 4))
+    X[:, :lookback - 1] = lags[:, 1:] / last - 1
+    X[:, lookback - 1] = lags.std(axis=1, ddof=1) / last[:, 0] if lookback > 1 else 0.0
+    X[:, lookback] = np.log1p(np.maximum(volume, 0))
+    X[:, lookback + 1] = sentiment
+    X[:, lookback + 2] = ticker_codes
+    X[:, lookback + 3] = sector_codes
+    return X
+
+def iter_frames(datasets):
+    """
+    (ticker, DataFrame) pairs from a dict, or from partitions one ticker at a time
+
+    Partitions (anything with `tickers` and `get`, such as TickerPartitions
+    or a PartitionStore) are read lazily, so a store only loads the ticker
+    being used.
+    """
+    if hasattr(datasets, 'tickers'):
+        return ((ticker, datasets.get(ticker)) for ticker in datasets.tickers)
+    return iter(datasets.items())
+
+class GlobalPath:
+    """
+    The shared model stepped forward for several tickers, resumable
+
+    lags holds each ticker's last closes, lag_1 first. step(days) returns
+    the next `days` closes per ticker and keeps the lags, so later calls
+    continue the same paths.
+    """
+    def __init__(self, model, lags, volume, sentiment, ticker_codes, sector_codes):
+        self.model = model
+        self.lags = np.array(lags, dtype=np.float64)
+        self.volume = volume
+        self.sentiment = sentiment
+        self.ticker_codes = ticker_codes
+        self.sector_codes = sector_codes
+
+    def step(self, days):
+        """
+        The next `days` closes per ticker, as an (n_tickers, days) array
+        """
+        lags = self.lags
+        forecast = np.empty((len(lags), days))
+        for i in range(days):
+            X = relative_features(lags, self.volume, self.sentiment, self.ticker_codes, self.sector_codes)
+            forecast[:, i] = lags[:, 0] * (1 + self.model.predict(X))
+            # The new close becomes lag_1 and the oldest lag drops out
+            lags[:, 1:] = lags[:, :-1]
+            lags[:, 0] = forecast[:, i]
+        return forecast
+
+class GlobalForecaster:
+    """
+    One gradient-boosting model for every ticker, stepped forward for all at once
+
+    fit() stacks every ticker's lag windows into one training matrix and
+    fits once. The target is the next close's return over lag_1, so a
+    single model covers every price level. forecast_all() advances many
+    tickers together with one predict per horizon step. Unknown tickers
+    are forecast with a missing ticker code.
+    """
+    def __init__(self, lookback=30, max_iter=100, registry=None):
+        self.lookback = lookback
+        self.max_iter = max_iter
+        self.registry = registry
+        self.model = None
+        self.ticker_codes = {}
+        self.sector_codes = {}
+
+    def _codes(self, tickers):
+        ticker_codes = np.array([self.ticker_codes.get(t, np.nan) for t in tickers], dtype=np.float64)
+        sector_codes = np.array([
+            self.sector_codes.get(SECTORS.get(t, 'Other'), np.nan) for t in tickers
+        ], dtype=np.float64)
+        return ticker_codes, sector_codes
+
+    def training_matrix(self, datasets):
+        """
+        Stacked (X, y) over datasets (ticker -> DataFrame, or partitions)
+        """
+        blocks, targets = [], []
+        for ticker, data in iter_frames(datasets):
+            _, close, volume, sentiment, valid = frame_columns(data)
+            X, y, rows = build_design_matrix(close, volume, sentiment, self.lookback, valid)
+            if len(X) == 0:
+                continue
+            ticker_codes, sector_codes = self._codes([ticker] * len(X))
+            # The previous day's volume and sentiment: the target day's own
+            # label is derived from its move and is unknown when forecasting
+            blocks.append(relative_features(X[:, :self.lookback], volume[rows - 1], sentiment[rows - 1],
+                                            ticker_codes, sector_codes))
+            targets.append(y / X[:, 0] - 1)
+        if not blocks:
+            return np.empty((0, self.lookback + 4)), np.empty(0)
+        return np.concatenate(blocks), np.concatenate(targets)
+
+    @traced('global_model.fit')
+    def fit(self, datasets):
+        """
+        Fit the shared model on every ticker in datasets (ticker -> DataFrame, or partitions)
+
+        Given partitions, each ticker's rows are read, turned into its
+        design matrix and released before the next, so only the stacked
+        training matrix is held rather than every ticker's frame.
+        """
+        tickers = sorted(datasets.tickers if hasattr(datasets, 'tickers') else datasets)
+        self.ticker_codes = {t: i for i, t in enumerate(tickers)}
+        self.sector_codes = {s: i for i, s in enumerate(sorted({SECTORS.get(t, 'Other') for t in tickers}))}
+        with span('global_model.features', tickers=len(tickers)):
+            X, y = self.training_matrix(datasets)
+
+        lookback = self.lookback
+        categorical = np.zeros(X.shape[1], dtype=bool)
+        categorical[lookback + 3] = True
+        categorical[lookback + 2] = len(tickers) <= MAX_TICKER_CATEGORIES
+
+        def train():
+            # Imported on first fit, as in forecasting._fit_gbm
+            from sklearn.ensemble import HistGradientBoostingRegressor
+            model = HistGradientBoostingRegressor(max_iter=self.max_iter, categorical_features=categorical)
+            return model.fit(X, y)
+
+        registry = self.registry or get_default_registry()
+        key = ModelRegistry.make_key('global', data_version(X, y), lookback, self.max_iter)
+        self.model = registry.get_or_train(key, train)
+        return self
+
+    @traced('global_model.forecast_all')
+    def forecast_all(self, datasets, days):
+        """
+        Forecast paths (ticker -> array of `days` closes) for many tickers at once
+
+        Each ticker starts from its last `lookback` closes, with its last
+        volume and sentiment held fixed. Tickers with a shorter history
+        are skipped.
+        """
+        tickers, windows, volume, sentiment = [], [], [], []
+        for ticker, data in datasets.items():
+            _, close, vol, senti, _ = frame_columns(data)
+            if len(close) < self.lookback:
+                continue
+            tickers.append(ticker)
+            windows.append(close[-self.lookback:][::-1])
+            volume.append(vol[-1])
+            sentiment.append(senti[-1])
+        if not tickers:
+            return {}
+
+        ticker_codes, sector_codes = self._codes(tickers)
+        path = GlobalPath(self.model, np.array(windows), np.array(volume), np.array(sentiment),
+                          ticker_codes, sector_codes)
+        return dict(zip(tickers, path.step(days)))
+
+    def path(self, data):
+        """
+        Resumable GlobalPath for one ticker's DataFrame (None if its history is too short)
+        """
+        _, close, volume, sentiment, _ = frame_columns(data)
+        if len(close) < self.lookback:
+            return None
+        ticker = data['ticker'].iloc[0] if 'ticker' in data.columns else None
+        ticker_codes, sector_codes = self._codes([ticker])
+        return GlobalPath(self.model, close[-self.lookback:][::-1][None, :], volume[-1:], sentiment[-1:],
+                          ticker_codes, sector_codes)
+
+    def forecast(self, data, days):
+        """
+        GBM path for one ticker's DataFrame (None if its history is too short)
+        """
+        ticker = data['ticker'].iloc[0] if 'ticker' in data.columns and len(data) else None
+        return self.forecast_all({ticker: data}, days).get(ticker)
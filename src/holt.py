@@ -0,0 +1,207 @@
+import threading
+import numpy as np
+from instrumentation import count
+
+# Same lower bound statsmodels keeps alpha away from 0 and 1 with
+LOWER_BOUND = np.sqrt(np.finfo(float).eps)
+
+# Bars kept from the end of the series to recognise it being extended
+TAIL_BARS = 16
+
+# Coarse (alpha, beta/alpha) grid used to seed a cold-start fit
+_GRID = [(a, u) for a in (0.05, 0.2, 0.4, 0.6, 0.8, 0.95) for u in (0.01, 0.1, 0.3, 0.6, 0.9)]
+
+def _transfer(alpha, beta):
+    """
+    IIR coefficients mapping observations to one-step-ahead predictions
+
+    With state x = (level, trend), Holt's recursions are linear:
+    x_t = M x_{t-1} + g y_t and yhat_t = l_{t-1} + b_{t-1}, so the whole
+    prediction path can be run through scipy's C filter instead of a loop.
+    """
+    trace = 2 - alpha - alpha * beta
+    det = 1 - alpha
+    num = [0.0, alpha * (1 + beta), -alpha]
+    den = [1.0, -trace, det]
+    return num, den
+
+def _residual_basis(y, alpha, beta):
+    """
+    Residuals are r - A @ [l0, b0]; return (r, A) for given smoothing params
+    """
+    # scipy is imported on first use so importing this module stays cheap
+    from scipy.signal import lfilter
+    num, den = _transfer(alpha, beta)
+    trace = -den[1]
+    impulse = np.zeros(len(y))
+    impulse[0] = 1.0
+    # Contribution of the initial level / trend to each prediction: sequences
+    # h M^(t-1) e_k, which follow the same AR(2) recursion as the filter
+    from_level = lfilter([1.0, (1 - alpha - alpha * beta) - trace], den, impulse)
+    from_trend = lfilter([1.0, 0.0], den, impulse)
+    r = y - lfilter(num, den, y)
+    return r, np.column_stack([from_level, from_trend])
+
+def _concentrated_sse(y, alpha, beta):
+    """
+    SSE with the initial level and trend solved in closed form
+    """
+    r, A = _residual_basis(y, alpha, beta)
+    theta, *_ = np.linalg.lstsq(A, r, rcond=None)
+    resid = r - A @ theta
+    return float(resid @ resid), theta
+
+def _unpack(p):
+    alpha = p[0]
+    # beta is searched as a fraction of alpha so beta <= alpha, as in statsmodels
+    return alpha, alpha * p[1]
+
+class HoltLinear:
+    """
+    Holt's additive-trend exponential smoothing in NumPy/SciPy
+
+    Fits alpha/beta by minimising the one-step SSE (initial level and trend are
+    solved exactly for each candidate), keeps the final level/trend state and
+    can absorb new bars in O(new bars) without refitting.
+    """
+    def __init__(self, alpha=None, beta=None):
+        self.alpha = alpha
+        self.beta = beta
+        self.level = None
+        self.trend = None
+        self.initial_level = None
+        self.initial_trend = None
+        self.sse = None
+        self.n_obs = 0
+        self._head = None
+        self._tail = np.empty(0)
+
+    @property
+    def is_fitted(self):
+        return self.level is not None
+
+    def fit(self, y, warm_start=True):
+        """
+        Estimate parameters on y; reuse the previous alpha/beta as the start
+        """
+        y = np.asarray(y, dtype=float)
+        if len(y) < 3:
+            raise ValueError("Holt's linear trend needs at least 3 observations")
+
+        from scipy.optimize import minimize
+        bounds = [(LOWER_BOUND, 1 - LOWER_BOUND), (0.0, 1.0)]
+        objective = lambda p: _concentrated_sse(y, *_unpack(p))[0]
+
+        if warm_start and self.alpha is not None:
+            start = (self.alpha, self.beta / self.alpha)
+        else:
+            scores = [objective(p) for p in _GRID]
+            start = _GRID[int(np.argmin(scores))]
+
+        result = minimize(objective, np.clip(start, LOWER_BOUND, 1 - LOWER_BOUND),
+                          method='L-BFGS-B', bounds=bounds)
+        self.alpha, self.beta = (float(v) for v in _unpack(result.x))
+        self.sse, (l0, b0) = _concentrated_sse(y, self.alpha, self.beta)
+
+        self.initial_level, self.initial_trend = float(l0), float(b0)
+        self.level, self.trend = self.initial_level, self.initial_trend
+        self.n_obs = 0
+        self._head = y[0]
+        self._tail = np.empty(0)
+        self.update(y)
+        return self
+
+    def update(self, new_values):
+        """
+        Advance the level/trend state through new bars without refitting
+        """
+        new_values = np.asarray(new_values, dtype=float)
+        alpha, beta = self.alpha, self.beta
+        level, trend = self.level, self.trend
+        for value in new_values:
+            prev_level = level
+            level = alpha * value + (1 - alpha) * (level + trend)
+            trend = beta * (level - prev_level) + (1 - beta) * trend
+        self.level, self.trend = level, trend
+        self.n_obs += len(new_values)
+        self._tail = np.concatenate([self._tail, new_values[-TAIL_BARS:]])[-TAIL_BARS:]
+        return self
+
+    def extends(self, y):
+        """
+        True if y is the series seen so far plus zero or more new bars
+
+        Only the first bar and the last TAIL_BARS seen are compared, so the
+        check costs the same whatever the history length; a series revised
+        further back than that needs refit=True.
+        """
+        n = self.n_obs
+        if not self.is_fitted or len(y) < n:
+            return False
+        return y[0] == self._head and np.array_equal(y[n - len(self._tail):n], self._tail)
+
+    def forecast(self, days):
+        """
+        Linear-trend forecast for the next `days` steps
+        """
+        return self.level + self.trend * np.arange(1, days + 1)
+
+# Per-key fitted models, shared across reruns in this process; each key has
+# its own lock so background workers can fit different tickers concurrently
+_models = {}
+_model_locks = {}
+_models_lock = threading.Lock()
+
+def holt_state(price_series, key=None, refit=False):
+    """
+    (level, trend) of a per-key HoltLinear after price_series, fitting only when needed
+
+    A series that extends the one last seen for `key` (see
+    HoltLinear.extends) only updates the state; anything else (or
+    refit=True) re-estimates, warm-started from the previous alpha/beta.
+    """
+    y = np.asarray(price_series, dtype=float)
+    if key is None:
+        model = HoltLinear().fit(y)
+        return model.level, model.trend
+
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = HoltLinear()
+            _model_locks[key] = threading.Lock()
+        lock = _model_locks[key]
+
+    with lock:
+        if model.is_fitted and not refit and model.extends(y):
+            count('holt.state_reuse')
+            if len(y) > model.n_obs:
+                model.update(y[model.n_obs:])
+        else:
+            count('holt.fit')
+            model.fit(y)
+        return model.level, model.trend
+
+class HoltPath:
+    """
+    Linear-trend forecast from a fixed level and trend, stepped on in pieces
+
+    step(days) returns the next `days` values as a (1, days) array, the
+    same numbers as one HoltLinear.forecast over the whole horizon.
+    """
+    def __init__(self, level, trend):
+        self.level = level
+        self.trend = trend
+        self.steps = 0
+
+    def step(self, days):
+        h = np.arange(self.steps + 1, self.steps + days + 1)
+        self.steps += days
+        return (self.level + self.trend * h)[None, :]
+
+def holt_forecast(price_series, days, key=None, refit=False):
+    """
+    Forecast with a per-key HoltLinear, fitting only when needed (see holt_state)
+    """
+    level, trend = holt_state(price_series, key, refit)
+    return level + trend * np.arange(1, days + 1)
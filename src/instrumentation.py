@@ -0,0 +1,177 @@
+import os
+import io
+import json
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from collections import deque, defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+# STOCKORACLE_PERF=1 turns on span timing and counters; STOCKORACLE_PROFILE
+# adds heavier capture for outermost spans: "cprofile", "tracemalloc" or both
+# (comma separated). With neither set every hook is a flag check.
+ENABLED = os.environ.get('STOCKORACLE_PERF', '').lower() in ('1', 'true', 'yes', 'on')
+PROFILE_MODES = {m.strip() for m in os.environ.get('STOCKORACLE_PROFILE', '').lower().split(',') if m.strip()}
+if PROFILE_MODES:
+    ENABLED = True
+
+logger = logging.getLogger('stockoracle.perf')
+
+_NULL_SPAN = nullcontext()
+_local = threading.local()
+_lock = threading.Lock()
+_profiler_lock = threading.Lock()
+_recent = deque(maxlen=500)
+_totals = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+_counters = defaultdict(int)
+
+def enable(profile=None):
+    """
+    Turn instrumentation on at runtime, optionally with profile modes
+    """
+    global ENABLED, PROFILE_MODES
+    ENABLED = True
+    if profile is not None:
+        PROFILE_MODES = set(profile)
+    _ensure_log_handler()
+
+def disable():
+    global ENABLED, PROFILE_MODES
+    ENABLED = False
+    PROFILE_MODES = set()
+
+def _ensure_log_handler():
+    # Emit bare JSON lines unless the host application configured logging
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+def _emit(record):
+    logger.info(json.dumps(record, default=str))
+
+@contextmanager
+def _span(name, fields):
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+
+    profiler = None
+    trace_memory = False
+    if depth == 0 and PROFILE_MODES:
+        # cProfile allows one active profiler per interpreter
+        if 'cprofile' in PROFILE_MODES and _profiler_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        if 'tracemalloc' in PROFILE_MODES:
+            trace_memory = True
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1e3
+        _local.depth = depth
+        record = {
+            'event': 'span',
+            'name': name,
+            'ms': round(elapsed_ms, 3),
+            'depth': depth,
+            'thread': threading.current_thread().name
+        }
+        record.update(fields)
+
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(15)
+            record['profile'] = out.getvalue()
+        if trace_memory:
+            record['peak_mib'] = round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+
+        with _lock:
+            _recent.append(record)
+            totals = _totals[name]
+            totals['count'] += 1
+            totals['total_ms'] += elapsed_ms
+            totals['max_ms'] = max(totals['max_ms'], elapsed_ms)
+        run = getattr(_local, 'run', None)
+        if run is not None:
+            run.append(record)
+
+        _emit({k: v for k, v in record.items() if k != 'profile'})
+
+def span(name, **fields):
+    """
+    Context manager timing one pipeline stage (a no-op when disabled)
+    """
+    if not ENABLED:
+        return _NULL_SPAN
+    return _span(name, fields)
+
+def traced(name=None):
+    """
+    Decorator form of span(); the name defaults to the function's
+    """
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, n=1):
+    """
+    Increment a named counter such as a cache hit or miss
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] += n
+
+def start_run():
+    """
+    Collect the spans recorded by this thread from now on (one script run)
+    """
+    _local.run = []
+    return _local.run
+
+def run_spans():
+    """
+    Spans recorded by this thread since start_run()
+    """
+    return list(getattr(_local, 'run', None) or [])
+
+def snapshot():
+    """
+    Counters, per-stage aggregates and the most recent spans
+    """
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'stages': {name: dict(totals) for name, totals in _totals.items()},
+            'recent': list(_recent)
+        }
+
+def reset():
+    with _lock:
+        _recent.clear()
+        _totals.clear()
+        _counters.clear()
+
+if ENABLED:
+    _ensure_log_handler()
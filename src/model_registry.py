@@ -0,0 +1,177 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from instrumentation import count
+
+# Default on-disk location, shared by every process started from this checkout
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", ".cache", "models")
+
+def data_version(*arrays):
+    """
+    Short content hash of the arrays a model is trained on
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    for array in arrays:
+        digest.update(str(array.shape).encode('utf-8'))
+        digest.update(str(array.dtype).encode('utf-8'))
+        digest.update(memoryview(array).cast('B') if array.flags.c_contiguous else array.tobytes())
+    return digest.hexdigest()
+
+class ModelRegistry:
+    """
+    Size-bounded on-disk store of trained models shared across processes
+
+    Models are pickled to one file per (ticker, data version, lookback,
+    max_iter). File mtimes double as the LRU clock, so recency is shared by
+    every process using the same directory. Recently used models are also kept
+    in a small in-process dict so reruns do not unpickle them again.
+    """
+    def __init__(self, root=DEFAULT_MODEL_DIR, max_bytes=256 * 1024 * 1024, memory_slots=32):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.memory_slots = memory_slots
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'memory_hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'load_seconds': 0.0,
+            'trains': 0,
+            'train_seconds': 0.0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def make_key(ticker, version, lookback, max_iter):
+        safe_ticker = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(ticker))
+        return f"{safe_ticker}-{version}-lb{lookback}-it{max_iter}"
+
+    def _path(self, key):
+        return os.path.join(self.root, key + '.pkl')
+
+    def _remember(self, key, model):
+        self._memory[key] = model
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_slots:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Return the model stored under key, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                self.stats['memory_hits'] += 1
+                count('model_registry.memory_hit')
+                return self._memory[key]
+
+        path = self._path(key)
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+            # Touch so other processes see this entry as recently used
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            with self._lock:
+                self.stats['misses'] += 1
+            count('model_registry.miss')
+            return None
+
+        with self._lock:
+            self.stats['hits'] += 1
+            self.stats['loads'] += 1
+            self.stats['load_seconds'] += time.perf_counter() - start
+            self._remember(key, model)
+        count('model_registry.disk_hit')
+        return model
+
+    def put(self, key, model):
+        """
+        Store a model and evict least recently used entries over the budget
+        """
+        with self._lock:
+            self._remember(key, model)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+            self.evict()
+        except OSError:
+            # The in-process copy still serves this worker
+            pass
+
+    def get_or_train(self, key, train_fn):
+        """
+        Load the model for key, training and storing it with train_fn on a miss
+        """
+        model = self.get(key)
+        if model is not None:
+            return model
+        start = time.perf_counter()
+        model = train_fn()
+        with self._lock:
+            self.stats['trains'] += 1
+            self.stats['train_seconds'] += time.perf_counter() - start
+        self.put(key, model)
+        return model
+
+    def evict(self):
+        """
+        Delete least recently used model files until under max_bytes
+        """
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.stats['evictions'] += 1
+                self._memory.pop(name[:-len('.pkl')], None)
+
+    def clear(self):
+        """
+        Drop every stored model, on disk and in memory
+        """
+        with self._lock:
+            self._memory.clear()
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.root, name))
+
+_default_registry = None
+
+def get_default_registry():
+    """
+    Process-wide registry, configurable via STOCKORACLE_MODEL_DIR / STOCKORACLE_MODEL_CACHE_MB
+    """
+    global _default_registry
+    if _default_registry is None:
+        root = os.environ.get('STOCKORACLE_MODEL_DIR', DEFAULT_MODEL_DIR)
+        max_mb = float(os.environ.get('STOCKORACLE_MODEL_CACHE_MB', 256))
+        _default_registry = ModelRegistry(root, max_bytes=int(max_mb * 1024 * 1024))
+    return _default_registry
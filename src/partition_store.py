@@ -0,0 +1,465 @@
+import gc
+import os
+import json
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+import data_cache
+from data_processor import (
+    PROCESSING_VERSION, STRUCTURED_COLUMNS, LABEL_SOURCE_COLUMNS, TEXT_COLUMNS,
+    parse_text_rows, finalize_ticker_data, join_structured, compact_frame, restore_prices,
+    _market_dates, _conform_rows, _concat_rows
+)
+from instrumentation import span, count
+
+# Bump when the on-disk layout below changes
+STORE_FORMAT = 1
+
+# Source rows parsed per block while splitting by ticker
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Ticker partitions kept in memory by default
+DEFAULT_MAX_PARTITIONS = 16
+
+# Volumes scanned per block when taking their median from disk
+MEDIAN_BLOCK = 1 << 20
+
+def _encode(frame):
+    """
+    Arrays for np.savez: each column, category codes with their labels, and the index
+    """
+    arrays = {'__index__': frame.index.to_numpy()}
+    for name in frame.columns:
+        values = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            arrays[name] = values.to_numpy(dtype='datetime64[ns]')
+        elif pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            arrays[name] = values.to_numpy()
+        else:
+            values = values.astype('category')
+            arrays[name] = values.cat.codes.to_numpy()
+            arrays[name + '.categories'] = np.array([str(c) for c in values.cat.categories], dtype=str)
+    return arrays
+
+def _decode(arrays, columns):
+    data = {}
+    for name in columns:
+        values = np.asarray(arrays[name])
+        if name + '.categories' in arrays:
+            values = pd.Categorical.from_codes(values, arrays[name + '.categories'].tolist())
+        data[name] = values
+    return pd.DataFrame(data, index=arrays['__index__'])
+
+def _write_partition(path, frame):
+    # Written beside the target and swapped in, so readers never see half a file
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, **_encode(frame))
+    os.replace(tmp, path)
+
+def _partition_stats(frame, file):
+    closes = restore_prices(frame.iloc[-1:])['close'] if len(frame) else None
+    return {
+        'file': file,
+        'rows': len(frame),
+        'first_date': str(frame['date'].iloc[0].date()) if len(frame) else None,
+        'last_date': str(frame['date'].iloc[-1].date()) if len(frame) else None,
+        'last_close': float(closes.iloc[0]) if closes is not None else None,
+        'max_label': int(frame.index.max()) if len(frame) else -1
+    }
+
+def _schema(frame):
+    return [{'name': str(name), 'dtype': str(frame[name].dtype)} for name in frame.columns]
+
+def _template(schema):
+    """
+    Empty frame with the stored columns and dtypes, for conforming new rows
+    """
+    columns = {}
+    for column in schema:
+        if column['dtype'] == 'category':
+            columns[column['name']] = pd.Categorical([])
+        else:
+            columns[column['name']] = pd.Series([], dtype=column['dtype'])
+    return pd.DataFrame(columns)
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, 'manifest.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+def source_key(text_path=None, price_path=None):
+    """
+    Key of the sources a store was built from (path, size, mtime, versions)
+    """
+    parts = [data_cache.get_cache_key(p, PROCESSING_VERSION) for p in (price_path, text_path) if p is not None]
+    return '-'.join(parts + [f'store{STORE_FORMAT}'])
+
+def _ticker_ranges(tickers):
+    # (start, stop) rows of each ticker in a ticker-sorted array
+    bounds = np.flatnonzero(tickers[1:] != tickers[:-1]) + 1
+    starts = np.concatenate(([0], bounds))
+    stops = np.concatenate((bounds, [len(tickers)]))
+    return {str(tickers[start]): (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+class _RowGroups:
+    """
+    Source chunks sorted by ticker and saved column by column, with per-ticker row ranges
+
+    Reading a run of consecutive tickers takes one memory-mapped slice per
+    chunk, so only those tickers' rows are ever loaded.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.groups = []
+
+    def write(self, frame, name):
+        if not len(frame):
+            return
+        tickers = frame['ticker'].astype(str)
+        order = np.argsort(tickers.to_numpy(), kind='stable')
+        frame = frame.iloc[order]
+        path = os.path.join(self.directory, f'{name}-{len(self.groups)}')
+        os.makedirs(path)
+        for key, values in _encode(frame).items():
+            np.save(os.path.join(path, key + '.npy'), values)
+        self.groups.append((name, path, list(frame.columns), _ticker_ranges(tickers.to_numpy()[order])))
+
+    def tickers(self, name):
+        return sorted({ticker for kind, _, _, ranges in self.groups if kind == name for ticker in ranges})
+
+    def rows(self, name, ticker):
+        return sum(ranges[ticker][1] - ranges[ticker][0]
+                   for kind, _, _, ranges in self.groups if kind == name and ticker in ranges)
+
+    def read(self, name, tickers):
+        """
+        Rows of a run of consecutive tickers (in sorted order), in source order per ticker
+        """
+        pieces = []
+        for kind, path, columns, ranges in self.groups:
+            spans = [ranges[t] for t in tickers if t in ranges]
+            if kind != name or not spans:
+                continue
+            start, stop = spans[0][0], spans[-1][1]
+            arrays = {}
+            for key in ['__index__'] + columns:
+                arrays[key] = np.load(os.path.join(path, key + '.npy'), mmap_mode='r')[start:stop]
+                if os.path.exists(os.path.join(path, key + '.categories.npy')):
+                    arrays[key + '.categories'] = np.load(os.path.join(path, key + '.categories.npy'))
+            pieces.append(_decode(arrays, columns))
+        if not pieces:
+            return None
+        data = pd.concat(pieces) if len(pieces) > 1 else pieces[0]
+        # Categories differ between chunks; plain values sort and join the same way
+        for name in data.columns:
+            if isinstance(data[name].dtype, pd.CategoricalDtype):
+                data[name] = data[name].astype(object)
+        return data.sort_values('ticker', kind='stable')
+
+    def batches(self, name, size):
+        """
+        Runs of consecutive tickers holding about `size` rows each (at least one ticker)
+        """
+        batch, rows = [], 0
+        for ticker in self.tickers(name):
+            if batch and rows + self.rows(name, ticker) > size:
+                yield batch
+                batch, rows = [], 0
+            batch.append(ticker)
+            rows += self.rows(name, ticker)
+        if batch:
+            yield batch
+
+def _values_at_ranks(values, ranks, block=MEDIAN_BLOCK):
+    """
+    Values at the given ranks of the sorted non-NaN entries of a memory-mapped array
+
+    Histogram passes narrow each rank down to a value range small enough to
+    sort, so memory stays at about one block however large the array is.
+    """
+    blocks = [values[i:i + block] for i in range(0, len(values), block)]
+
+    def within(lo, hi):
+        for b in blocks:
+            # NaNs fail both comparisons and drop out here
+            yield b[(b >= lo) & (b <= hi)]
+
+    result = []
+    for rank in ranks:
+        lo, hi, below = -np.inf, np.inf, 0
+        while True:
+            n, low, high = 0, np.inf, -np.inf
+            for b in within(lo, hi):
+                if len(b):
+                    n, low, high = n + len(b), min(low, b.min()), max(high, b.max())
+            if n <= block or low == high:
+                candidates = np.sort(np.concatenate(list(within(lo, hi))))
+                result.append(float(candidates[rank - below]))
+                break
+            edges = np.linspace(low, high, 4097)
+            counts = np.zeros(4096, dtype=np.int64)
+            for b in within(lo, hi):
+                counts += np.bincount(np.clip(np.searchsorted(edges, b, side='right') - 1, 0, 4095), minlength=4096)
+            cumulative = np.cumsum(counts)
+            k = int(np.searchsorted(cumulative, rank - below, side='right'))
+            below += int(cumulative[k - 1]) if k else 0
+            # Bin k holds [edges[k], edges[k + 1]); the last bin also holds high
+            lo = edges[k]
+            hi = np.nextafter(edges[k + 1], -np.inf) if k < 4095 else high
+    return result
+
+def _spilled_median(path):
+    """
+    Series.median() of the raw float64s in a file, without loading them all
+    """
+    values = np.memmap(path, dtype=np.float64, mode='r') if os.path.getsize(path) else np.empty(0)
+    n = sum(int(np.count_nonzero(~np.isnan(values[i:i + MEDIAN_BLOCK]))) for i in range(0, len(values), MEDIAN_BLOCK))
+    if n == 0:
+        return float('nan')
+    ranks = [n // 2] if n % 2 else [n // 2 - 1, n // 2]
+    return float(np.mean(_values_at_ranks(values, ranks)))
+
+def build_partition_store(directory, text_path=None, price_path=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Split the processed data into one compact file per ticker, in bounded memory
+
+    Sources are read chunk_size rows at a time and each chunk is saved as a
+    row group sorted by ticker, so the universe is never in memory at once.
+    Runs of tickers totalling about chunk_size rows are then read back and
+    processed with the same rules as the in-memory loaders
+    (load_structured_data when price_path is given, load_and_process_data
+    otherwise), and each ticker is written as a compact partition. The
+    volume median used to fill gaps is taken from disk too. Price rows
+    without labels are numbered after the textual file's rows.
+    """
+    if text_path is None and price_path is None:
+        raise ValueError("build_partition_store needs a text_path or a price_path")
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    target = directory.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(target, ignore_errors=True)
+    os.makedirs(os.path.join(target, 'parts'))
+
+    with span('partition_store.build', structured=price_path is not None), \
+            tempfile.TemporaryDirectory(dir=parent) as workdir:
+        groups = _RowGroups(workdir)
+        volume_path = os.path.join(workdir, 'volume.f64')
+        n_text = 0
+        with open(volume_path, 'wb') as volumes, span('partition_store.split'):
+            if price_path is not None:
+                for chunk in pd.read_csv(price_path, usecols=list(STRUCTURED_COLUMNS), chunksize=chunk_size):
+                    chunk = chunk.rename(columns=STRUCTURED_COLUMNS)
+                    chunk['date'] = _market_dates(chunk['date'])
+                    volumes.write(chunk['volume'].to_numpy(dtype=np.float64).tobytes())
+                    groups.write(chunk, 'prices')
+                    del chunk
+                    gc.collect()
+                if text_path is not None:
+                    for chunk in pd.read_csv(text_path, usecols=LABEL_SOURCE_COLUMNS, chunksize=chunk_size):
+                        chunk['date'] = pd.to_datetime(chunk['date'], format='%Y-%m-%d')
+                        chunk['row'] = chunk.index
+                        n_text = max(n_text, int(chunk.index.max()) + 1)
+                        groups.write(chunk, 'labels')
+                        del chunk
+                        gc.collect()
+            else:
+                for chunk in pd.read_csv(text_path, chunksize=chunk_size):
+                    rows = parse_text_rows(chunk)
+                    # compact_frame's row_complete needs the text, which is dropped here
+                    rows['row_complete'] = rows[[c for c in TEXT_COLUMNS + ['price'] if c in rows.columns]].notna().all(axis=1)
+                    rows = rows.drop(columns=[c for c in TEXT_COLUMNS if c in rows.columns])
+                    volumes.write(rows['volume'].to_numpy(dtype=np.float64).tobytes())
+                    groups.write(rows, 'text')
+                    # Parsed chunks sit in reference cycles; free each before the next
+                    del chunk, rows
+                    gc.collect()
+        median_volume = _spilled_median(volume_path)
+
+        partitions = {}
+        schema = None
+        unmatched_start = n_text
+        with span('partition_store.write'):
+            for batch in groups.batches('prices' if price_path is not None else 'text', chunk_size):
+                if price_path is not None:
+                    prices = groups.read('prices', batch)
+                    labels = groups.read('labels', batch) if text_path is not None else None
+                    data = join_structured(prices, labels, unmatched_start=unmatched_start)
+                    unmatched_start += int((data.index >= unmatched_start).sum())
+                    data = compact_frame(data)
+                else:
+                    rows = groups.read('text', batch)
+                    complete = rows.pop('row_complete').astype(bool)
+                    data = compact_frame(finalize_ticker_data(rows, fill_volume=median_volume))
+                    data['row_complete'] = complete.reindex(data.index).to_numpy()
+                for ticker, (start, stop) in _ticker_ranges(data['ticker'].astype(str).to_numpy()).items():
+                    frame = data.iloc[start:stop]
+                    # Categories are the batch's; keep only this ticker's own
+                    frame = frame.assign(**{
+                        name: frame[name].cat.remove_unused_categories()
+                        for name in frame.columns if isinstance(frame[name].dtype, pd.CategoricalDtype)
+                    })
+                    file = f'{len(partitions):06d}.npz'
+                    _write_partition(os.path.join(target, 'parts', file), frame)
+                    partitions[ticker] = _partition_stats(frame, file)
+                    schema = schema or _schema(frame)
+
+        _write_manifest(target, {
+            'format': STORE_FORMAT,
+            'key': source_key(text_path, price_path),
+            'sources': {'text': text_path and os.path.abspath(text_path),
+                        'prices': price_path and os.path.abspath(price_path)},
+            'columns': schema or [],
+            'median_volume': median_volume,
+            'partitions': partitions
+        })
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(target, directory)
+    return directory
+
+def open_partition_store(directory, text_path=None, price_path=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                         max_partitions=DEFAULT_MAX_PARTITIONS):
+    """
+    PartitionStore over the sources, (re)built first if missing or stale
+    """
+    manifest = _read_manifest(directory)
+    if manifest is None or manifest.get('key') != source_key(text_path, price_path):
+        count('partition_store.rebuild')
+        build_partition_store(directory, text_path, price_path, chunk_size)
+    return PartitionStore(directory, max_partitions)
+
+class PartitionStore:
+    """
+    Per-ticker partitions on disk with a manifest and an LRU of loaded ones
+
+    A drop-in for TickerPartitions when the universe does not fit in
+    memory. The ticker list, row counts, last closes and the volume median
+    come from the manifest without touching a partition. get() loads one
+    ticker's file on first use and keeps the last max_partitions in memory,
+    so memory is bounded by a handful of partitions, not by the universe.
+    As with TickerPartitions, returned frames must be treated as read-only.
+
+    append() rewrites the partitions of the tickers that got rows (new
+    tickers get a new file) and then the manifest, each swapped in whole.
+    """
+    def __init__(self, directory, max_partitions=DEFAULT_MAX_PARTITIONS):
+        manifest = _read_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No partition store manifest in {directory}")
+        self.directory = directory
+        self.max_partitions = max_partitions
+        self.manifest = manifest
+        self._columns = [column['name'] for column in manifest['columns']]
+        self.tickers = sorted(manifest['partitions'])
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __len__(self):
+        return sum(p['rows'] for p in self.manifest['partitions'].values())
+
+    def __contains__(self, ticker):
+        return ticker in self.manifest['partitions']
+
+    @property
+    def columns(self):
+        return pd.Index(self._columns)
+
+    def next_label(self):
+        labels = [p['max_label'] for p in self.manifest['partitions'].values()]
+        return max(labels) + 1 if labels else 0
+
+    def median_volume(self):
+        median = self.manifest.get('median_volume')
+        return 0.0 if median is None or np.isnan(median) else float(median)
+
+    def _remember(self, ticker, frame):
+        # Caller holds the lock
+        self._cache[ticker] = frame
+        self._cache.move_to_end(ticker)
+        while len(self._cache) > self.max_partitions:
+            self._cache.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _load(self, ticker):
+        with self._lock:
+            frame = self._cache.get(ticker)
+            if frame is not None:
+                self._cache.move_to_end(ticker)
+                self.stats['hits'] += 1
+                count('partition_store.hit')
+                return frame
+            entry = self.manifest['partitions'].get(ticker)
+            self.stats['misses'] += 1
+        if entry is None:
+            return _template(self.manifest['columns'])
+        count('partition_store.miss')
+        with span('partition_store.load', ticker=ticker), \
+                np.load(os.path.join(self.directory, 'parts', entry['file'])) as arrays:
+            frame = _decode(arrays, self._columns)
+        with self._lock:
+            self._remember(ticker, frame)
+        return frame
+
+    def get(self, ticker):
+        """
+        Rows for one ticker, loaded from its partition on first use
+        """
+        return restore_prices(self._load(ticker))
+
+    def last_close(self, ticker):
+        """
+        Latest close for ticker (None if it has no rows)
+        """
+        entry = self.manifest['partitions'].get(ticker)
+        return None if entry is None else entry['last_close']
+
+    def append(self, rows):
+        """
+        Add processed rows after each ticker's existing ones; returns the tickers changed
+        """
+        if len(rows) == 0:
+            return []
+        if 'row_complete' in self._columns and 'row_complete' not in rows.columns:
+            rows = compact_frame(rows)
+        rows = _conform_rows(rows, _template(self.manifest['columns']))
+        changed = []
+        for ticker, new in rows.groupby(rows['ticker'].astype(object), sort=False):
+            entry = self.manifest['partitions'].get(ticker)
+            frame = _concat_rows(self._load(ticker), new) if entry is not None else new
+            file = entry['file'] if entry is not None else f"{len(self.manifest['partitions']):06d}.npz"
+            _write_partition(os.path.join(self.directory, 'parts', file), frame)
+            with self._lock:
+                self.manifest['partitions'][ticker] = _partition_stats(frame, file)
+                self._remember(ticker, frame)
+            changed.append(ticker)
+        with self._lock:
+            _write_manifest(self.directory, self.manifest)
+            self.tickers = sorted(self.manifest['partitions'])
+        return changed
+
+    def cached(self):
+        """
+        Tickers currently in memory, least recently used first
+        """
+        with self._lock:
+            return list(self._cache)
+
+    def nbytes(self):
+        """
+        Bytes held by the partitions currently in memory
+        """
+        with self._lock:
+            return int(sum(frame.memory_usage(deep=True).sum() for frame in self._cache.values()))
@@ -0,0 +1,231 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+
+# Label columns counted by default
+CUBE_FIELDS = ('emo_label', 'senti_label')
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).normalize().to_datetime64(), 'D')
+
+class SentimentCube:
+    """
+    Cumulative label counts per ticker × day × label, for O(1) window queries
+
+    For every field (emo_label, senti_label) cum[t, k, l] is the number of
+    rows of ticker t with label l on the first k days of the calendar,
+    so the count over any date range is cum[t, stop] - cum[t, start] per
+    (ticker, label) bucket. The calendar is every date seen across
+    tickers. Rows with a missing label are not counted.
+
+    append() adds new rows in place: dates past the end extend the
+    calendar into spare capacity and only the affected tickers' trailing
+    counts change; earlier dates, new tickers and new labels regrow the
+    arrays. Queries and appends hold a lock, so an ingest thread can
+    append while the dashboard reads.
+    """
+    def __init__(self, fields=CUBE_FIELDS):
+        self.fields = tuple(fields)
+        self.tickers = []
+        self.labels = {field: [] for field in self.fields}
+        self._ticker_index = {}
+        self._label_index = {field: {} for field in self.fields}
+        self._days = np.empty(0, dtype='datetime64[D]')
+        self._n_days = 0
+        # cum[field] has shape (tickers, capacity + 1, labels); row 0 is zeros
+        self._cum = {field: np.zeros((0, 1, 0), dtype=np.int32) for field in self.fields}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, data, fields=CUBE_FIELDS):
+        """
+        Cube over a processed frame (ticker, date and the label columns)
+        """
+        cube = cls([field for field in fields if field in data.columns])
+        cube.append(data)
+        return cube
+
+    @classmethod
+    def from_partitions(cls, partitions, fields=CUBE_FIELDS):
+        """
+        Cube over a TickerPartitions or PartitionStore, one ticker at a time
+        """
+        cube = cls([field for field in fields if field in partitions.columns])
+        for ticker in partitions.tickers:
+            cube.append(partitions.get(ticker))
+        return cube
+
+    @property
+    def days(self):
+        return self._days[:self._n_days]
+
+    @property
+    def nbytes(self):
+        return sum(cum.nbytes for cum in self._cum.values()) + self._days.nbytes
+
+    def _codes(self, values, index, names):
+        # Positions of values in names, adding the ones not seen before;
+        # missing values get -1
+        codes, uniques = pd.factorize(values)
+        lookup = np.empty(len(uniques), dtype=np.intp)
+        for k, value in enumerate(uniques):
+            value = str(value)
+            if value not in index:
+                index[value] = len(names)
+                names.append(value)
+            lookup[k] = index[value]
+        return np.where(codes >= 0, lookup[codes], -1)
+
+    def _grow_calendar(self, dates):
+        new = np.setdiff1d(dates, self.days)
+        if not len(new):
+            return
+        n = self._n_days
+        if n == 0 or new[0] > self._days[n - 1]:
+            # New days after the last one: fill spare capacity with the final totals
+            total = n + len(new)
+            if total > len(self._days):
+                capacity = max(total, 2 * len(self._days), 64)
+                days = np.empty(capacity, dtype='datetime64[D]')
+                days[:n] = self._days[:n]
+                self._days = days
+                for field, cum in self._cum.items():
+                    grown = np.zeros((cum.shape[0], capacity + 1, cum.shape[2]), dtype=cum.dtype)
+                    grown[:, :n + 1] = cum[:, :n + 1]
+                    self._cum[field] = grown
+            self._days[n:total] = new
+            for cum in self._cum.values():
+                cum[:, n + 1:total + 1] = cum[:, n:n + 1]
+            self._n_days = total
+            return
+        # Days inserted inside the calendar: remap the prefix counts onto the merged calendar
+        merged = np.union1d(self.days, new)
+        source = np.concatenate((np.searchsorted(self.days, merged, side='left'), [n]))
+        for field, cum in self._cum.items():
+            self._cum[field] = cum[:, source]
+        self._days = merged
+        self._n_days = len(merged)
+
+    def append(self, rows):
+        """
+        Count new rows (ticker, date and the label columns) into the cube
+        """
+        if not len(rows):
+            return
+        with span('sentiment_cube.append', rows=len(rows)), self._lock:
+            days = rows['date'].to_numpy().astype('datetime64[D]')
+            self._grow_calendar(np.unique(days))
+            tickers = self._codes(rows['ticker'], self._ticker_index, self.tickers)
+            day_codes = np.searchsorted(self.days, days)
+            for field in self.fields:
+                if field not in rows.columns:
+                    self._fit_shape(field)
+                    continue
+                labels = self._codes(rows[field], self._label_index[field], self.labels[field])
+                present = labels >= 0
+                if not present.any():
+                    self._fit_shape(field)
+                    continue
+                labels = labels[present]
+                cum = self._fit_shape(field)
+                t, d = tickers[present], day_codes[present]
+                # Per-day increments from the earliest affected day, accumulated
+                # onto the trailing part of each affected ticker's counts
+                affected, t = np.unique(t, return_inverse=True)
+                first = int(d.min())
+                delta = np.zeros((len(affected), self._n_days - first, cum.shape[2]), dtype=cum.dtype)
+                np.add.at(delta, (t, d - first, labels), 1)
+                cum[affected, first + 1:self._n_days + 1] += np.cumsum(delta, axis=1, dtype=cum.dtype)
+
+    def _fit_shape(self, field):
+        # Zero-padded for tickers and labels added since the last append
+        cum = self._cum[field]
+        n_tickers, n_labels = len(self.tickers), len(self.labels[field])
+        if cum.shape[0] < n_tickers or cum.shape[2] < n_labels:
+            grown = np.zeros((n_tickers, cum.shape[1], n_labels), dtype=cum.dtype)
+            grown[:cum.shape[0], :, :cum.shape[2]] = cum
+            # New tickers have no rows yet: their prefix counts stay zero
+            cum = self._cum[field] = grown
+        return cum
+
+    def _bounds(self, start, end):
+        # Calendar positions [i, j) covering start..end inclusive
+        days = self.days
+        i = 0 if start is None else int(np.searchsorted(days, _day(start), side='left'))
+        j = len(days) if end is None else int(np.searchsorted(days, _day(end), side='right'))
+        return i, max(i, j)
+
+    def _rows(self, tickers):
+        if tickers is None:
+            return list(self.tickers), slice(None)
+        tickers = [str(t) for t in ([tickers] if isinstance(tickers, str) else tickers)]
+        known = [t for t in tickers if t in self._ticker_index]
+        return known, [self._ticker_index[t] for t in known]
+
+    def counts(self, field, tickers=None, start=None, end=None):
+        """
+        Label counts (tickers × labels DataFrame) between start and end inclusive
+        """
+        with self._lock:
+            names, rows = self._rows(tickers)
+            i, j = self._bounds(start, end)
+            cum = self._fit_shape(field)
+            values = cum[rows, j] - cum[rows, i]
+            return pd.DataFrame(values, index=pd.Index(names, name='ticker'), columns=list(self.labels[field]))
+
+    def distribution(self, ticker, field='emo_label', start=None, end=None):
+        """
+        Non-zero label counts for one ticker in a window, largest first
+        """
+        counts = self.counts(field, [ticker], start, end)
+        if counts.empty:
+            return pd.Series(dtype=np.int64)
+        series = counts.iloc[0]
+        return series[series > 0].sort_values(ascending=False)
+
+    def bucket_counts(self, field, ticker, freq='M', start=None, end=None):
+        """
+        Label counts per calendar period (e.g. 'W', 'M', 'Q') for one ticker, indexed by period start
+        """
+        with self._lock:
+            names, rows = self._rows([ticker])
+            i, j = self._bounds(start, end)
+            if not names or i == j:
+                return pd.DataFrame(columns=list(self.labels[field]))
+            days = self.days[i:j]
+            periods = pd.DatetimeIndex(days).to_period(freq)
+            # First calendar position of each bucket, then one difference per bucket
+            edges = np.flatnonzero(np.concatenate(([True], periods[1:] != periods[:-1])))
+            cuts = np.concatenate((i + edges, [j]))
+            cum = self._fit_shape(field)[rows[0]]
+            values = cum[cuts[1:]] - cum[cuts[:-1]]
+            index = periods[edges].to_timestamp()
+            return pd.DataFrame(values, index=index, columns=list(self.labels[field]))
+
+    def rolling_ratio(self, tickers=None, window=20, positive='bullish', negative='bearish',
+                      field='senti_label', start=None, end=None):
+        """
+        Share of positive among positive + negative labels over trailing windows
+
+        One value per calendar day and ticker (dates × tickers DataFrame),
+        each from the `window` days ending on it; NaN where the window has
+        neither label.
+        """
+        with self._lock:
+            names, rows = self._rows(tickers)
+            i, j = self._bounds(start, end)
+            cum = self._fit_shape(field)
+            index = self._label_index[field]
+            if positive not in index or negative not in index or i == j:
+                return pd.DataFrame(index=pd.DatetimeIndex(self.days[i:j], name='date'), columns=names, dtype=float)
+            stops = np.arange(i + 1, j + 1)
+            starts = np.maximum(stops - window, 0)
+            block = cum[rows]
+            pos = block[:, stops, index[positive]] - block[:, starts, index[positive]]
+            neg = block[:, stops, index[negative]] - block[:, starts, index[negative]]
+            total = pos + neg
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ratio = np.where(total > 0, pos / total, np.nan)
+            return pd.DataFrame(ratio.T, index=pd.DatetimeIndex(self.days[i:j], name='date'), columns=names)
@@ -0,0 +1,380 @@
+import io
+import os
+import copy
+import csv
+import stat
+import sys
+import time
+import queue
+import socket
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+
+from data_processor import parse_text_rows, continue_ticker_data
+from features import IncrementalFeatures
+from instrumentation import count, span
+
+# Columns of refined_textual_data.csv, for feeds that send rows without a header
+TEXTUAL_COLUMNS = ['id', 'date', 'ticker', 'emo_label', 'senti_label', 'original', 'processed']
+
+# Latency samples kept for the percentiles in StreamIngestor.metrics()
+LATENCY_SAMPLES = 1000
+
+class CsvTail:
+    """
+    Complete lines appended to a CSV since the last poll
+
+    Reading starts at the file's current end (or at offset) and remembers
+    the byte offset, so each poll reads only what was written since. A
+    partly written last line is left for the next poll. If the file shrinks
+    (rewritten or rotated) reading restarts after its header.
+    """
+    def __init__(self, path, offset=None):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.readline()
+            self._header_end = f.tell()
+            size = os.fstat(f.fileno()).st_size
+        self.columns = next(csv.reader([header.decode('utf-8-sig')]))
+        self.offset = size if offset is None else max(offset, self._header_end)
+
+    def poll(self):
+        """
+        (new lines, monotonic time they were read), or ([], None)
+        """
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            self.offset = self._header_end
+        if size == self.offset:
+            return [], None
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        received = time.monotonic()
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return [], None
+        self.offset += end
+        return chunk[:end].decode('utf-8').splitlines(), received
+
+    def close(self):
+        pass
+
+class LineFeed:
+    """
+    Lines pushed by a pipe or local socket, buffered until the next poll
+
+    Each line is stamped when it arrives, so latency covers the time spent
+    waiting for a poll. A line equal to the header is skipped, so writers
+    may send one per connection.
+    """
+    def __init__(self, columns=TEXTUAL_COLUMNS):
+        self.columns = list(columns)
+        self._header = ','.join(self.columns)
+        self._lines = queue.SimpleQueue()
+        self._closed = threading.Event()
+
+    def _read(self, stream):
+        for line in stream:
+            line = line.rstrip('\r\n')
+            if line and line != self._header:
+                self._lines.put((line, time.monotonic()))
+            if self._closed.is_set():
+                return
+
+    def poll(self):
+        """
+        (buffered lines, arrival time of the oldest), or ([], None)
+        """
+        lines, received = [], None
+        while True:
+            try:
+                line, at = self._lines.get_nowait()
+            except queue.Empty:
+                break
+            lines.append(line)
+            received = at if received is None else received
+        return lines, received
+
+    def close(self):
+        self._closed.set()
+
+class PipeFeed(LineFeed):
+    """
+    Lines read from a text stream (a named pipe, or stdin) on a reader thread
+    """
+    def __init__(self, stream, columns=TEXTUAL_COLUMNS):
+        super().__init__(columns)
+        self._thread = threading.Thread(target=self._read, args=(stream,), name='stream-pipe', daemon=True)
+        self._thread.start()
+
+class SocketFeed(LineFeed):
+    """
+    Lines sent to a local TCP port; every connection gets a reader thread
+    """
+    def __init__(self, host='127.0.0.1', port=0, columns=TEXTUAL_COLUMNS):
+        super().__init__(columns)
+        self._server = socket.create_server((host, port))
+        self.address = self._server.getsockname()
+        self._thread = threading.Thread(target=self._accept, name='stream-socket', daemon=True)
+        self._thread.start()
+
+    def _accept(self):
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            stream = conn.makefile('r', encoding='utf-8', newline='')
+            threading.Thread(target=self._read, args=(stream,), name='stream-conn', daemon=True).start()
+
+    def close(self):
+        super().close()
+        self._server.close()
+
+def open_source(spec):
+    """
+    Feed for a source spec: tcp://host:port, '-' for stdin, a named pipe or a CSV path
+    """
+    if spec.startswith('tcp://'):
+        host, _, port = spec[len('tcp://'):].rpartition(':')
+        return SocketFeed(host or '127.0.0.1', int(port))
+    if spec == '-':
+        return PipeFeed(sys.stdin)
+    if stat.S_ISFIFO(os.stat(spec).st_mode):
+        # Opening a pipe blocks until a writer appears, so do it on the reader thread
+        feed = LineFeed()
+        threading.Thread(target=lambda: feed._read(open(spec, 'r', encoding='utf-8')),
+                         name='stream-fifo', daemon=True).start()
+        return feed
+    return CsvTail(spec)
+
+def read_rows(lines, columns):
+    """
+    Raw textual rows from CSV lines without a header
+    """
+    return pd.read_csv(io.StringIO('\n'.join(lines)), header=None, names=columns)
+
+def _percentiles(samples):
+    if not samples:
+        return None
+    values = np.array(samples) * 1e3
+    return {
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'max_ms': float(values.max()),
+        'samples': len(values)
+    }
+
+class StreamIngestor:
+    """
+    Applies rows from a feed to TickerPartitions and refreshes what they affect
+
+    Each poll parses only the new lines with the batch loader's rules
+    (parse_text_rows, then continue_ticker_data from each ticker's last
+    close) and appends them to the partitions. Only the tickers that got
+    rows are invalidated in the forecast pool, with their refresh queued at
+    once; a FeatureStream and a SentimentCube, if given, are advanced by
+    the new rows.
+
+    Lines that cannot be parsed are skipped and counted in stats
+    ('bad_rows', 'last_bad_row'); the rest of their batch is still applied.
+    If the append fails, nothing of the batch is applied and its lines are
+    retried ahead of the next poll's, so row labels stay contiguous.
+
+    Structured partitions (OHLC and indicators) get the columns the text
+    cannot give: open, high and low at the streamed close, no dividends or
+    splits, and sma_50 / sma_200 / rsi carried on from each ticker's
+    history with IncrementalFeatures.
+
+    Latency is measured from when lines were read off the feed: to the rows
+    being appended ('ingest') and to each affected (ticker, horizon)
+    forecast having been recomputed on them ('refresh').
+    """
+    def __init__(self, partitions, source, pool=None, features=None, cube=None):
+        self.partitions = partitions
+        self.source = source
+        self.pool = pool
+        self.features = features
+        self.cube = cube
+        # New rows continue the source CSV's row numbering
+        self._next_label = partitions.next_label()
+        self._fill_volume = partitions.median_volume()
+        self._structured = 'sma_50' in partitions.columns
+        # Indicator state per structured ticker, seeded from its history on first use
+        self._indicators = {}
+        # (lines, received) read off the feed but not yet applied
+        self._unapplied = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._ingest = deque(maxlen=LATENCY_SAMPLES)
+        self._refresh = deque(maxlen=LATENCY_SAMPLES)
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'polls': 0, 'batches': 0, 'rows': 0, 'bad_rows': 0, 'last_bad_row': None,
+                      'errors': 0, 'last_error': None}
+        if pool is not None:
+            pool.add_listener(self._on_forecast)
+
+    def _parse_lines(self, lines):
+        raw = read_rows(lines, self.source.columns)
+        if len(raw) != len(lines) or raw['ticker'].isna().any() or raw['date'].isna().any():
+            raise ValueError("malformed row")
+        return parse_text_rows(raw)
+
+    def _parse(self, lines):
+        """
+        (parsed rows or None, lines that parsed, lines that did not)
+
+        The batch is parsed at once; only when that fails is it parsed line
+        by line to find the bad lines.
+        """
+        try:
+            return self._parse_lines(lines), lines, []
+        except ValueError:
+            pass
+        parsed, good, bad = [], [], []
+        for line in lines:
+            try:
+                parsed.append(self._parse_lines([line]))
+                good.append(line)
+            except ValueError:
+                bad.append(line)
+        return (pd.concat(parsed) if parsed else None), good, bad
+
+    def _fill_structured(self, rows):
+        """
+        rows with the structured columns filled in, and the indicator states they leave
+        """
+        states = {}
+        indicators = []
+        for ticker, close in zip(rows['ticker'].tolist(), rows['close'].tolist()):
+            state = states.get(ticker)
+            if state is None:
+                # Work on a copy so a failed append leaves the kept state untouched
+                state = self._indicators.get(ticker)
+                state = copy.deepcopy(state) if state is not None else \
+                    IncrementalFeatures.from_frame(self.partitions.get(ticker))
+                states[ticker] = state
+            state.append(close, np.nan, np.nan)
+            indicators.append(state.indicators())
+        indicators = pd.DataFrame(indicators, index=rows.index)
+        rows = rows.assign(open=rows['close'], high=rows['close'], low=rows['close'],
+                           dividends=0.0, stock_splits=0.0,
+                           **{name: indicators[name] for name in indicators.columns})
+        return rows, states
+
+    def poll(self):
+        """
+        Ingest whatever the feed has; returns the tickers that changed
+        """
+        self.stats['polls'] += 1
+        lines, received = self.source.poll()
+        if self._unapplied is not None:
+            # Lines from a failed append go first, keeping their arrival time
+            held, held_received = self._unapplied
+            lines, received = held + lines, held_received
+        if not lines:
+            return []
+
+        with span('stream.ingest', rows=len(lines)):
+            rows, lines, bad = self._parse(lines)
+            if bad:
+                with self._lock:
+                    self.stats['bad_rows'] += len(bad)
+                    self.stats['last_bad_row'] = bad[-1]
+                count('stream.bad_row', len(bad))
+            if rows is None:
+                self._unapplied = None
+                return []
+
+            try:
+                rows.index = np.arange(self._next_label, self._next_label + len(rows))
+                last_close = {}
+                for ticker in rows['ticker'].unique():
+                    close = self.partitions.last_close(ticker)
+                    if close is not None:
+                        last_close[ticker] = close
+                rows = continue_ticker_data(rows, last_close, self._fill_volume)
+                states = {}
+                if self._structured:
+                    rows, states = self._fill_structured(rows)
+                changed = self.partitions.append(rows)
+            except Exception:
+                self._unapplied = (lines, received)
+                raise
+            self._unapplied = None
+            self._next_label += len(rows)
+            self._indicators.update(states)
+            applied = time.monotonic()
+
+            if self.features is not None:
+                for row in rows[['ticker', 'close', 'volume', 'sentiment_value']].itertuples(index=False):
+                    self.features.append(row.ticker, row.close, row.volume, row.sentiment_value)
+            if self.cube is not None:
+                self.cube.append(rows)
+
+            with self._lock:
+                self._ingest.append(applied - received)
+                self.stats['batches'] += 1
+                self.stats['rows'] += len(rows)
+            count('stream.rows', len(rows))
+
+            if self.pool is not None:
+                for ticker in changed:
+                    generations = self.pool.invalidate(ticker, refresh=True)
+                    with self._lock:
+                        for key, generation in generations.items():
+                            # Rows still waiting on an older refresh keep their earlier start
+                            earlier = self._pending.get(key)
+                            start = received if earlier is None else min(earlier[1], received)
+                            self._pending[key] = (generation, start)
+        return changed
+
+    def _on_forecast(self, ticker, days, generation):
+        with self._lock:
+            pending = self._pending.get((ticker, days))
+            if pending is not None and generation >= pending[0]:
+                del self._pending[(ticker, days)]
+                self._refresh.append(time.monotonic() - pending[1])
+
+    def run(self, interval=1.0):
+        """
+        Poll every interval seconds until stop(); errors are counted, not raised
+        """
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.stats['last_error'] = repr(e)
+                count('stream.error')
+            self._stop.wait(interval)
+
+    def start(self, interval=1.0):
+        """
+        Run the polling loop on a daemon thread
+        """
+        self._thread = threading.Thread(target=self.run, args=(interval,), name='stream-ingest', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self.source.close()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def metrics(self):
+        """
+        Row and batch counts plus ingest and ingest-to-refresh latency percentiles
+        """
+        with self._lock:
+            return {
+                **self.stats,
+                'pending_refreshes': len(self._pending),
+                'ingest_latency': _percentiles(list(self._ingest)),
+                'refresh_latency': _percentiles(list(self._refresh))
+            }
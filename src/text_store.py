@@ -0,0 +1,115 @@
+import os
+import json
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+
+class TextStore:
+    """
+    Raw sentences kept out of the DataFrame, fetched by row label on demand
+
+    All texts live in one UTF-8 byte buffer with int64 offsets, sorted by the
+    processed frame's row labels (the source CSV row numbers). A store saved
+    to a directory is memory-mapped on first use, so opening it costs nothing
+    until a hover actually needs text. A loader may stand in for the files;
+    it is called once, on first use, to build the store.
+    """
+    def __init__(self, directory=None, key=None, loader=None):
+        self.directory = directory
+        self.key = key
+        self._loader = loader
+        self._arrays = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_series(cls, texts, directory=None, key=None):
+        """
+        Build a store from a Series of strings indexed by row label
+        """
+        store = cls(directory, key)
+        store._arrays = _encode(texts)
+        if directory is not None:
+            store.save()
+        return store
+
+    def save(self):
+        """
+        Write the store to its directory, replacing any older copy
+        """
+        self._write(self._load())
+
+    def _write(self, arrays):
+        tmp = self.directory + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, array in zip(('labels', 'offsets', 'blob'), arrays):
+            np.save(os.path.join(tmp, f'{name}.npy'), array)
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'key': self.key}, f)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(tmp, self.directory)
+
+    def is_current(self):
+        """
+        Whether the directory holds a store saved under this key
+        """
+        try:
+            with open(os.path.join(self.directory, 'meta.json'), 'r', encoding='utf-8') as f:
+                return json.load(f).get('key') == self.key
+        except (OSError, ValueError, TypeError):
+            return False
+
+    def _load(self):
+        with self._lock:
+            if self._arrays is None:
+                if self.directory is not None and self.is_current():
+                    self._arrays = tuple(
+                        np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r')
+                        for name in ('labels', 'offsets', 'blob')
+                    )
+                elif self._loader is not None:
+                    self._arrays = _encode(self._loader())
+                    if self.directory is not None:
+                        try:
+                            self._write(self._arrays)
+                        except OSError:
+                            # Still served from memory
+                            pass
+                else:
+                    self._arrays = _encode(pd.Series([], dtype=object))
+            return self._arrays
+
+    def get(self, labels):
+        """
+        Texts for the given row labels (None where a label is unknown)
+        """
+        stored, offsets, blob = self._load()
+        labels = np.asarray(labels, dtype=np.int64)
+        if len(stored) == 0:
+            return [None] * len(labels)
+        pos = np.minimum(np.searchsorted(stored, labels), len(stored) - 1)
+        found = stored[pos] == labels
+        return [
+            bytes(blob[offsets[p]:offsets[p + 1]]).decode('utf-8') if ok else None
+            for p, ok in zip(pos.tolist(), found.tolist())
+        ]
+
+    def nbytes(self):
+        """
+        Size of the loaded buffers (0 until first use)
+        """
+        if self._arrays is None:
+            return 0
+        return sum(array.nbytes for array in self._arrays)
+
+def _encode(texts):
+    """
+    (sorted labels, offsets, byte buffer) for a Series of strings
+    """
+    texts = texts.sort_index()
+    encoded = [str(text).encode('utf-8') if isinstance(text, str) else b'' for text in texts.tolist()]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return texts.index.to_numpy(dtype=np.int64), offsets, blob
@@ -0,0 +1,59 @@
+import os
+import json
+import threading
+
+# Written by tuning.py; read by the forecaster on every forecast (reloaded
+# when the file changes)
+DEFAULT_PARAMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", ".cache", "tuned_params.json")
+
+# Used for tickers that have not been tuned
+DEFAULT_PARAMS = {
+    'lookback': 30,
+    'max_iter': 50,
+    'weights': (0.7, 0.3)
+}
+
+_lock = threading.Lock()
+_loaded = {'path': None, 'mtime': None, 'params': {}}
+
+def load_params(path=DEFAULT_PARAMS_PATH):
+    """
+    All tuned records (ticker -> dict), or {} if nothing was saved
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_params(records, path=DEFAULT_PARAMS_PATH):
+    """
+    Merge tuned records (ticker -> dict) into the file, replacing those tickers
+    """
+    merged = load_params(path)
+    merged.update(records)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def get_params(ticker, path=DEFAULT_PARAMS_PATH):
+    """
+    lookback, max_iter and (start, end) Holt weights for a ticker
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    with _lock:
+        if _loaded['path'] != path or _loaded['mtime'] != mtime:
+            _loaded.update(path=path, mtime=mtime, params=load_params(path) if mtime is not None else {})
+        record = _loaded['params'].get(str(ticker))
+    if record is None:
+        return dict(DEFAULT_PARAMS)
+    return {
+        'lookback': int(record['lookback']),
+        'max_iter': int(record['max_iter']),
+        'weights': tuple(float(w) for w in record['weights'])
+    }
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from threadpoolctl import threadpool_limits
+
+from backtest import origin_indices
+from core import DATA_PATH, PRICE_PATH, load_data
+from data_processor import TickerPartitions
+from features import frame_columns, build_design_matrix, window_sums
+from forecasting import recursive_forecast
+from holt import HoltLinear
+from tuned_params import DEFAULT_PARAMS, DEFAULT_PARAMS_PATH, save_params
+
+warnings.filterwarnings("ignore")
+
+# Default search space; the current defaults are always part of it
+LOOKBACKS = (10, 20, 30, 60)
+MAX_ITERS = (25, 50, 100)
+WEIGHTS = ((0.9, 0.5), (0.7, 0.3), (0.5, 0.5), (0.5, 0.1), (0.3, 0.1))
+
+# Successive halving: after 1, ETA, ETA^2, ... origins only the best 1/ETA
+# of the configurations still running go on to the next origins
+ETA = 2
+
+class SharedArrays:
+    """
+    Per-ticker feature arrays written once as .npy files and memory-mapped by workers
+
+    Every ticker's close / volume / sentiment series and its design matrix
+    (X, y, rows) for each lookback are stacked into one file per array with
+    row offsets per ticker, so a worker process only receives a directory
+    and a ticker index and reads the rows it needs from the page cache
+    instead of unpickling its own copy.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.tickers = meta['tickers']
+        self.lookbacks = meta['lookbacks']
+        self._arrays = {}
+
+    @classmethod
+    def build(cls, datasets, lookbacks, directory):
+        """
+        Write the arrays for datasets (ticker -> DataFrame) into directory
+        """
+        series = {'close': [], 'volume': [], 'sentiment': []}
+        design = {lookback: {'X': [], 'y': [], 'rows': []} for lookback in lookbacks}
+        for data in datasets.values():
+            _, close, volume, sentiment, valid = frame_columns(data)
+            series['close'].append(close)
+            series['volume'].append(volume)
+            series['sentiment'].append(sentiment)
+            # Prefix sums are shared by every lookback, as in build_design_matrices
+            sums = window_sums(close)
+            for lookback in lookbacks:
+                X, y, rows = build_design_matrix(close, volume, sentiment, lookback, valid, sums=sums)
+                design[lookback]['X'].append(X)
+                design[lookback]['y'].append(y)
+                design[lookback]['rows'].append(rows)
+
+        def write(name, blocks):
+            np.save(os.path.join(directory, f'{name}.npy'), np.concatenate(blocks))
+            offsets = np.concatenate(([0], np.cumsum([len(b) for b in blocks])))
+            np.save(os.path.join(directory, f'{name}.offsets.npy'), offsets)
+
+        for name, blocks in series.items():
+            write(name, blocks)
+        for lookback, arrays in design.items():
+            for name, blocks in arrays.items():
+                write(f'{name}_lb{lookback}', blocks)
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'tickers': [str(t) for t in datasets], 'lookbacks': list(lookbacks)}, f)
+        return cls(directory)
+
+    def _get(self, name, index):
+        if name not in self._arrays:
+            self._arrays[name] = (
+                np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r'),
+                np.load(os.path.join(self.directory, f'{name}.offsets.npy'))
+            )
+        values, offsets = self._arrays[name]
+        return values[offsets[index]:offsets[index + 1]]
+
+    def series(self, index):
+        """
+        (close, volume, sentiment) for the ticker at index
+        """
+        return tuple(self._get(name, index) for name in ('close', 'volume', 'sentiment'))
+
+    def design(self, index, lookback):
+        """
+        (X, y, rows) for the ticker at index, as build_design_matrix returns them
+        """
+        return tuple(self._get(f'{name}_lb{lookback}', index) for name in ('X', 'y', 'rows'))
+
+# Opened once per worker process
+_shared = {}
+
+def tune_ticker(shared, index, horizon=30, n_origins=6, step=None, min_train=250,
+                lookbacks=LOOKBACKS, max_iters=MAX_ITERS, weights=WEIGHTS):
+    """
+    Search lookback, max_iter and blend weights for one ticker
+
+    Walk-forward origins are the last n_origins, `step` rows apart. The
+    Holt path at each origin is shared by every configuration. Each (lookback,
+    max_iter) pair fits a fresh GBM per origin, and every blend is scored
+    from the two paths without refitting. Scores are the mean ensemble MAPE
+    over the origins seen so far, taking each pair's best blend.
+    Configurations are evaluated origin by origin and halved at 1, ETA,
+    ETA^2, ... origins, so bad ones stop early. The defaults always run to
+    the end as the baseline. Returns the winning record, or None when the
+    history is too short.
+    """
+    start = time.perf_counter()
+    close, volume, sentiment = shared.series(index)
+    origins = origin_indices(len(close), horizon, n_origins, step, max(min_train, max(lookbacks) + 1))
+    if not origins:
+        return None
+
+    # The default blend is always scored, as the baseline
+    weights = list(dict.fromkeys([tuple(w) for w in weights] + [tuple(DEFAULT_PARAMS['weights'])]))
+    blends = np.array([np.linspace(w0, w1, horizon) for w0, w1 in weights])
+    holt = HoltLinear()
+    holt_paths = []
+    for origin in origins:
+        holt.fit(close[:origin], warm_start=True)
+        holt_paths.append(holt.forecast(horizon))
+
+    baseline = (DEFAULT_PARAMS['lookback'], DEFAULT_PARAMS['max_iter'])
+    configs = sorted({(lb, it) for lb in lookbacks for it in max_iters} | {baseline})
+    errors = {config: [] for config in configs}
+    alive = list(configs)
+    fits = 0
+
+    def score(config):
+        return np.mean(errors[config], axis=0).min()
+
+    checkpoint = 1
+    for i, origin in enumerate(origins):
+        actual = close[origin:origin + horizon]
+        for lookback, max_iter in alive:
+            X, y, rows = shared.design(index, lookback)
+            train = np.searchsorted(rows, origin)
+            model = HistGradientBoostingRegressor(max_iter=max_iter).fit(X[:train], y[:train])
+            fits += 1
+            window = np.asarray(close[origin - lookback:origin])
+            gbm = recursive_forecast(model, window, [volume[origin - 1], sentiment[origin - 1]], horizon)[0]
+            ensemble = blends * holt_paths[i] + (1 - blends) * gbm
+            errors[(lookback, max_iter)].append(np.mean(np.abs(ensemble - actual) / np.abs(actual), axis=1) * 100)
+
+        if i + 1 == checkpoint and i + 1 < len(origins):
+            ranked = sorted(alive, key=score)
+            keep = ranked[:max(1, -(-len(ranked) // ETA))]
+            alive = keep + ([baseline] if baseline not in keep else [])
+            checkpoint *= ETA
+
+    finished = [config for config in alive if len(errors[config]) == len(origins)]
+    best = min(finished, key=score)
+    mean_errors = np.mean(errors[best], axis=0)
+    best_weights = weights[int(mean_errors.argmin())]
+    default_weights = weights.index(tuple(DEFAULT_PARAMS['weights']))
+    return {
+        'ticker': shared.tickers[index],
+        'lookback': int(best[0]),
+        'max_iter': int(best[1]),
+        'weights': [float(w) for w in best_weights],
+        'mape': float(mean_errors.min()),
+        'baseline_mape': float(np.mean(errors[baseline], axis=0)[default_weights]),
+        'origins': len(origins),
+        'configs': len(configs),
+        'pruned': len(configs) - len(finished),
+        'fits': fits,
+        'rows': int(len(close)),
+        'seconds': time.perf_counter() - start,
+        'tuned_at': pd.Timestamp.now().isoformat(timespec='seconds')
+    }
+
+def _tune_task(args):
+    directory, index, options = args
+    if directory not in _shared:
+        _shared[directory] = SharedArrays(directory)
+    # One process per core already; keep each fit single-threaded
+    with threadpool_limits(limits=1):
+        return tune_ticker(_shared[directory], index, **options)
+
+def tune(datasets, workers=None, lookbacks=LOOKBACKS, **options):
+    """
+    tune_ticker for every ticker in datasets (ticker -> DataFrame) across processes
+
+    The arrays are built once into a temporary directory that the workers
+    memory-map. Returns ticker -> record for the tickers that could be tuned.
+    """
+    lookbacks = sorted(set(lookbacks) | {DEFAULT_PARAMS['lookback']})
+    with tempfile.TemporaryDirectory() as directory:
+        SharedArrays.build(datasets, lookbacks, directory)
+        tasks = [(directory, i, dict(options, lookbacks=lookbacks)) for i in range(len(datasets))]
+        if workers == 1:
+            results = list(map(_tune_task, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_tune_task, tasks))
+    return {record['ticker']: record for record in results if record is not None}
+
+def parse_weights(text):
+    start, end = text.split(':')
+    return float(start), float(end)
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-ticker tuning of GBM lookback / max_iter and Holt/GBM blend weights")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--prices', default=PRICE_PATH, help="structured price CSV ('' to parse prices from --data)")
+    parser.add_argument('--tickers', nargs='*', help='defaults to every ticker in the file')
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--origins', type=int, default=6)
+    parser.add_argument('--step', type=int, help='rows between origins (defaults to the horizon)')
+    parser.add_argument('--lookbacks', nargs='+', type=int, default=list(LOOKBACKS))
+    parser.add_argument('--max-iters', nargs='+', type=int, default=list(MAX_ITERS))
+    parser.add_argument('--weights', nargs='+', type=parse_weights, default=list(WEIGHTS),
+                        help='Holt weight on the first and last day, as START:END')
+    parser.add_argument('--workers', type=int, help='process pool size (1 runs in-process)')
+    parser.add_argument('--out', default=DEFAULT_PARAMS_PATH, help='tuned parameters file the forecaster reads')
+    parser.add_argument('--dry-run', action='store_true', help='print the results without saving them')
+    args = parser.parse_args()
+
+    # The same prices the dashboard and service forecast from
+    partitions = TickerPartitions(load_data(args.data, args.prices or None))
+    tickers = args.tickers or partitions.tickers
+    datasets = {ticker: partitions.get(ticker) for ticker in tickers}
+
+    start = time.perf_counter()
+    records = tune(
+        datasets,
+        workers=args.workers,
+        lookbacks=args.lookbacks,
+        horizon=args.horizon,
+        n_origins=args.origins,
+        step=args.step,
+        max_iters=args.max_iters,
+        weights=args.weights
+    )
+    elapsed = time.perf_counter() - start
+
+    if not records:
+        print(f"No ticker has enough history for {args.origins} walk-forward origins at a {args.horizon}-day horizon; nothing saved")
+        return
+    if not args.dry_run:
+        save_params(records, args.out)
+    table = pd.DataFrame(records.values()).set_index('ticker')
+    columns = ['lookback', 'max_iter', 'weights', 'mape', 'baseline_mape', 'fits', 'pruned', 'seconds']
+    pd.set_option('display.width', 120)
+    print(table[columns].round(3).to_string())
+    print(f"\n{len(records)} tickers tuned in {elapsed:.1f}s wall clock; mean MAPE "
+          f"{table['mape'].mean():.2f}% vs {table['baseline_mape'].mean():.2f}% with the defaults"
+          + ("" if args.dry_run else f"; saved to {args.out}"))
+
+if __name__ == '__main__':
+    main()
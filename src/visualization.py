@@ -1,37 +1,200 @@
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
+from instrumentation import traced
 
-def get_chart_types():
+SENTIMENT_EMOJI = {
+    'anxious': '😰',
+    'confident': '😊',
+    'disappointed': '😞',
+    'excited': '😃',
+    'indifferent': '😐',
+    'optimistic': '😀',
+    'uncertain': '🤔',
+    'worried': '😟'
+}
+
+# Slice colours of the emotion distribution chart
+EMOTION_COLORS = ['#FF9999', '#66B2FF', '#99FF99', '#FFCC99', '#FF99CC', '#99CCFF', '#CCFF99', '#CC99FF']
+
+# Bar colours of the sentiment timeline; other labels get plotly's defaults
+SENTIMENT_COLORS = {
+    'bullish': 'green',
+    'bearish': 'red',
+    'neutral': 'gray'
+}
+
+# Charts with more points than this are drawn with WebGL and LTTB-downsampled
+DEFAULT_CHART_WIDTH_PX = 1200
+POINTS_PER_PIXEL = 2
+
+# Widest bucket for which LTTB tabulates every anchor/candidate pair at once
+LTTB_TABLE_WIDTH = 24
+
+def get_chart_types(has_ohlc=False):
     """
     Return available chart types for display
     
-    Note: We're only using line charts now as requested
+    Line charts only, unless the data carries real open/high/low prices
     """
-    return {
+    chart_types = {
         "Line Chart": "line"
     }
+    if has_ohlc:
+        chart_types["Candlestick"] = "candlestick"
+        chart_types["OHLC"] = "ohlc"
+    return chart_types
+
+def ohlc_columns(data):
+    """
+    Open/high/low/close columns, estimated from closes (±1%) when not present
+    """
+    if {'open', 'high', 'low'}.issubset(data.columns):
+        return data['open'], data['high'], data['low'], data['close']
+    close = data['close']
+    # Previous close as the open, with the first row opening at its close
+    open_ = close.shift(1).fillna(close)
+    return open_, close * 1.01, close * 0.99, close
 
 def get_sentiment_emoji(sentiment):
     """
     Map sentiment labels to appropriate emojis
     """
-    emoji_map = {
-        'anxious': '😰',
-        'confident': '😊',
-        'disappointed': '😞',
-        'excited': '😃',
-        'indifferent': '😐',
-        'optimistic': '😀',
-        'uncertain': '🤔',
-        'worried': '😟'
-    }
-    return emoji_map.get(sentiment, '❓')
+    return SENTIMENT_EMOJI.get(sentiment, '❓')
+
+def sentiment_hover_text(labels):
+    """
+    "<emoji> <label>" hover strings for a column of sentiment labels
+    """
+    # Only a handful of distinct labels: format each once, then gather by code
+    codes, uniques = pd.factorize(pd.Series(labels), use_na_sentinel=False)
+    text = np.array([f"{get_sentiment_emoji(label)} {label}" for label in uniques], dtype=object)
+    return text[codes]
+
+def with_source_text(hover, index, text_store, width=100):
+    """
+    Append each row's source sentence (looked up in text_store) to its hover text
+    """
+    texts = text_store.get(index)
+    return np.array([
+        h if t is None else f"{h}<br><i>{t if len(t) <= width else t[:width - 1] + '…'}</i>"
+        for h, t in zip(hover, texts)
+    ], dtype=object)
+
+def point_budget(width_px=DEFAULT_CHART_WIDTH_PX, points_per_pixel=POINTS_PER_PIXEL):
+    """
+    Number of points worth sending for a chart drawn width_px pixels wide
+    """
+    return int(width_px * points_per_pixel)
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling: positions of n_out points to keep
+
+    The first and last points are always kept; the interior is split into
+    n_out - 2 buckets and from each the point forming the largest triangle
+    with the previously kept point and the next bucket's average is chosen,
+    which preserves peaks and troughs that plain striding would drop.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    if np.isnan(y).any():
+        y = np.where(np.isnan(y), np.nanmean(y) if (~np.isnan(y)).any() else 0.0, y)
+
+    # Bucket i covers interior rows edges[i] .. edges[i + 1] - 1
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # Next-bucket averages from prefix sums; the final bucket looks at the last point
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    next_lo = np.append(edges[1:-1], n - 1)
+    next_hi = np.append(edges[2:], n)
+    avg_x = (cx[next_hi] - cx[next_lo]) / (next_hi - next_lo)
+    avg_y = (cy[next_hi] - cy[next_lo]) / (next_hi - next_lo)
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    sizes = np.diff(edges)
+    width = int(sizes.max())
+
+    if width > LTTB_TABLE_WIDTH:
+        # Few, wide buckets: the per-bucket numpy calls are already cheap
+        a = 0
+        for i in range(n_out - 2):
+            lo, hi = edges[i], edges[i + 1]
+            # Twice the triangle area, up to sign; the constant factor does not move the argmax
+            area = np.abs((x[a] - avg_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i] - y[a]))
+            a = lo + int(np.argmax(area))
+            keep[i + 1] = a
+        return keep
+
+    # The pick in bucket i only depends on which point of bucket i - 1 was
+    # kept, so tabulate best[i, c] (the pick when candidate c of the previous
+    # bucket is the anchor) for every bucket at once, then follow the chain
+    offsets = np.arange(width)
+    pos = np.minimum(edges[:-1, None] + offsets, n - 1)
+    bx, by = x[pos], y[pos]
+    # Anchors for bucket 0 are just the first point
+    ax = np.vstack([np.full(width, x[0]), bx[:-1]])
+    ay = np.vstack([np.full(width, y[0]), by[:-1]])
+
+    # Twice the signed area is coef_y * y_j + coef_x * x_j + const per
+    # (bucket, anchor), so each bucket's table is one small matrix product
+    coef_y = ax - avg_x[:, None]
+    coef_x = avg_y[:, None] - ay
+    coefs = np.stack([coef_y, coef_x, -coef_y * ay - coef_x * ax], axis=2)
+    points = np.stack([by, bx, np.ones_like(bx)], axis=1)
+    # Padding slots past a bucket's end never win
+    outside = offsets >= sizes[:, None]
+
+    best = []
+    block = max(1, 2**20 // (width * width))
+    for start in range(0, n_out - 2, block):
+        b = slice(start, start + block)
+        area = np.abs(np.matmul(coefs[b], points[b]))
+        area[np.broadcast_to(outside[b, None, :], area.shape)] = -1.0
+        best.extend(area.argmax(axis=2).tolist())
 
-def display_stock_chart(data, chart_type='line', ticker='', is_forecast=False):
+    c = 0
+    picks = []
+    for lo, row in zip(edges[:-1].tolist(), best):
+        c = row[c]
+        picks.append(lo + c)
+    keep[1:-1] = picks
+    return keep
+
+def downsample(data, max_points, value='close'):
+    """
+    LTTB-downsample a date-indexed frame to at most max_points rows
+    """
+    if not max_points or len(data) <= max_points:
+        return data
+    # Days since the first row keep the triangle areas well conditioned
+    x = data['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    x = (x - x[0]) / 86_400e9
+    return data.iloc[lttb_indices(x, data[value].to_numpy(dtype=np.float64), max_points)]
+
+@traced('display_stock_chart')
+def display_stock_chart(data, chart_type='line', ticker='', is_forecast=False, max_points=None, text_store=None):
     """
     Create an interactive stock chart based on selected chart type
+
+    Line charts longer than max_points (default: point_budget()) switch to
+    WebGL traces over an LTTB-downsampled copy of the data, with the
+    sentiment hover folded into the price trace; pass max_points=0 to always
+    draw every point with SVG traces. With a text_store (see
+    data_processor.load_text_store) the sentiment hover also shows each
+    point's source sentence, fetched for the plotted rows only.
     """
+    if max_points is None:
+        max_points = point_budget()
+    webgl = chart_type == 'line' and bool(max_points) and len(data) > max_points
+    scatter = go.Scattergl if webgl else go.Scatter
+
     # Define common layout settings
     layout = go.Layout(
         title=f"{ticker} {'Forecast' if is_forecast else 'Historical'} Prices",
@@ -44,45 +207,111 @@ def display_stock_chart(data, chart_type='line', ticker='', is_forecast=False):
     # Create appropriate chart based on type - using only line chart as requested
     fig = go.Figure(layout=layout)
     
+    # Add the simulated p5-p95 band underneath the forecast line
+    if is_forecast and 'p5' in data.columns and 'p95' in data.columns:
+        band = data[data['p5'].notna()]
+        if webgl:
+            band = downsample(band, max_points)
+        # Filled areas are not supported by WebGL traces, and the band is
+        # already down to the point budget
+        fig.add_trace(
+            go.Scatter(
+                x=band['date'],
+                y=band['p95'],
+                mode='lines',
+                line=dict(width=0),
+                showlegend=False,
+                hoverinfo='skip'
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=band['date'],
+                y=band['p5'],
+                mode='lines',
+                fill='tonexty',
+                fillcolor='rgba(0, 100, 255, 0.15)',
+                line=dict(width=0),
+                name='90% Band',
+                customdata=band['p95'],
+                hovertemplate='%{x}<br>p5: $%{y:.2f}<br>p95: $%{customdata:.2f}<extra></extra>'
+            )
+        )
+    
+    if webgl:
+        data = downsample(data, max_points)
+    show_sentiment = not is_forecast and 'emo_label' in data.columns
+    if show_sentiment:
+        hover_text = sentiment_hover_text(data['emo_label'])
+        if text_store is not None:
+            hover_text = with_source_text(hover_text, data.index, text_store)
+    
     # Add price line
-    fig.add_trace(
-        go.Scatter(
-            x=data['date'],
-            y=data['close'],
-            mode='lines',
-            name='Price',
-            line=dict(color='blue', width=2),
-            hovertemplate='%{x}<br>Price: $%{y:.2f}<extra></extra>'
+    if chart_type in ('candlestick', 'ohlc') and not is_forecast:
+        open_, high, low, close = ohlc_columns(data)
+        trace = go.Candlestick if chart_type == 'candlestick' else go.Ohlc
+        fig.add_trace(
+            trace(
+                x=data['date'],
+                open=open_,
+                high=high,
+                low=low,
+                close=close,
+                name='Price',
+                increasing_line_color='green',
+                decreasing_line_color='red'
+            )
+        )
+    elif webgl and show_sentiment:
+        # One trace carries both the line and the sentiment hover instead of
+        # sending every point a second time as invisible markers
+        fig.add_trace(
+            scatter(
+                x=data['date'],
+                y=data['close'],
+                mode='lines',
+                name='Price',
+                line=dict(color='blue', width=2),
+                text=hover_text,
+                hovertemplate='<b>%{x}</b><br>Price: $%{y:.2f}<br>Sentiment: %{text}<extra></extra>'
+            )
+        )
+    else:
+        fig.add_trace(
+            scatter(
+                x=data['date'],
+                y=data['close'],
+                mode='lines',
+                name='Price',
+                line=dict(color='blue', width=2),
+                hovertemplate='%{x}<br>Price: $%{y:.2f}<extra></extra>'
+            )
         )
-    )
     
     # Add clickable points for sentiment info - with custom hover behavior
-    if not is_forecast and 'emo_label' in data.columns:
+    if show_sentiment:
         # We'll make the entire line clickable to show sentiment
         # But hide specific sentiment markers until hover/click
         
-        # Create emoji list mapped to sentiment
-        emojis = [get_sentiment_emoji(sentiment) for sentiment in data['emo_label']]
-        sentiments = data['emo_label'].tolist()
-        
         # Add invisible markers layer that only show on hover/click
-        fig.add_trace(
-            go.Scatter(
-                x=data['date'],
-                y=data['close'],
-                mode='markers',
-                marker=dict(
-                    size=12,
-                    color='rgba(0, 0, 0, 0)',  # Transparent markers
-                    symbol='circle',
-                    line=dict(width=0)  # No outline
-                ),
-                hoverinfo='x+y+text',
-                name='Click for Sentiment',
-                text=[f"{emoji} {sentiment}" for emoji, sentiment in zip(emojis, sentiments)],
-                hovertemplate='<b>%{x}</b><br>Price: $%{y:.2f}<br>Sentiment: %{text}<extra></extra>'
+        if not webgl:
+            fig.add_trace(
+                go.Scatter(
+                    x=data['date'],
+                    y=data['close'],
+                    mode='markers',
+                    marker=dict(
+                        size=12,
+                        color='rgba(0, 0, 0, 0)',  # Transparent markers
+                        symbol='circle',
+                        line=dict(width=0)  # No outline
+                    ),
+                    hoverinfo='x+y+text',
+                    name='Click for Sentiment',
+                    text=hover_text,
+                    hovertemplate='<b>%{x}</b><br>Price: $%{y:.2f}<br>Sentiment: %{text}<extra></extra>'
+                )
             )
-        )
         
         # Add custom interaction instructions
         fig.update_layout(
@@ -99,53 +328,6 @@ def display_stock_chart(data, chart_type='line', ticker='', is_forecast=False):
             ]
         )
                 
-    elif chart_type == 'candlestick':
-        # For a proper candlestick, we need OHLC data
-        # If we only have close prices, we'll estimate the others
-        if 'open' not in data.columns:
-            # Estimate OHLC from available data
-            data['open'] = data['close'].shift(1)
-            data['high'] = data['close'] * 1.01  # Estimate 1% higher
-            data['low'] = data['close'] * 0.99   # Estimate 1% lower
-            # Fill first row's open with close
-            data['open'].iloc[0] = data['close'].iloc[0]
-        
-        fig = go.Figure(
-            go.Candlestick(
-                x=data['date'],
-                open=data['open'],
-                high=data['high'],
-                low=data['low'],
-                close=data['close'],
-                increasing_line_color='green',
-                decreasing_line_color='red',
-                hovertemplate='%{x}<br>Open: $%{open:.2f}<br>High: $%{high:.2f}<br>Low: $%{low:.2f}<br>Close: $%{close:.2f}<extra></extra>'
-            ),
-            layout=layout
-        )
-        
-    elif chart_type == 'ohlc':
-        # Similar to candlestick, estimate OHLC if needed
-        if 'open' not in data.columns:
-            data['open'] = data['close'].shift(1)
-            data['high'] = data['close'] * 1.01
-            data['low'] = data['close'] * 0.99
-            data['open'].iloc[0] = data['close'].iloc[0]
-        
-        fig = go.Figure(
-            go.Ohlc(
-                x=data['date'],
-                open=data['open'],
-                high=data['high'],
-                low=data['low'],
-                close=data['close'],
-                increasing_line_color='green',
-                decreasing_line_color='red',
-                hovertemplate='%{x}<br>Open: $%{open:.2f}<br>High: $%{high:.2f}<br>Low: $%{low:.2f}<br>Close: $%{close:.2f}<extra></extra>'
-            ),
-            layout=layout
-        )
-        
     elif chart_type == 'area':
         fig = go.Figure(layout=layout)
         
@@ -236,3 +418,66 @@ def display_stock_chart(data, chart_type='line', ticker='', is_forecast=False):
     )
     
     return fig
+
+def emotion_distribution_chart(counts, height=400):
+    """
+    Donut chart of label counts (a Series, e.g. SentimentCube.distribution)
+    """
+    fig = go.Figure(
+        go.Pie(
+            labels=counts.index.astype(str),
+            values=counts.values,
+            hole=0.4,
+            marker=dict(colors=EMOTION_COLORS)
+        )
+    )
+    fig.update_layout(height=height, margin=dict(l=20, r=20, t=20, b=20))
+    return fig
+
+def sentiment_ratio_chart(ratios, window, height=350):
+    """
+    Rolling bullish share per ticker (SentimentCube.rolling_ratio) as lines
+    """
+    fig = go.Figure(layout=go.Layout(
+        xaxis={'title': 'Date'},
+        yaxis={'title': 'Bullish share', 'tickformat': '.0%', 'range': [0, 1]},
+        hovermode='x unified',
+        height=height
+    ))
+    for ticker in ratios.columns:
+        fig.add_trace(
+            go.Scatter(
+                x=ratios.index,
+                y=ratios[ticker],
+                mode='lines',
+                name=str(ticker),
+                hovertemplate=f'{ticker}: %{{y:.0%}}<extra></extra>'
+            )
+        )
+    fig.update_layout(
+        title=f"Bullish share of bullish + bearish labels, trailing {window} trading days",
+        margin=dict(l=40, r=40, t=60, b=40)
+    )
+    return fig
+
+def sentiment_timeline_chart(buckets, height=350):
+    """
+    Stacked bars of label counts per period (SentimentCube.bucket_counts)
+    """
+    fig = go.Figure(layout=go.Layout(
+        barmode='stack',
+        xaxis={'title': 'Period'},
+        yaxis={'title': 'Rows'},
+        height=height
+    ))
+    for label in buckets.columns:
+        fig.add_trace(
+            go.Bar(
+                x=buckets.index,
+                y=buckets[label],
+                name=str(label),
+                marker_color=SENTIMENT_COLORS.get(label)
+            )
+        )
+    fig.update_layout(margin=dict(l=40, r=40, t=20, b=40))
+    return fig
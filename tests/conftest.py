@@ -0,0 +1,39 @@
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+import warnings
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+# Keep models trained by the tests out of the real registry
+_MODEL_DIR = tempfile.mkdtemp(prefix='stockoracle-test-models-')
+os.environ['STOCKORACLE_MODEL_DIR'] = _MODEL_DIR
+atexit.register(shutil.rmtree, _MODEL_DIR, ignore_errors=True)
+
+DATA_DIR = os.path.join(HERE, '..', 'data')
+DATA_PATH = os.path.join(DATA_DIR, 'refined_textual_data.csv')
+PRICE_PATH = os.path.join(DATA_DIR, 'stock_data_5_years.csv')
+
+@pytest.fixture(scope='session')
+def partitions():
+    """
+    The bundled tickers, loaded once for the whole run
+    """
+    from data_processor import load_and_process_data, TickerPartitions
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return TickerPartitions(load_and_process_data(DATA_PATH))
+
+@pytest.fixture(scope='session')
+def structured():
+    """
+    The bundled tickers from the structured price file, with its indicator columns
+    """
+    from data_processor import load_structured_data, TickerPartitions
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return TickerPartitions(load_structured_data(PRICE_PATH, DATA_PATH))
@@ -0,0 +1,103 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+
+from ensemble import MEMBERS, EnsembleRunner, register_member, unregister_member
+from forecast_pool import ForecastPool
+from forecasting import forecast_many
+
+TIMEOUT = 0.3
+SLEEP = 3.0
+
+class ConstantPath:
+    def __init__(self, value):
+        self.value = value
+
+    def step(self, days):
+        return np.full((1, days), self.value)
+
+def sleeping(start=None):
+    """
+    A member start that sleeps past TIMEOUT, then forecasts like start (or the last close)
+    """
+    def run(context):
+        time.sleep(SLEEP)
+        return start(context) if start is not None else ConstantPath(context['close'][-1])
+    return run
+
+@pytest.fixture
+def data(partitions):
+    data = partitions.get(partitions.tickers[0])
+    # Train the GBM once so the timings below exclude it
+    forecast_many(data, [30], seed=1, cache=False, runner=EnsembleRunner())
+    return data
+
+def forecast(data, runner):
+    start = time.perf_counter()
+    frame = forecast_many(data, [30], seed=1, cache=False, runner=runner)[0]
+    return frame, time.perf_counter() - start
+
+def test_sleeping_member_is_left_out_within_its_timeout(data):
+    runner = EnsembleRunner()
+    expected, _ = forecast(data, runner)
+    assert expected.attrs['missing_members'] == []
+
+    register_member('sleepy', sleeping(), timeout=TIMEOUT)
+    try:
+        frame, seconds = forecast(data, runner)
+    finally:
+        unregister_member('sleepy')
+    assert seconds < SLEEP / 2
+    assert frame.attrs['missing_members'] == ['sleepy']
+    pd.testing.assert_frame_equal(frame, expected, check_exact=True)
+    assert runner.metrics()['sleepy']['timeout'] == 1
+
+def test_slow_gbm_falls_back_to_holt(data):
+    runner = EnsembleRunner()
+    gbm = MEMBERS['gbm']
+    register_member('gbm', sleeping(gbm.start), timeout=TIMEOUT)
+    try:
+        frame, seconds = forecast(data, runner)
+        # The same forecast with the GBM absent altogether
+        MEMBERS['gbm'] = type(gbm)('gbm', lambda context: None, None)
+        holt_only, _ = forecast(data, runner)
+    finally:
+        MEMBERS['gbm'] = gbm
+    assert seconds < SLEEP / 2
+    assert frame.attrs['missing_members'] == ['gbm']
+    assert holt_only.attrs['missing_members'] == []
+    pd.testing.assert_frame_equal(frame, holt_only, check_exact=True, check_flags=False)
+
+def test_pool_keeps_partial_results_stale():
+    results = iter([['gbm'], []])
+    def compute(data, days):
+        frame = pd.DataFrame({'close': [1.0]})
+        frame.attrs['missing_members'] = next(results)
+        return frame
+    pool = ForecastPool(compute, lambda ticker: None, workers=1,
+                        partial_fn=lambda result: bool(result.attrs.get('missing_members')))
+    try:
+        assert pool.get('AAPL', 30)[1] == 'computed'
+        # Served, but as stale, and recomputed in the background
+        assert pool.get('AAPL', 30)[1] == 'stale'
+        deadline = time.monotonic() + 5
+        while pool.metrics()['computed'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        result, status = pool.get('AAPL', 30)
+        assert status == 'fresh'
+        assert result.attrs['missing_members'] == []
+        assert pool.metrics()['partial'] == 1
+    finally:
+        pool.shutdown()
+
+def test_pool_refreshes_every_horizon_of_a_ticker():
+    pool = ForecastPool(lambda data, days: pd.DataFrame({'close': [float(days)]}), lambda ticker: None, workers=1)
+    try:
+        for days in (1, 7, 30):
+            pool.get('AAPL', days)
+        # Queuing a refresh moves each key in the LRU order while they are walked
+        generations = pool.invalidate('AAPL', refresh=True)
+        assert sorted(generations) == [('AAPL', 1), ('AAPL', 7), ('AAPL', 30)]
+    finally:
+        pool.shutdown()
@@ -0,0 +1,19 @@
+import numpy as np
+
+from conftest import DATA_PATH
+from global_model import GlobalForecaster
+from partition_store import build_partition_store, PartitionStore
+
+def test_fits_from_a_store_one_partition_at_a_time(partitions, tmp_path):
+    directory = str(tmp_path / 'store')
+    build_partition_store(directory, text_path=DATA_PATH)
+    store = PartitionStore(directory, max_partitions=2)
+    forecaster = GlobalForecaster()
+
+    X, y = forecaster.training_matrix({t: partitions.get(t) for t in partitions.tickers})
+    X_store, y_store = forecaster.training_matrix(store)
+    np.testing.assert_array_equal(X_store, X)
+    np.testing.assert_array_equal(y_store, y)
+    # Every ticker was read, but never more than the LRU holds
+    assert store.stats['misses'] == len(store.tickers)
+    assert len(store.cached()) <= 2
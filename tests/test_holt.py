@@ -0,0 +1,78 @@
+import warnings
+import numpy as np
+import pytest
+
+from holt import HoltLinear
+
+ExponentialSmoothing = pytest.importorskip('statsmodels.tsa.holtwinters').ExponentialSmoothing
+
+HORIZON = 365
+
+def closes(partitions, ticker):
+    return partitions.get(ticker)['close'].to_numpy(dtype=float)
+
+def statsmodels_fit(y, **kwargs):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if kwargs:
+            model = ExponentialSmoothing(y, trend='add', initialization_method='known',
+                                         initial_level=kwargs.pop('initial_level'),
+                                         initial_trend=kwargs.pop('initial_trend'))
+            return model.fit(optimized=False, **kwargs)
+        return ExponentialSmoothing(y, trend='add', initialization_method='estimated').fit(optimized=True)
+
+def test_forecast_matches_statsmodels_with_same_parameters(partitions):
+    # Same alpha/beta and initial state: the filter and forecast must agree exactly
+    for ticker in partitions.tickers:
+        y = closes(partitions, ticker)
+        model = HoltLinear().fit(y)
+        expected = statsmodels_fit(y, smoothing_level=model.alpha, smoothing_trend=model.beta,
+                                   initial_level=model.initial_level, initial_trend=model.initial_trend)
+        np.testing.assert_allclose(model.forecast(HORIZON), expected.forecast(HORIZON), rtol=1e-9, err_msg=ticker)
+        assert model.sse == pytest.approx(expected.sse, rel=1e-9), ticker
+
+def test_fit_matches_statsmodels(partitions):
+    """
+    Never a worse SSE than statsmodels, and the same forecast when both reach the same optimum
+
+    The SSE is nearly flat in beta near 0, so statsmodels' optimiser can
+    stop short of it (JPM: beta 0.003 against 0, SSE 0.04% higher). The
+    365-day trend then differs by over 10% while both fits are within
+    noise of each other, so the forecasts are compared only where the SSEs
+    agree.
+    """
+    for ticker in partitions.tickers:
+        y = closes(partitions, ticker)
+        model = HoltLinear().fit(y)
+        expected = statsmodels_fit(y)
+        ratio = model.sse / expected.sse
+        assert ratio <= 1 + 1e-6, (ticker, ratio)
+        if ratio > 1 - 1e-5:
+            np.testing.assert_allclose(model.forecast(HORIZON), expected.forecast(HORIZON), rtol=5e-3,
+                                       err_msg=ticker)
+
+def test_update_matches_filtering_the_whole_series(partitions):
+    y = closes(partitions, partitions.tickers[0])
+    head, new = y[:-20], y[-20:]
+    model = HoltLinear().fit(head)
+    # Same parameters and initial state run over the whole series in one go
+    whole = HoltLinear(model.alpha, model.beta)
+    whole.level, whole.trend = model.initial_level, model.initial_trend
+    whole.update(y)
+    model.update(new)
+    assert model.n_obs == len(y)
+    assert model.level == pytest.approx(whole.level, rel=1e-12)
+    assert model.trend == pytest.approx(whole.trend, rel=1e-12, abs=1e-12)
+
+def test_extends(partitions):
+    y = closes(partitions, partitions.tickers[0])
+    model = HoltLinear().fit(y[:-5])
+    assert model.extends(y[:-5])
+    assert model.extends(y)
+    assert not model.extends(y[:-6])
+    revised = y.copy()
+    revised[-7] += 1.0
+    assert not model.extends(revised)
+    revised = y.copy()
+    revised[0] += 1.0
+    assert not model.extends(revised)
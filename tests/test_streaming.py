@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from data_processor import TickerPartitions, compact_frame
+from streaming import CsvTail, StreamIngestor, TEXTUAL_COLUMNS
+
+INDICATORS = ['sma_50', 'sma_200', 'rsi']
+
+def line(date, price, ticker='AAPL'):
+    text = f"{ticker} closed higher at {price:.2f}, volume of 1000000."
+    return f'0,{date},{ticker},excited,bullish,"{text}","{text.lower()}"'
+
+def next_dates(partitions, n, ticker='AAPL'):
+    last = partitions.get(ticker)['date'].iloc[-1]
+    return [(last + np.timedelta64(i + 1, 'D')).strftime('%Y-%m-%d') for i in range(n)]
+
+@pytest.fixture
+def feed(tmp_path):
+    path = tmp_path / 'feed.csv'
+    path.write_text(','.join(TEXTUAL_COLUMNS) + '\n')
+
+    def write(*lines):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(''.join(l + '\n' for l in lines))
+    return CsvTail(str(path)), write
+
+def test_bad_line_skips_only_that_row(partitions, feed):
+    # A fresh view, so the session fixture stays as loaded
+    partitions = TickerPartitions(partitions.data)
+    tail, write = feed
+    ingestor = StreamIngestor(partitions, tail)
+    label = partitions.next_label()
+    before = len(partitions.get('AAPL'))
+
+    first, second = next_dates(partitions, 2)
+    write(line(first, 200.0), 'not,a,row', line(second, 201.0))
+    assert ingestor.poll() == ['AAPL']
+
+    data = partitions.get('AAPL')
+    assert len(data) == before + 2
+    assert data['close'].iloc[-2:].tolist() == [200.0, 201.0]
+    assert data.index[-2:].tolist() == [label, label + 1]
+    assert ingestor.stats['bad_rows'] == 1
+    assert ingestor.stats['last_bad_row'] == 'not,a,row'
+
+def test_failed_append_is_retried(partitions, feed, monkeypatch):
+    partitions = TickerPartitions(partitions.data)
+    tail, write = feed
+    ingestor = StreamIngestor(partitions, tail)
+    label = partitions.next_label()
+    append = partitions.append
+
+    def failing(rows):
+        monkeypatch.setattr(partitions, 'append', append)
+        raise OSError("disk full")
+    monkeypatch.setattr(partitions, 'append', failing)
+
+    first, second = next_dates(partitions, 2)
+    write(line(first, 200.0))
+    with pytest.raises(OSError):
+        ingestor.poll()
+    write(line(second, 201.0))
+    assert ingestor.poll() == ['AAPL']
+
+    data = partitions.get('AAPL')
+    assert data['close'].iloc[-2:].tolist() == [200.0, 201.0]
+    assert data.index[-2:].tolist() == [label, label + 1]
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_streams_into_structured_partitions(structured, feed, compact):
+    partitions = TickerPartitions(compact_frame(structured.data) if compact else structured.data)
+    tail, write = feed
+    ingestor = StreamIngestor(partitions, tail)
+    history = partitions.get('AAPL')['close'].to_numpy()
+
+    prices = [history[-1] * 1.01, history[-1] * 0.99]
+    write(*[line(date, price) for date, price in zip(next_dates(partitions, 2), prices)])
+    ingestor.poll()
+
+    data = partitions.get('AAPL')
+    new = data.iloc[-2:]
+    assert len(data) == len(history) + 2
+    assert not new[['open', 'high', 'low', 'close'] + INDICATORS].isna().any().any()
+    np.testing.assert_allclose(new['close'], np.round(prices, 2))
+    for name in ('open', 'high', 'low'):
+        np.testing.assert_array_equal(new[name].to_numpy(), new['close'].to_numpy())
+    assert (new[['dividends', 'stock_splits']] == 0).all().all()
+
+    closes = data['close'].to_numpy()
+    np.testing.assert_allclose(new['sma_50'].iloc[-1], closes[-50:].mean())
+    np.testing.assert_allclose(new['sma_200'].iloc[-1], closes[-200:].mean())
+    assert 0 < new['rsi'].iloc[-1] < 100